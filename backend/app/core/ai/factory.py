@@ -9,12 +9,24 @@ from typing import Optional, Dict, Any
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from app.core.config.settings import settings
+from app.core.http import get_http_client
+from app.core.ai.response_cache import get_response_cache, make_cache_key
+from app.core.ai.sse import SSEDecoder, StreamMetrics, StreamTextExtractor
 import logging
-import httpx
-import json
 
 logger = logging.getLogger(__name__)
 
+# agenerate 的响应缓存策略
+CACHE_OFF = "off"
+CACHE_WRITE = "write"
+CACHE_READ_WRITE = "read_write"
+CACHE_POLICIES = (CACHE_OFF, CACHE_WRITE, CACHE_READ_WRITE)
+
+
+def _request_timeout() -> float:
+    """上游请求超时（秒）；流式请求中为相邻两次读取之间的最长等待"""
+    return settings.API_TIMEOUT_MS / 1000 if settings.API_TIMEOUT_MS else 60
+
 
 class LLMFactory:
     """
@@ -139,6 +151,7 @@ class LLMFactory:
     async def agenerate(
         client: ChatOpenAI,
         messages: list[BaseMessage],
+        cache: Optional[str] = None,
         **kwargs
     ) -> str:
         """
@@ -147,11 +160,51 @@ class LLMFactory:
         Args:
             client: Configured LLM client
             messages: List of chat messages
+            cache: Response cache policy. "off" bypasses the cache, "write"
+                always calls the model and stores the result, "read_write"
+                serves a cached response when one exists. Defaults to
+                "read_write" when LLM_CACHE_ENABLED is set, otherwise "off".
             **kwargs: Additional generation parameters
 
         Returns:
             Generated text response
         """
+        if cache is None:
+            cache = CACHE_READ_WRITE if settings.LLM_CACHE_ENABLED else CACHE_OFF
+        if cache not in CACHE_POLICIES:
+            raise ValueError(f"Unsupported cache policy: {cache}")
+
+        response_cache = get_response_cache()
+        # 额外的调用参数无法可靠规范化，带参数的调用不走缓存
+        if cache == CACHE_OFF or kwargs:
+            response_cache.record_bypass()
+            return await LLMFactory._agenerate_uncached(client, messages, **kwargs)
+
+        key = make_cache_key(
+            provider=getattr(client, 'openai_api_base', None) or "openai",
+            model=getattr(client, 'model_name', None) or "",
+            temperature=getattr(client, 'temperature', None),
+            max_tokens=getattr(client, 'max_tokens', None),
+            messages=messages
+        )
+        if cache == CACHE_READ_WRITE:
+            cached = await response_cache.get(key)
+            if cached is not None:
+                logger.info(f"LLM 响应缓存命中: {key[:12]}")
+                return cached
+
+        content = await LLMFactory._agenerate_uncached(client, messages)
+        # 空结果不缓存，避免把失败的生成固定下来
+        if isinstance(content, str) and content.strip():
+            await response_cache.set(key, content)
+        return content
+
+    @staticmethod
+    async def _agenerate_uncached(
+        client: ChatOpenAI,
+        messages: list[BaseMessage],
+        **kwargs
+    ) -> str:
         try:
             # 检查是否是智谱 API（通过检查 openai_api_base）
             openai_api_base = getattr(client, 'openai_api_base', None)
@@ -228,26 +281,27 @@ class LLMFactory:
             'messages': api_messages
         }
 
-        timeout = settings.API_TIMEOUT_MS / 1000 if settings.API_TIMEOUT_MS else 60
-        async with httpx.AsyncClient(timeout=timeout) as http_client:
-            response = await http_client.post(
-                "https://open.bigmodel.cn/api/anthropic/v1/messages",
-                headers=headers,
-                json=payload
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                # 处理 Anthropic 格式的响应
-                content_list = data.get('content', [])
-                text_content = []
-                for item in content_list:
-                    if item.get('type') == 'text':
-                        text_content.append(item.get('text', ''))
-                return ''.join(text_content)
-            else:
-                error_msg = response.text
-                raise Exception(f"GLM API error ({response.status_code}): {error_msg}")
+        url = "https://open.bigmodel.cn/api/anthropic/v1/messages"
+        http_client = get_http_client(url)
+        response = await http_client.post(
+            url,
+            headers=headers,
+            json=payload,
+            timeout=_request_timeout()
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            # 处理 Anthropic 格式的响应
+            content_list = data.get('content', [])
+            text_content = []
+            for item in content_list:
+                if item.get('type') == 'text':
+                    text_content.append(item.get('text', ''))
+            return ''.join(text_content)
+        else:
+            error_msg = response.text
+            raise Exception(f"GLM API error ({response.status_code}): {error_msg}")
 
     @staticmethod
     async def _generate_with_minimax_anthropic(messages: list[BaseMessage], client: ChatOpenAI) -> str:
@@ -308,34 +362,34 @@ class LLMFactory:
             else:
                 base_url = base_url + '/anthropic/v1/messages'
 
-        timeout = settings.API_TIMEOUT_MS / 1000 if settings.API_TIMEOUT_MS else 60
-        async with httpx.AsyncClient(timeout=timeout) as http_client:
-            response = await http_client.post(
-                base_url,
-                headers=headers,
-                json=payload
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                # 处理 MiniMax Anthropic 格式的响应
-                # MiniMax 返回的 content 数组可能包含 thinking 和 text 类型
-                # 我们需要提取所有 text 类型的内容
-                content_list = data.get('content', [])
-                text_content = []
-                for item in content_list:
-                    if item.get('type') == 'text':
-                        text_content.append(item.get('text', ''))
-                    # 忽略 thinking 类型的内容
-                if text_content:
-                    return ''.join(text_content)
-                else:
-                    # 如果没有text类型，检查是否有其他类型
-                    logger.warning(f"MiniMax API response has no text content: {data.keys()}")
-                    return ""
+        http_client = get_http_client(base_url)
+        response = await http_client.post(
+            base_url,
+            headers=headers,
+            json=payload,
+            timeout=_request_timeout()
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            # 处理 MiniMax Anthropic 格式的响应
+            # MiniMax 返回的 content 数组可能包含 thinking 和 text 类型
+            # 我们需要提取所有 text 类型的内容
+            content_list = data.get('content', [])
+            text_content = []
+            for item in content_list:
+                if item.get('type') == 'text':
+                    text_content.append(item.get('text', ''))
+                # 忽略 thinking 类型的内容
+            if text_content:
+                return ''.join(text_content)
             else:
-                error_msg = response.text
-                raise Exception(f"MiniMax API error ({response.status_code}): {error_msg}")
+                # 如果没有text类型，检查是否有其他类型
+                logger.warning(f"MiniMax API response has no text content: {data.keys()}")
+                return ""
+        else:
+            error_msg = response.text
+            raise Exception(f"MiniMax API error ({response.status_code}): {error_msg}")
 
     @staticmethod
     async def astream_generate(
@@ -380,8 +434,6 @@ class LLMFactory:
     @staticmethod
     async def _astream_with_minimax(client: ChatOpenAI, messages: list[BaseMessage]):
         """使用MiniMax流式生成"""
-        import httpx
-
         api_key = client.openai_api_key
         if hasattr(api_key, 'get_secret_value'):
             api_key = api_key.get_secret_value()
@@ -432,42 +484,20 @@ class LLMFactory:
             'stream': True
         }
 
-        timeout = 60
-        async with httpx.AsyncClient(timeout=timeout) as http_client:
-            async with http_client.stream('POST', base_url, headers=headers, json=payload) as response:
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    raise Exception(f"MiniMax API error ({response.status_code}): {error_text}")
-
-                async for line in response.aiter_lines():
-                    if line.startswith('data: '):
-                        data_str = line[6:]
-                        if data_str.strip() == '[DONE]':
-                            break
-
-                        try:
-                            data = json.loads(data_str)
-                            # 处理不同格式的流式响应
-                            if 'delta' in data:
-                                # OpenAI格式
-                                delta = data['delta']
-                                if isinstance(delta, dict):
-                                    content = delta.get('content', '')
-                                else:
-                                    content = str(delta)
-                                yield content
-                            elif 'content' in data:
-                                # 直接格式
-                                content = data.get('content', '')
-                                yield content
-                        except json.JSONDecodeError:
-                            continue
+        # 从发出请求开始计时，TTFT 包含连接和首包等待
+        metrics = StreamMetrics()
+        http_client = get_http_client(base_url)
+        async with http_client.stream('POST', base_url, headers=headers, json=payload, timeout=_request_timeout()) as response:
+            if response.status_code != 200:
+                error_text = await response.aread()
+                raise Exception(f"MiniMax API error ({response.status_code}): {error_text}")
+
+            async for content in LLMFactory._aiter_stream_text(response, "MiniMax", metrics):
+                yield content
 
     @staticmethod
     async def _astream_with_glm(client: ChatOpenAI, messages: list[BaseMessage]):
         """使用GLM流式生成"""
-        import httpx
-
         api_key = client.openai_api_key
         if hasattr(api_key, 'get_secret_value'):
             api_key = api_key.get_secret_value()
@@ -510,27 +540,30 @@ class LLMFactory:
             'stream': True
         }
 
-        timeout = 60
-        async with httpx.AsyncClient(timeout=timeout) as http_client:
-            async with http_client.stream('POST', 'https://open.bigmodel.cn/api/anthropic/v1/messages', headers=headers, json=payload) as response:
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    raise Exception(f"GLM API error ({response.status_code}): {error_text}")
-
-                async for line in response.aiter_lines():
-                    if line.startswith('data: '):
-                        data_str = line[6:]
-                        if data_str.strip() == '[DONE]':
-                            break
-
-                        try:
-                            data = json.loads(data_str)
-                            if 'delta' in data:
-                                delta = data['delta']
-                                if isinstance(delta, dict):
-                                    content = delta.get('content', '')
-                                else:
-                                    content = str(delta)
-                                yield content
-                        except json.JSONDecodeError:
-                            continue
+        url = 'https://open.bigmodel.cn/api/anthropic/v1/messages'
+        metrics = StreamMetrics()
+        http_client = get_http_client(url)
+        async with http_client.stream('POST', url, headers=headers, json=payload, timeout=_request_timeout()) as response:
+            if response.status_code != 200:
+                error_text = await response.aread()
+                raise Exception(f"GLM API error ({response.status_code}): {error_text}")
+
+            async for content in LLMFactory._aiter_stream_text(response, "GLM", metrics):
+                yield content
+
+    @staticmethod
+    async def _aiter_stream_text(response, provider: str, metrics: StreamMetrics):
+        """逐块解码 SSE 响应并立即输出每个文本增量，结束时记录 TTFT 等指标"""
+        decoder = SSEDecoder()
+        extractor = StreamTextExtractor(metrics)
+        try:
+            async for chunk in response.aiter_text():
+                for content in extractor.feed(decoder.feed(chunk)):
+                    yield content
+                if extractor.done:
+                    break
+            else:
+                for content in extractor.feed(decoder.flush()):
+                    yield content
+        finally:
+            logger.info(f"{provider} stream finished: {extractor.finish().as_dict()}")
@@ -0,0 +1,116 @@
+"""
+LLM 响应缓存
+两级缓存：进程内 LRU + 磁盘 SQLite 持久化存储
+按 (服务商, 模型, temperature, max_tokens, 规范化消息哈希) 作为键，支持 TTL 和磁盘条目上限
+"""
+
+import hashlib
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import MISSING, TieredTTLCache
+from app.core.config.settings import settings
+
+_WHITESPACE_PATTERN = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_PATTERN = re.compile(r"\n\s*\n+")
+_ROLE_ALIASES = {"human": "user", "ai": "assistant"}
+
+
+def _canonical_text(text: str) -> str:
+    """全角转半角、合并行内空白和多余空行，不改变文字内容"""
+    text = unicodedata.normalize("NFKC", text)
+    lines = [_WHITESPACE_PATTERN.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_LINES_PATTERN.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _canonical_content(content: Any) -> Any:
+    if isinstance(content, str):
+        return _canonical_text(content)
+    if isinstance(content, list):
+        return [_canonical_content(item) for item in content]
+    if isinstance(content, dict):
+        return {key: _canonical_content(value) for key, value in content.items()}
+    return content
+
+
+def canonicalize_messages(messages: List[Any]) -> List[Dict[str, Any]]:
+    """LangChain 消息转为 [{"role", "content"}]，角色名统一，文本规范化"""
+    canonical = []
+    for msg in messages:
+        role = msg.type if hasattr(msg, "type") else msg.__class__.__name__.lower().replace("message", "")
+        canonical.append({"role": _ROLE_ALIASES.get(role, role), "content": _canonical_content(msg.content)})
+    return canonical
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+    messages: List[Any]
+) -> str:
+    payload = {
+        "provider": provider,
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "messages": canonicalize_messages(messages),
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LLM 响应两级缓存（进程内 LRU + 磁盘 SQLite，见 TieredTTLCache）
+
+    磁盘超过 max_disk_entries 条时删除最早写入的条目；不可缓存的请求记入 bypassed
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        max_size: Optional[int] = None,
+        max_disk_entries: Optional[int] = None,
+        ttl: Optional[int] = None
+    ):
+        self.db_path = db_path or Path(__file__).resolve().parents[3] / ".cache" / "llm" / "responses.sqlite3"
+        self.ttl = ttl if ttl is not None else settings.LLM_CACHE_TTL
+        self._store = TieredTTLCache(
+            db_path=self.db_path,
+            table="llm_responses",
+            max_size=max_size or settings.LLM_CACHE_MAX_SIZE,
+            max_disk_entries=max_disk_entries or settings.LLM_CACHE_MAX_DISK_ENTRIES,
+            counters=("bypassed",),
+            label="LLM 响应"
+        )
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._store.get(key)
+        return None if value is MISSING else value
+
+    async def set(self, key: str, response: str, ttl: Optional[int] = None) -> None:
+        await self._store.set(key, response, ttl if ttl is not None else self.ttl)
+
+    def record_bypass(self) -> None:
+        self._store.record("bypassed")
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        return self._store.stats()
+
+    def clear_memory(self) -> None:
+        self._store.clear_memory()
+
+
+_response_cache: Optional[LLMResponseCache] = None
+
+
+def get_response_cache() -> LLMResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = LLMResponseCache()
+    return _response_cache
@@ -0,0 +1,245 @@
+"""
+LLM 流式响应解析
+增量 SSE 事件解码 + Anthropic / OpenAI 兼容流的文本增量提取
+
+- SSEDecoder: 按 SSE 规范逐块解码，支持 event/id 字段、多行 data、注释行和任意切分位置
+- StreamTextExtractor: 从事件中提取文本增量，跳过 thinking/redacted_thinking 块，
+  记录首个文本增量的耗时（TTFT）
+"""
+
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+# thinking 块的增量事件：不解析 JSON，直接跳过
+_SKIPPED_DELTA = re.compile(r'"type"\s*:\s*"(?:thinking|signature)_delta"')
+_THINKING_BLOCKS = frozenset({"thinking", "redacted_thinking"})
+
+
+class SSEEvent:
+    __slots__ = ("event", "data", "id")
+
+    def __init__(self, event: str = "message", data: str = "", id: Optional[str] = None):
+        self.event = event
+        self.data = data
+        self.id = id
+
+
+class SSEDecoder:
+    """
+    增量 SSE 解码器
+
+    feed() 接收任意切分的文本块，返回其中已完整（以空行结束）的事件；
+    流结束时调用 flush() 取出最后一个未以空行结束的事件。
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._event: Optional[str] = None
+        self._data: List[str] = []
+        self._id: Optional[str] = None
+        self._has_data = False
+
+    def feed(self, chunk: str) -> List[SSEEvent]:
+        buffer = self._buffer + chunk
+        if "\r" in buffer:
+            # \r 在块末尾时无法确定是否为 \r\n，留到下一块
+            held = "\r" if buffer.endswith("\r") else ""
+            if held:
+                buffer = buffer[:-1]
+            buffer = buffer.replace("\r\n", "\n").replace("\r", "\n") + held
+        lines = buffer.split("\n")
+        self._buffer = lines.pop()
+        events = []
+        data = self._data
+        for line in lines:
+            # 常见的三种行在此直接处理，其余交给 _process_line
+            if line.startswith("data: "):
+                data.append(line[6:])
+                self._has_data = True
+                continue
+            if not line:
+                if self._has_data:
+                    events.append(SSEEvent(self._event or "message", "\n".join(data), self._id))
+                    data = self._data = []
+                    self._has_data = False
+                self._event = None
+                continue
+            if line.startswith("event: "):
+                self._event = line[7:]
+                continue
+            event = self._process_line(line)
+            data = self._data
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[SSEEvent]:
+        events = []
+        if self._buffer:
+            line, self._buffer = self._buffer.rstrip("\r"), ""
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line: str) -> Optional[SSEEvent]:
+        if not line:
+            return self._dispatch()
+        if line[0] == ":":
+            # 注释（心跳）
+            return None
+        name, sep, value = line.partition(":")
+        if sep and value.startswith(" "):
+            value = value[1:]
+        if name == "data":
+            self._data.append(value)
+            self._has_data = True
+        elif name == "event":
+            self._event = value
+        elif name == "id":
+            self._id = value
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        if not self._has_data:
+            self._event = None
+            return None
+        event = SSEEvent(event=self._event or "message", data="\n".join(self._data), id=self._id)
+        self._event = None
+        self._data = []
+        self._has_data = False
+        return event
+
+
+class StreamError(Exception):
+    """上游在流中返回的错误事件"""
+
+
+@dataclass
+class StreamMetrics:
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: int = 0
+    text_deltas: int = 0
+    skipped_deltas: int = 0
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """首个文本增量的耗时（秒）"""
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        duration = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "ttft_ms": None if self.ttft is None else round(self.ttft * 1000, 1),
+            "duration_ms": round(duration * 1000, 1),
+            "events": self.events,
+            "text_deltas": self.text_deltas,
+            "skipped_deltas": self.skipped_deltas,
+        }
+
+
+class StreamTextExtractor:
+    """
+    从 Anthropic 兼容（content_block_delta）或 OpenAI 兼容（choices[].delta）
+    的流事件中提取文本增量
+
+    thinking 块的增量通过正则在解析 JSON 之前跳过；OpenAI 兼容流中的
+    reasoning_content 同样不输出。
+    """
+
+    def __init__(self, metrics: Optional[StreamMetrics] = None):
+        self.metrics = metrics or StreamMetrics()
+        self.done = False
+        self._skipped_blocks: Set[int] = set()
+
+    def feed(self, events: Iterable[SSEEvent]) -> Iterator[str]:
+        for event in events:
+            if self.done:
+                return
+            text = self._extract(event)
+            if text:
+                if self.metrics.first_token_at is None:
+                    self.metrics.first_token_at = time.perf_counter()
+                self.metrics.text_deltas += 1
+                yield text
+
+    def finish(self) -> StreamMetrics:
+        self.metrics.finished_at = time.perf_counter()
+        return self.metrics
+
+    def _extract(self, event: SSEEvent) -> Optional[str]:
+        self.metrics.events += 1
+        data = event.data
+        if event.event == "ping" or not data:
+            return None
+        if data.strip() == "[DONE]":
+            self.done = True
+            return None
+        if event.event == "content_block_delta" and _SKIPPED_DELTA.search(data):
+            self.metrics.skipped_deltas += 1
+            return None
+
+        try:
+            payload = json.loads(data)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+
+        kind = payload.get("type") or event.event
+        if kind == "content_block_delta":
+            return self._anthropic_delta(payload)
+        if kind == "content_block_start":
+            block = payload.get("content_block") or {}
+            if block.get("type") in _THINKING_BLOCKS:
+                self._skipped_blocks.add(payload.get("index"))
+                return None
+            # 部分兼容实现会在 start 事件中带上首段文本
+            return block.get("text") if block.get("type") == "text" else None
+        if kind == "message_stop":
+            self.done = True
+            return None
+        if kind == "error" or event.event == "error":
+            error = payload.get("error") or payload
+            message = error.get("message") if isinstance(error, dict) else str(error)
+            raise StreamError(message or "stream error")
+        if "choices" in payload:
+            return self._openai_delta(payload)
+        if kind in ("message_start", "message_delta", "content_block_stop"):
+            return None
+        # 非标准的直接格式
+        content = payload.get("content")
+        return content if isinstance(content, str) else None
+
+    def _anthropic_delta(self, payload: Dict[str, Any]) -> Optional[str]:
+        if payload.get("index") in self._skipped_blocks:
+            self.metrics.skipped_deltas += 1
+            return None
+        delta = payload.get("delta") or {}
+        delta_type = delta.get("type")
+        if delta_type == "text_delta" or (delta_type is None and "text" in delta):
+            return delta.get("text")
+        if delta_type in ("thinking_delta", "signature_delta"):
+            self.metrics.skipped_deltas += 1
+        return None
+
+    def _openai_delta(self, payload: Dict[str, Any]) -> Optional[str]:
+        parts = []
+        for choice in payload.get("choices") or []:
+            delta = choice.get("delta") or {}
+            if delta.get("reasoning_content"):
+                self.metrics.skipped_deltas += 1
+            content = delta.get("content")
+            if isinstance(content, str):
+                parts.append(content)
+            if choice.get("finish_reason"):
+                self.done = True
+        return "".join(parts) or None
@@ -0,0 +1,3 @@
+from .tiered import MISSING, TieredTTLCache
+
+__all__ = ["MISSING", "TieredTTLCache"]
@@ -0,0 +1,183 @@
+"""
+两级 TTL 缓存
+进程内 LRU + 磁盘 SQLite 持久化存储，地理编码缓存和 LLM 响应缓存共用
+调用方负责键的构造和值的编码，这里只处理存取、过期、淘汰和命中统计
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 未命中标记；None 本身是可缓存的值（例如地理编码的负缓存）
+MISSING = object()
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class TieredTTLCache:
+    """
+    两级 TTL 缓存
+
+    - 一级：进程内 LRU，最多 max_size 条
+    - 二级：磁盘 SQLite（WAL），多进程共享，重启后依然有效
+    - 写入时清理过期条目；设置 max_disk_entries 时删除最早写入的超额条目
+    - encode/decode 在值和磁盘上的 TEXT 之间转换，内存中保存原值
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        table: str,
+        max_size: int,
+        max_disk_entries: Optional[int] = None,
+        encode: Callable[[Any], Optional[str]] = _identity,
+        decode: Callable[[Optional[str]], Any] = _identity,
+        counters: Iterable[str] = (),
+        label: str = "缓存"
+    ):
+        self.db_path = db_path
+        self.table = table
+        self.max_size = max_size
+        self.max_disk_entries = max_disk_entries
+        self._encode = encode
+        self._decode = decode
+        self._label = label
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db_ready = False
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        self._stats.update({name: 0 for name in counters})
+
+    # ------------------------------------------------------------------
+    # 磁盘存储
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if not self._db_ready:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=5)
+        if not self._db_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                " cache_key TEXT PRIMARY KEY,"
+                " payload TEXT,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_created_at ON {self.table} (created_at)")
+            self._db_ready = True
+        return conn
+
+    def _disk_get(self, key: str) -> Any:
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        f"SELECT payload, expires_at FROM {self.table} WHERE cache_key = ?", (key,)
+                    ).fetchone()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"{self._label}磁盘缓存读取失败: {e}")
+            return MISSING
+        if not row or row[1] < time.time():
+            return MISSING
+        return self._decode(row[0]), row[1]
+
+    def _disk_set(self, key: str, value: Any, expires_at: float) -> None:
+        now = time.time()
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {self.table} (cache_key, payload, created_at, expires_at)"
+                        " VALUES (?, ?, ?, ?)",
+                        (key, self._encode(value), now, expires_at)
+                    )
+                    conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+                    if self.max_disk_entries:
+                        conn.execute(
+                            f"DELETE FROM {self.table} WHERE cache_key IN ("
+                            f" SELECT cache_key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                            (self.max_disk_entries,)
+                        )
+                    conn.commit()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"{self._label}磁盘缓存写入失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 内存 LRU
+    # ------------------------------------------------------------------
+    def _memory_get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return MISSING
+            if entry[1] < time.time():
+                del self._memory[key]
+                return MISSING
+            self._memory.move_to_end(key)
+            return entry
+
+    def _memory_set(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    async def get(self, key: str) -> Any:
+        """查询缓存，未命中返回 MISSING"""
+        entry = self._memory_get(key)
+        if entry is not MISSING:
+            self.record("memory_hits")
+            return entry[0]
+
+        entry = await asyncio.to_thread(self._disk_get, key)
+        if entry is not MISSING:
+            self._memory_set(key, entry[0], entry[1])
+            self.record("disk_hits")
+            return entry[0]
+
+        self.record("misses")
+        return MISSING
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        self._memory_set(key, value, expires_at)
+        await asyncio.to_thread(self._disk_set, key, value, expires_at)
+        self.record("writes")
+
+    def record(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_size"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
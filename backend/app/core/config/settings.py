@@ -73,6 +73,12 @@ class Settings(BaseSettings):
     ANTHROPIC_DEFAULT_HAIKU_MODEL: Optional[str] = None
     API_TIMEOUT_MS: int = 60000
 
+    # Outbound HTTP Connection Pool
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP2_ENABLED: bool = True
+
     # Vision API Configuration (OpenAI compatible)
     VISION_API_KEY: Optional[str] = None
     VISION_API_BASE_URL: Optional[str] = None
@@ -87,6 +93,17 @@ class Settings(BaseSettings):
     FLIGHT_API_KEY: Optional[str] = None
     HOTEL_API_KEY: Optional[str] = None
 
+    # Geocoding Cache
+    GEOCODE_CACHE_MAX_SIZE: int = 5000
+    GEOCODE_CACHE_TTL: int = 30 * 24 * 3600  # 30 days
+    GEOCODE_NEGATIVE_CACHE_TTL: int = 24 * 3600  # 1 day
+    GEOCODE_CONCURRENCY: int = 3
+
+    # Map Provider Rate Limiting
+    MAP_QPS: Optional[float] = None  # None uses the provider default quota
+    MAP_MAX_RETRIES: int = 3
+    MAP_RETRY_BASE_DELAY: float = 0.5
+
     # Claude Code Configuration
     CLAUDE_CODE_DISABLE_NONESSENTIAL_TRAFFIC: Optional[str] = None
 
@@ -106,6 +123,9 @@ class Settings(BaseSettings):
     AI_MAX_TOKENS: int = 16000  # 澧炲姞token闄愬埗浠ユ敮鎸佸畬鏁磋绋嬬敓鎴?
     AI_TIMEOUT: int = 60
 
+    # Planner Fan-out（先生成行程骨架，再并发生成每天详情）
+    PLANNER_DAY_CONCURRENCY: int = 4
+
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
     RATE_LIMIT_PER_HOUR: int = 1000
@@ -124,6 +144,16 @@ class Settings(BaseSettings):
     CACHE_TTL: int = 3600  # 1 hour
     CACHE_MAX_SIZE: int = 10000
 
+    # LLM Response Cache（按模型参数和规范化消息缓存生成结果）
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_TTL: int = 7 * 24 * 3600  # 7 days
+    LLM_CACHE_MAX_SIZE: int = 256
+    LLM_CACHE_MAX_DISK_ENTRIES: int = 5000
+
+    # PDF Export（渲染线程数和按行程版本缓存的 PDF 文件数上限）
+    PDF_RENDER_WORKERS: int = 2
+    PDF_CACHE_MAX_ENTRIES: int = 500
+
     # CORS Configuration
     ALLOWED_ORIGINS: List[str] = ["*", "http://localhost:3000", "http://localhost:3001", "http://localhost:3002", "http://localhost:3003", "http://localhost:5173"]
 
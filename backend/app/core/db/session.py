@@ -19,6 +19,7 @@ if env_file.exists():
                 key, value = line.strip().split('=', 1)
                 os.environ[key] = value
 
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from sqlalchemy.engine import Engine
@@ -80,9 +81,26 @@ async def init_db():
     async with engine.begin() as conn:
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_indexes)
     logger.info("Database initialized successfully")
 
 
+def ensure_indexes(connection) -> None:
+    """
+    Create indexes declared on models that are missing from existing tables.
+    create_all only adds indexes when it creates the table itself.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                logger.info(f"Creating missing index {index.name} on {table.name}")
+                index.create(connection)
+
+
 async def get_db() -> AsyncSession:
     """
     Dependency function to get database session.
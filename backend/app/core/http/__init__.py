@@ -0,0 +1,3 @@
+from .clients import HTTPClientRegistry, get_http_client, close_http_clients, http_client_registry
+
+__all__ = ["HTTPClientRegistry", "get_http_client", "close_http_clients", "http_client_registry"]
@@ -0,0 +1,124 @@
+"""
+Pooled HTTP Clients
+
+This module keeps one long-lived httpx.AsyncClient per upstream origin so that
+outbound calls (LLM providers, map APIs, ...) reuse TCP/TLS connections instead
+of paying the handshake on every request. Clients are created lazily and closed
+on application shutdown.
+"""
+
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import importlib.util
+import logging
+
+import httpx
+
+from app.core.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _origin(base_url: str) -> str:
+    """Normalise a URL to its scheme://host[:port] origin"""
+    parts = urlsplit(base_url)
+    if not parts.scheme or not parts.netloc:
+        raise ValueError(f"Invalid base URL for HTTP client: {base_url!r}")
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class HTTPClientRegistry:
+    """
+    Process-wide registry of pooled AsyncClients keyed by upstream origin.
+
+    An AsyncClient is bound to the event loop it was first used on, so the
+    registry also tracks the owning loop and transparently replaces clients
+    when called from a different loop (e.g. scripts using asyncio.run twice).
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        wants_http2 = settings.HTTP2_ENABLED if http2 is None else http2
+        if wants_http2 and not _HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; falling back to HTTP/1.1")
+        self.http2 = bool(wants_http2 and _HTTP2_AVAILABLE)
+        self._clients: Dict[str, Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        """Return the shared client for the origin of ``base_url``"""
+        key = _origin(base_url)
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(key)
+        if entry is not None:
+            client, owner_loop = entry
+            if not client.is_closed and owner_loop is loop:
+                return client
+            self._retire(key, client, owner_loop)
+
+        client = httpx.AsyncClient(
+            limits=self.limits,
+            http2=self.http2,
+            timeout=httpx.Timeout(settings.API_TIMEOUT_MS / 1000 if settings.API_TIMEOUT_MS else 60),
+        )
+        self._clients[key] = (client, loop)
+        logger.info("Created pooled HTTP client for %s (http2=%s)", key, self.http2)
+        return client
+
+    @staticmethod
+    def _retire(key: str, client: httpx.AsyncClient, owner_loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Release a client that is being replaced because its loop changed.
+
+        The client can only be closed on its own loop: if that loop is still
+        running (another thread), the close is scheduled there; otherwise the
+        loop is gone and its connections can no longer be closed gracefully.
+        """
+        if client.is_closed:
+            return
+        if owner_loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), owner_loop)
+            logger.info("Closing pooled HTTP client for %s on its previous event loop", key)
+        else:
+            logger.warning(
+                "Discarding pooled HTTP client for %s: its event loop is no longer running, "
+                "close clients with close_http_clients() before the loop exits", key
+            )
+
+    async def aclose(self) -> None:
+        """Close every pooled client owned by the current event loop"""
+        loop = asyncio.get_running_loop()
+        clients = list(self._clients.items())
+        self._clients.clear()
+        for key, (client, owner_loop) in clients:
+            if client.is_closed or owner_loop is not loop:
+                continue
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP client for {key}: {e}")
+
+
+http_client_registry = HTTPClientRegistry()
+
+
+def get_http_client(base_url: str) -> httpx.AsyncClient:
+    """Get the pooled AsyncClient for an upstream base URL"""
+    return http_client_registry.get(base_url)
+
+
+async def close_http_clients() -> None:
+    """Close all pooled clients. Called on application shutdown."""
+    await http_client_registry.aclose()
@@ -17,6 +17,7 @@ from pathlib import Path
 
 from app.core.config import settings
 from app.core.db.session import init_db
+from app.core.http import close_http_clients
 from app.common.exceptions.base import http_exception_from_wanderflow_exception, WanderFlowException
 from app.modules.users.api.v1 import router as users_router
 from app.modules.users.api.settings import router as users_settings_router
@@ -24,6 +25,7 @@ from app.modules.planner.api.v1 import router as planner_router
 from app.modules.qa.api.v1 import router as qa_router
 from app.modules.copywriter.api.v1 import router as copywriter_router
 from app.modules.qa.rag.knowledge_base import get_knowledge_base
+from app.modules.qa.rag.ingest import shutdown_ingest_executor
 
 # 设置stdout和stderr的编码为UTF-8
 if sys.platform == 'win32':
@@ -115,6 +117,15 @@ async def startup_event():
         logger.info(f"Static files mounted at /static -> {static_dir}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled resources on shutdown"""
+    logger.info("Shutting down WanderFlow backend...")
+    await close_http_clients()
+    logger.info("Pooled HTTP clients closed")
+    shutdown_ingest_executor()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -0,0 +1,303 @@
+"""
+Single-pass tolerant JSON repair for model output.
+
+:func:`repair_json` walks the text once, left to right, and re-emits it as
+strict JSON. It keeps a stack of open containers together with what each
+one expects next (key, colon, value or comma), so the usual model mistakes
+are fixed where they occur instead of by whole-string regex rounds:
+
+- unquoted or single-quoted keys and values, Chinese quotes as delimiters
+- missing or trailing commas, missing colons, keys without a value
+- raw newlines and unescaped quotes inside strings, invalid escapes
+- ``//`` and ``/* */`` comments, Python literals (``True``/``None``)
+- truncated tails: open strings and containers are closed at the end
+
+Text before the first ``{`` and after the root value closes (markdown
+fences, explanations) is ignored.
+"""
+
+import json
+import re
+from typing import Any, List, Optional
+
+# 对象状态：等待键、等待冒号、等待值、值之后（等待逗号或结束）
+_KEY, _COLON, _VALUE, _AFTER = range(4)
+
+_WHITESPACE = re.compile(r"[ \t\r\n\ufeff\u00a0\u3000]*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_BARE_KEY_END = re.compile(r"[:,{}\[\]\"\n]")
+_BARE_VALUE_END = re.compile(r"[,{}\[\]\n]|\s[\"“]|\s//|/\*")
+_VALID_ESCAPES = frozenset('"\\/bfnrtu')
+_HEX = frozenset("0123456789abcdefABCDEF")
+_LITERALS = {"true": "true", "false": "false", "null": "null", "none": "null", "nan": "null", "undefined": "null"}
+
+# 开引号 -> 可作为结束的引号
+_QUOTES = {
+    '"': '"',
+    "'": "'",
+    "“": "”\"",
+    "”": "”\"",
+    "‘": "’'",
+    "「": "」",
+}
+# 字符串内需要逐个处理的字符：结束引号候选、ASCII 引号、转义符和控制字符
+_STRING_SPECIAL = {
+    opener: re.compile("[" + re.escape(closers + '"') + r"\\\x00-\x1f]")
+    for opener, closers in _QUOTES.items()
+}
+_CLOSING_FOLLOWERS = frozenset(",:}]")
+_ESCAPE_CONTROL = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+
+
+class _Repairer:
+    def __init__(self, text: str):
+        self.text = text
+        self.length = len(text)
+        self.out: List[str] = []
+        # 每个容器：[括号类型, 状态]；数组只使用 _VALUE / _AFTER
+        self.stack: List[List[Any]] = []
+        # 栈中每种括号的数量，遇到闭括号时不必扫描整个栈
+        self.open_counts = {"{": 0, "[": 0}
+
+    # ------------------------------------------------------------------
+    # 扫描工具
+    # ------------------------------------------------------------------
+    def _skip_whitespace(self, pos: int) -> int:
+        return _WHITESPACE.match(self.text, pos).end()
+
+    def _skip_comment(self, pos: int) -> Optional[int]:
+        """pos 处是注释时返回注释之后的位置"""
+        text = self.text
+        if text.startswith("//", pos):
+            end = text.find("\n", pos)
+            return self.length if end < 0 else end + 1
+        if text.startswith("/*", pos):
+            end = text.find("*/", pos + 2)
+            return self.length if end < 0 else end + 2
+        return None
+
+    def _closes_string(self, pos: int) -> bool:
+        """引号之后是结构字符、空白后的新引号或文本结束时，才视为字符串结束"""
+        text = self.text
+        after = self._skip_whitespace(pos + 1)
+        if after >= self.length:
+            return True
+        char = text[after]
+        if char in _CLOSING_FOLLOWERS:
+            return True
+        if char in _QUOTES and after > pos + 1:
+            # 引号之间隔着空白：前一个值后面缺少逗号
+            return True
+        return False
+
+    def _read_string(self, pos: int) -> (str, int):
+        """读取 pos 处引号开始的字符串，返回 (JSON 字符串, 结束后的位置)"""
+        text = self.text
+        closers = _QUOTES[text[pos]]
+        special = _STRING_SPECIAL[text[pos]]
+        parts = ['"']
+        pos += 1
+        while True:
+            match = special.search(text, pos)
+            if match is None:
+                # 截断：补上结束引号
+                parts.append(text[pos:])
+                parts.append('"')
+                return "".join(parts), self.length
+            index = match.start()
+            parts.append(text[pos:index])
+            char = text[index]
+            if char == "\\":
+                nxt = text[index + 1] if index + 1 < self.length else ""
+                if nxt == "u" and all(c in _HEX for c in text[index + 2:index + 6]) and index + 6 <= self.length:
+                    parts.append(text[index:index + 6])
+                    pos = index + 6
+                elif nxt in _VALID_ESCAPES and nxt != "u" and nxt:
+                    parts.append(text[index:index + 2])
+                    pos = index + 2
+                elif nxt:
+                    # 非法转义（如 \' 或 \x）：保留字符本身
+                    parts.append(json.dumps(nxt)[1:-1])
+                    pos = index + 2
+                else:
+                    pos = index + 1
+                continue
+            if char in closers and self._closes_string(index):
+                parts.append('"')
+                return "".join(parts), index + 1
+            if char == '"':
+                parts.append('\\"')
+            elif char < " ":
+                parts.append(_ESCAPE_CONTROL.get(char, "\\u%04x" % ord(char)))
+            else:
+                # 不作为结束的中文引号等，原样保留
+                parts.append(char)
+            pos = index + 1
+
+    def _read_bare(self, pos: int, as_key: bool) -> (Optional[str], int):
+        """读取未加引号的键或值"""
+        pattern = _BARE_KEY_END if as_key else _BARE_VALUE_END
+        match = pattern.search(self.text, pos)
+        end = match.start() if match else self.length
+        token = self.text[pos:end].strip()
+        if not token:
+            return None, end
+        if as_key:
+            return json.dumps(token, ensure_ascii=False), end
+        if _NUMBER.fullmatch(token):
+            return token, end
+        literal = _LITERALS.get(token.lower())
+        if literal:
+            return literal, end
+        return json.dumps(token, ensure_ascii=False), end
+
+    # ------------------------------------------------------------------
+    # 输出
+    # ------------------------------------------------------------------
+    def _before_value(self) -> bool:
+        """在值之前补齐缺失的冒号/逗号；当前位置不能放值时返回 False"""
+        if not self.stack:
+            return True
+        frame = self.stack[-1]
+        if frame[0] == "[":
+            if frame[1] == _AFTER:
+                self.out.append(",")
+            frame[1] = _AFTER
+            return True
+        if frame[1] == _COLON:
+            self.out.append(":")
+        elif frame[1] != _VALUE:
+            return False
+        frame[1] = _AFTER
+        return True
+
+    def _before_key(self) -> None:
+        frame = self.stack[-1]
+        if frame[1] == _AFTER:
+            self.out.append(",")
+        frame[1] = _COLON
+
+    def _close(self) -> None:
+        kind, state = self.stack.pop()
+        self.open_counts[kind] -= 1
+        if kind == "{":
+            # 只有键没有值
+            if state == _COLON:
+                self.out.append(":null")
+            elif state == _VALUE:
+                self.out.append("null")
+            self.out.append("}")
+        else:
+            self.out.append("]")
+
+    def run(self) -> Optional[str]:
+        text = self.text
+        start = text.find("{")
+        if start < 0:
+            start = text.find("[")
+        if start < 0:
+            return None
+
+        pos = start
+        while pos < self.length:
+            pos = self._skip_whitespace(pos)
+            if pos >= self.length:
+                break
+            char = text[pos]
+
+            comment_end = self._skip_comment(pos)
+            if comment_end is not None:
+                pos = comment_end
+                continue
+
+            frame = self.stack[-1] if self.stack else None
+            expecting_key = frame is not None and frame[0] == "{" and frame[1] in (_KEY, _AFTER)
+
+            if char in "{[":
+                if expecting_key or not self._before_value():
+                    pos += 1
+                    continue
+                self.out.append(char)
+                self.stack.append([char, _KEY if char == "{" else _VALUE])
+                self.open_counts[char] += 1
+                pos += 1
+            elif char in "}]":
+                opener = "{" if char == "}" else "["
+                if self.open_counts[opener]:
+                    # 括号不匹配时先关闭内层容器
+                    while self.stack[-1][0] != opener:
+                        self._close()
+                    self._close()
+                pos += 1
+                if not self.stack:
+                    break
+            elif char == ",":
+                # 键后面直接是逗号：补 null 作为值
+                if frame is not None and frame[0] == "{" and frame[1] in (_COLON, _VALUE):
+                    self.out.append(":null" if frame[1] == _COLON else "null")
+                    frame[1] = _AFTER
+                pos += 1
+            elif char == ":":
+                if frame is not None and frame[0] == "{" and frame[1] == _COLON:
+                    self.out.append(":")
+                    frame[1] = _VALUE
+                pos += 1
+            elif char in _QUOTES:
+                token, pos = self._read_string(pos)
+                if expecting_key:
+                    self._before_key()
+                    self.out.append(token)
+                elif self._before_value():
+                    self.out.append(token)
+            else:
+                token, pos = self._read_bare(pos, as_key=expecting_key)
+                if token is None:
+                    continue
+                if expecting_key:
+                    self._before_key()
+                    self.out.append(token)
+                elif self._before_value():
+                    self.out.append(token)
+
+        # 截断：关闭所有未闭合的容器
+        while self.stack:
+            self._close()
+        return "".join(self.out)
+
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Repair ``text`` into a strict JSON document.
+
+    Returns None when the text contains no ``{`` or ``[`` at all. Text that
+    is already valid JSON is returned as is.
+    """
+    if not text:
+        return None
+    stripped = text.strip()
+    try:
+        json.loads(stripped)
+        return stripped
+    except (json.JSONDecodeError, RecursionError):
+        pass
+    # 代码块或说明文字包裹的有效 JSON：直接截取最外层对象
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        candidate = text[start:end + 1]
+        try:
+            json.loads(candidate)
+            return candidate
+        except (json.JSONDecodeError, RecursionError):
+            pass
+    return _Repairer(text).run()
+
+
+def loads_tolerant(text: str) -> Any:
+    """Parse model output as JSON, repairing it if needed; raises ValueError."""
+    repaired = repair_json(text)
+    if repaired is None:
+        raise ValueError("no JSON object found")
+    try:
+        return json.loads(repaired)
+    except RecursionError:
+        raise ValueError("JSON nested too deeply") from None
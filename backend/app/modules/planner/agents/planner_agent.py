@@ -6,10 +6,11 @@ This module contains AI agent responsible for generating travel itineraries.
 It uses LLM to create intelligent, personalized travel plans with rich practical information.
 """
 
-from typing import List, Dict, Any, Optional
-from app.core.ai.factory import LLMFactory
+from typing import AsyncIterator, List, Dict, Any, Optional
+from app.core.ai.factory import LLMFactory, CACHE_OFF, CACHE_READ_WRITE, CACHE_WRITE
+from app.modules.planner.agents.json_repair import repair_json
 from app.core.config.settings import settings
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from app.modules.planner.prompts.planning_prompts import (
     PLANNING_SYSTEM_PROMPT,
     STRICT_JSON_OUTPUT,
@@ -18,8 +19,11 @@ from app.modules.planner.prompts.planning_prompts import (
     ADVENTURE_PROMPT,
     FOODIE_PROMPT,
     LEISURE_PROMPT,
-    PRICING_GUIDANCE
+    PRICING_GUIDANCE,
+    SKELETON_JSON_OUTPUT,
+    DAY_DETAIL_PROMPT
 )
+import asyncio
 import logging
 import json
 
@@ -100,27 +104,16 @@ class TravelPlannerAgent:
         Flexible parsing for non-JSON responses.
         Extract structure from text with enhanced error recovery.
         """
-        import re
-
-        # 尝试从文本中提取JSON部分
-        json_pattern = r'\{[\s\S]*\}'
-        matches = re.findall(json_pattern, response)
-
-        if matches:
-            # 尝试从最大的JSON对象开始
-            candidates = sorted(matches, key=len, reverse=True)
-
-            for json_str in candidates:
-                # 尝试修复并解析
-                repaired = self._repair_json(json_str)
-                if repaired:
-                    try:
-                        data = json.loads(repaired)
-                        logger.info(f"Successfully parsed repaired JSON (length: {len(repaired)})")
-                        return data
-                    except json.JSONDecodeError as e:
-                        logger.debug(f"Failed to parse repaired JSON: {e}")
-                        continue
+        # 单遍修复：补逗号/引号、去尾逗号、闭合截断的结尾
+        repaired = repair_json(response)
+        if repaired:
+            try:
+                data = json.loads(repaired)
+                if isinstance(data, dict):
+                    logger.info(f"Successfully parsed repaired JSON (length: {len(repaired)})")
+                    return data
+            except json.JSONDecodeError as e:
+                logger.debug(f"Failed to parse repaired JSON: {e}")
 
         # 如果完全失败，返回基础结构
         logger.warning("Flexible parse failed, returning basic structure")
@@ -132,80 +125,6 @@ class TravelPlannerAgent:
             "tips": {}
         }
 
-    def _repair_json(self, json_str: str) -> Optional[str]:
-        """
-        Attempt to repair malformed JSON.
-
-        Args:
-            json_str: Potentially malformed JSON string
-
-        Returns:
-            Repaired JSON string or None if repair failed
-        """
-        import re
-
-        try:
-            # 先尝试直接解析
-            json.loads(json_str)
-            return json_str
-        except json.JSONDecodeError:
-            pass
-
-        # 常见修复策略
-        repairs = [
-            # 0. 替换中文引号为英文引号
-            (r'"', '"'),
-            (r'"', '"'),
-
-            # 1. 修复缺少的逗号（在 } 和 " 之间）
-            (r'}\s*"', '},"'),
-
-            # 2. 修复缺少的逗号（在 ] 和 " 之间）
-            (r']\s*"', '],"'),
-
-            # 3. 修复缺少的逗号（在 " 和 { 之间）
-            (r'"\s*\{', '",{'),
-
-            # 4. 修复缺少的逗号（在数字和 " 之间）
-            (r'(\d)\s*"', r'\1,"'),
-
-            # 5. 修复缺少的逗号（在 true/false 和 " 之间）
-            (r'(true|false)\s*"', r'\1,"'),
-
-            # 6. 修复缺少的逗号（在 ] 和 } 之间）
-            (r']\s*}', ']}'),
-
-            # 7. 移除多余的逗号（在 } 和 ] 之前）
-            (r',\s*}', '}'),
-            (r',\s*]', ']'),
-
-            # 8. 修复缺少的引号（在键名周围）
-            (r'(\w+)\s*:', r'"\1":'),
-
-            # 9. 修复单引号转换为双引号
-            (r"'([^']*)'", r'"\1"'),
-        ]
-
-        repaired = json_str
-
-        # 应用所有修复策略（最多尝试多轮）
-        for _ in range(3):
-            original = repaired
-            for pattern, replacement in repairs:
-                repaired = re.sub(pattern, replacement, repaired)
-
-            # 尝试解析
-            try:
-                json.loads(repaired)
-                return repaired
-            except json.JSONDecodeError:
-                # 如果没有变化，跳出循环
-                if repaired == original:
-                    break
-
-        # 如果所有修复都失败，返回 None
-        return None
-
     def _build_user_prompt(
         self,
         destination: str,
@@ -248,6 +167,145 @@ class TravelPlannerAgent:
 
         return prompt
 
+    def _build_itinerary_messages(
+        self,
+        destination: str,
+        days: int,
+        budget: float,
+        travel_style: str,
+        departure: str = None,
+        preferences: Dict[str, Any] = None,
+        output_prompt: Optional[str] = None
+    ) -> List[BaseMessage]:
+        """Build the system and user messages for itinerary generation."""
+        # 构建用户提示
+        user_input = self._build_user_prompt(
+            destination=destination,
+            days=days,
+            budget=budget,
+            travel_style=travel_style,
+            departure=departure,
+            preferences=preferences
+        )
+
+        # 添加JSON输出要求
+        if output_prompt:
+            user_input += "\n\n" + output_prompt
+        elif self.use_strict_json:
+            user_input += "\n\n" + STRICT_JSON_OUTPUT
+        else:
+            user_input += "\n\n" + FLEXIBLE_JSON_OUTPUT
+
+        return [
+            SystemMessage(content=self._build_system_content(travel_style)),
+            HumanMessage(content=user_input)
+        ]
+
+    def _build_system_content(self, travel_style: str) -> str:
+        """构建系统消息（包含风格提示）"""
+        system_content = PLANNING_SYSTEM_PROMPT
+        style_prompt = self._get_style_prompt(travel_style)
+        if style_prompt:
+            system_content += "\n\n" + style_prompt
+        return system_content
+
+    @staticmethod
+    def apply_day_defaults(day: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in per-day cost and per-activity defaults in place."""
+        if "total_cost" not in day:
+            # 计算当天的花费
+            day_cost = 0
+            for activity in day.get("activities", []):
+                day_cost += activity.get("average_cost", 0)
+            day["total_cost"] = day_cost
+
+        # 确保每个活动都有必要的字段
+        for activity in day.get("activities", []):
+            if "tips" not in activity or not activity["tips"]:
+                activity["tips"] = ["建议提前查看开放时间"]
+            if "average_cost" not in activity:
+                activity["average_cost"] = 0
+        return day
+
+    def complete_itinerary(
+        self,
+        response: str,
+        destination: str,
+        days: int
+    ) -> Dict[str, Any]:
+        """
+        Parse a complete AI response and fill in missing fields.
+
+        Args:
+            response: Raw AI response
+            destination: Travel destination
+            days: Number of days
+
+        Returns:
+            Structured itinerary data
+        """
+        # 解析响应为结构化行程数据
+        itinerary_data = self._parse_ai_response(response)
+        return self.fill_itinerary_defaults(itinerary_data, destination, days)
+
+    def fill_itinerary_defaults(
+        self,
+        itinerary_data: Dict[str, Any],
+        destination: str,
+        days: int
+    ) -> Dict[str, Any]:
+        """Fill in trip-level and per-day defaults the AI did not generate."""
+        # 补充必填字段（如果AI未生成）
+        if "title" not in itinerary_data:
+            itinerary_data["title"] = f"{destination}{days}日游"
+        if "summary" not in itinerary_data:
+            itinerary_data["summary"] = f"{destination}{days}天深度游，体验当地特色"
+        if "highlights" not in itinerary_data:
+            itinerary_data["highlights"] = [f"探索{destination}的精华"]
+        if "best_season" not in itinerary_data:
+            itinerary_data["best_season"] = "全年适宜"
+        if "weather" not in itinerary_data:
+            itinerary_data["weather"] = "请根据当地天气预报准备衣物"
+
+        # 计算总花费
+        if "actual_cost" not in itinerary_data and "cost_breakdown" in itinerary_data:
+            cost_breakdown = itinerary_data["cost_breakdown"]
+            total_cost = (
+                cost_breakdown.get("transportation", 0) +
+                cost_breakdown.get("accommodation", 0) +
+                cost_breakdown.get("food", 0) +
+                cost_breakdown.get("tickets", 0) +
+                cost_breakdown.get("shopping", 0) +
+                cost_breakdown.get("other", 0)
+            )
+            itinerary_data["actual_cost"] = total_cost
+
+        # 为每天添加默认值
+        for day in itinerary_data.get("days", []):
+            self.apply_day_defaults(day)
+
+        # 添加默认的行前准备（如果AI未生成）
+        if "preparation" not in itinerary_data or not itinerary_data["preparation"]:
+            itinerary_data["preparation"] = {
+                "documents": ["身份证"],
+                "essentials": ["手机", "充电器", "现金"],
+                "suggestions": ["相机", "雨伞"],
+                "booking_reminders": ["建议提前预订住宿和交通"]
+            }
+
+        # 添加默认的实用提示（如果AI未生成）
+        if "tips" not in itinerary_data or not itinerary_data["tips"]:
+            itinerary_data["tips"] = {
+                "transportation": f"建议使用当地交通工具游览{destination}",
+                "accommodation": "建议选择市中心或景点附近的住宿",
+                "food": f"可以尝试{destination}当地特色美食",
+                "shopping": "购买特产建议去正规商店",
+                "safety": "注意保管好随身财物",
+                "other": ["建议购买旅游保险", "保持手机电量充足"]
+            }
+
+        return itinerary_data
+
     async def generate_itinerary(
         self,
         destination: str,
@@ -255,7 +313,8 @@ class TravelPlannerAgent:
         budget: float,
         travel_style: str,
         departure: str = None,
-        preferences: Dict[str, Any] = None
+        preferences: Dict[str, Any] = None,
+        reuse_similar: bool = False
     ) -> Dict[str, Any]:
         """
         Generate a travel itinerary using AI.
@@ -267,12 +326,12 @@ class TravelPlannerAgent:
             travel_style: Travel style (leisure, adventure, foodie)
             departure: Departure location
             preferences: Additional preferences
+            reuse_similar: Serve a cached response for an identical prompt if available
 
         Returns:
             Generated itinerary data with daily details and practical information
         """
-        # 构建用户提示
-        user_input = self._build_user_prompt(
+        messages = self._build_itinerary_messages(
             destination=destination,
             days=days,
             budget=budget,
@@ -281,95 +340,13 @@ class TravelPlannerAgent:
             preferences=preferences
         )
 
-        # 获取风格特定的提示
-        style_prompt = self._get_style_prompt(travel_style)
-
-        # 添加JSON输出要求
-        if self.use_strict_json:
-            user_input += "\n\n" + STRICT_JSON_OUTPUT
-        else:
-            user_input += "\n\n" + FLEXIBLE_JSON_OUTPUT
-
-        # 构建系统消息（包含风格提示）
-        system_content = PLANNING_SYSTEM_PROMPT
-        if style_prompt:
-            system_content += "\n\n" + style_prompt
-
-        # 生成行程
-        messages = [
-            SystemMessage(content=system_content),
-            HumanMessage(content=user_input)
-        ]
-
         try:
             logger.info(f"Generating itinerary for {destination}, {days} days, style: {travel_style}")
-            response = await LLMFactory.agenerate(self.llm, messages)
+            response = await LLMFactory.agenerate(self.llm, messages, cache=self._cache_policy(reuse_similar))
             logger.info(f"AI response received, length: {len(response)}")
             logger.info(f"AI response (first 500 chars): {response[:500]}...")
 
-            # 解析响应为结构化行程数据
-            itinerary_data = self._parse_ai_response(response)
-
-            # 补充必填字段（如果AI未生成）
-            if "title" not in itinerary_data:
-                itinerary_data["title"] = f"{destination}{days}日游"
-            if "summary" not in itinerary_data:
-                itinerary_data["summary"] = f"{destination}{days}天深度游，体验当地特色"
-            if "highlights" not in itinerary_data:
-                itinerary_data["highlights"] = [f"探索{destination}的精华"]
-            if "best_season" not in itinerary_data:
-                itinerary_data["best_season"] = "全年适宜"
-            if "weather" not in itinerary_data:
-                itinerary_data["weather"] = "请根据当地天气预报准备衣物"
-
-            # 计算总花费
-            if "actual_cost" not in itinerary_data and "cost_breakdown" in itinerary_data:
-                cost_breakdown = itinerary_data["cost_breakdown"]
-                total_cost = (
-                    cost_breakdown.get("transportation", 0) +
-                    cost_breakdown.get("accommodation", 0) +
-                    cost_breakdown.get("food", 0) +
-                    cost_breakdown.get("tickets", 0) +
-                    cost_breakdown.get("shopping", 0) +
-                    cost_breakdown.get("other", 0)
-                )
-                itinerary_data["actual_cost"] = total_cost
-
-            # 为每天添加默认值
-            for day in itinerary_data.get("days", []):
-                if "total_cost" not in day:
-                    # 计算当天的花费
-                    day_cost = 0
-                    for activity in day.get("activities", []):
-                        day_cost += activity.get("average_cost", 0)
-                    day["total_cost"] = day_cost
-
-                # 确保每个活动都有必要的字段
-                for activity in day.get("activities", []):
-                    if "tips" not in activity or not activity["tips"]:
-                        activity["tips"] = ["建议提前查看开放时间"]
-                    if "average_cost" not in activity:
-                        activity["average_cost"] = 0
-
-            # 添加默认的行前准备（如果AI未生成）
-            if "preparation" not in itinerary_data or not itinerary_data["preparation"]:
-                itinerary_data["preparation"] = {
-                    "documents": ["身份证"],
-                    "essentials": ["手机", "充电器", "现金"],
-                    "suggestions": ["相机", "雨伞"],
-                    "booking_reminders": ["建议提前预订住宿和交通"]
-                }
-
-            # 添加默认的实用提示（如果AI未生成）
-            if "tips" not in itinerary_data or not itinerary_data["tips"]:
-                itinerary_data["tips"] = {
-                    "transportation": f"建议使用当地交通工具游览{destination}",
-                    "accommodation": "建议选择市中心或景点附近的住宿",
-                    "food": f"可以尝试{destination}当地特色美食",
-                    "shopping": "购买特产建议去正规商店",
-                    "safety": "注意保管好随身财物",
-                    "other": ["建议购买旅游保险", "保持手机电量充足"]
-                }
+            itinerary_data = self.complete_itinerary(response, destination, days)
 
             logger.info(f"Itinerary generated successfully: {itinerary_data.get('title')}")
             return itinerary_data
@@ -377,20 +354,202 @@ class TravelPlannerAgent:
         except Exception as e:
             logger.error(f"Error generating itinerary: {str(e)}", exc_info=True)
             # 返回基础结构而不是抛出异常
+            return self._fallback_itinerary(destination, days, budget, travel_style, e)
+
+    @staticmethod
+    def _cache_policy(reuse_similar: bool) -> str:
+        """复用模式读取缓存；普通生成总是调用模型，开启缓存时刷新缓存结果"""
+        if reuse_similar:
+            return CACHE_READ_WRITE
+        return CACHE_WRITE if settings.LLM_CACHE_ENABLED else CACHE_OFF
+
+    @staticmethod
+    def _fallback_itinerary(
+        destination: str,
+        days: int,
+        budget: float,
+        travel_style: str,
+        error: Exception
+    ) -> Dict[str, Any]:
+        return {
+            "title": f"{destination}{days}日游",
+            "summary": "行程生成遇到问题，请重试",
+            "destination": destination,
+            "days": days,
+            "budget": budget,
+            "travel_style": travel_style,
+            "highlights": [],
+            "days": [],
+            "preparation": {},
+            "tips": {},
+            "error": str(error)
+        }
+
+    async def generate_itinerary_parallel(
+        self,
+        destination: str,
+        days: int,
+        budget: float,
+        travel_style: str,
+        departure: str = None,
+        preferences: Dict[str, Any] = None,
+        reuse_similar: bool = False,
+        max_concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a travel itinerary with one AI request per day.
+
+        A compact skeleton (trip-level information plus each day's theme,
+        area and budget) is generated first. Every day is then expanded
+        concurrently, at most ``max_concurrency`` requests at a time, and
+        merged into the same structure :meth:`generate_itinerary` returns.
+        A day whose request fails keeps its skeleton instead of failing the
+        whole trip.
+
+        Args:
+            destination: Travel destination
+            days: Number of days
+            budget: Budget in CNY
+            travel_style: Travel style (leisure, adventure, foodie)
+            departure: Departure location
+            preferences: Additional preferences
+            reuse_similar: Serve cached responses for identical prompts if available
+            max_concurrency: Day requests in flight (defaults to PLANNER_DAY_CONCURRENCY)
+
+        Returns:
+            Generated itinerary data with daily details and practical information
+        """
+        cache_policy = self._cache_policy(reuse_similar)
+        try:
+            logger.info(f"Generating itinerary skeleton for {destination}, {days} days, style: {travel_style}")
+            messages = self._build_itinerary_messages(
+                destination=destination,
+                days=days,
+                budget=budget,
+                travel_style=travel_style,
+                departure=departure,
+                preferences=preferences,
+                output_prompt=SKELETON_JSON_OUTPUT
+            )
+            response = await LLMFactory.agenerate(self.llm, messages, cache=cache_policy)
+            skeleton = self._parse_ai_response(response)
+            day_plans = self._normalize_skeleton_days(skeleton.get("days"), days)
+
+            semaphore = asyncio.Semaphore(max(1, max_concurrency or settings.PLANNER_DAY_CONCURRENCY))
+
+            async def expand(day_plan: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._generate_day_detail(
+                        skeleton, day_plan, day_plans, destination, days, travel_style, cache_policy
+                    )
+
+            skeleton["days"] = list(await asyncio.gather(*(expand(day_plan) for day_plan in day_plans)))
+            itinerary_data = self.fill_itinerary_defaults(skeleton, destination, days)
+
+            logger.info(f"Parallel itinerary generated successfully: {itinerary_data.get('title')}")
+            return itinerary_data
+
+        except Exception as e:
+            logger.error(f"Error generating itinerary in parallel: {str(e)}", exc_info=True)
+            return self._fallback_itinerary(destination, days, budget, travel_style, e)
+
+    @staticmethod
+    def _normalize_skeleton_days(raw_days: Any, days: int) -> List[Dict[str, Any]]:
+        """按 day_number 对齐骨架，缺失的天补一个只有编号的骨架"""
+        by_number: Dict[int, Dict[str, Any]] = {}
+        for index, day in enumerate(raw_days if isinstance(raw_days, list) else [], start=1):
+            if not isinstance(day, dict):
+                continue
+            day_number = day.get("day_number")
+            if not isinstance(day_number, int):
+                day_number = index
+            by_number.setdefault(day_number, {**day, "day_number": day_number})
+        return [by_number.get(number, {"day_number": number, "title": f"第{number}天"}) for number in range(1, days + 1)]
+
+    async def _generate_day_detail(
+        self,
+        skeleton: Dict[str, Any],
+        day_plan: Dict[str, Any],
+        day_plans: List[Dict[str, Any]],
+        destination: str,
+        days: int,
+        travel_style: str,
+        cache_policy: str
+    ) -> Dict[str, Any]:
+        day_number = day_plan["day_number"]
+        other_days = "；".join(
+            f"第{plan['day_number']}天 {plan.get('title', '')}：{'、'.join(map(str, plan.get('focus') or []))}"
+            for plan in day_plans if plan["day_number"] != day_number
+        )
+        prompt = DAY_DETAIL_PROMPT.format(
+            destination=destination,
+            total_days=days,
+            day_number=day_number,
+            title=skeleton.get("title") or f"{destination}{days}日游",
+            travel_style=travel_style,
+            day_skeleton=json.dumps(day_plan, ensure_ascii=False),
+            other_days=other_days or "无"
+        )
+        messages = [
+            SystemMessage(content=self._build_system_content(travel_style)),
+            HumanMessage(content=prompt)
+        ]
+
+        try:
+            response = await LLMFactory.agenerate(self.llm, messages, cache=cache_policy)
+            detail = self._parse_ai_response(response)
+        except Exception as e:
+            logger.warning(f"Day {day_number} detail generation failed: {e}")
+            detail = {}
+
+        # 模型偶尔仍按完整行程格式返回，取出其中对应的那一天
+        if "activities" not in detail and isinstance(detail.get("days"), list):
+            detail = next(
+                (day for day in detail["days"] if isinstance(day, dict) and day.get("day_number") == day_number),
+                detail["days"][0] if detail["days"] and isinstance(detail["days"][0], dict) else {}
+            )
+        if not detail.get("activities"):
+            logger.warning(f"Day {day_number} detail is empty, keeping the skeleton")
             return {
-                "title": f"{destination}{days}日游",
-                "summary": "行程生成遇到问题，请重试",
-                "destination": destination,
-                "days": days,
-                "budget": budget,
-                "travel_style": travel_style,
-                "highlights": [],
-                "days": [],
-                "preparation": {},
-                "tips": {},
-                "error": str(e)
+                "day_number": day_number,
+                "title": day_plan.get("title") or f"第{day_number}天",
+                "summary": day_plan.get("area"),
+                "activities": [],
+                "notes": "该天详情生成失败，可重新生成行程"
             }
 
+        detail["day_number"] = day_number
+        detail.setdefault("title", day_plan.get("title") or f"第{day_number}天")
+        return detail
+
+    async def astream_itinerary(
+        self,
+        destination: str,
+        days: int,
+        budget: float,
+        travel_style: str,
+        departure: str = None,
+        preferences: Dict[str, Any] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the raw AI response for an itinerary.
+
+        The caller accumulates the chunks and passes the full text to
+        :meth:`complete_itinerary` once the stream ends.
+        """
+        messages = self._build_itinerary_messages(
+            destination=destination,
+            days=days,
+            budget=budget,
+            travel_style=travel_style,
+            departure=departure,
+            preferences=preferences
+        )
+        logger.info(f"Streaming itinerary for {destination}, {days} days, style: {travel_style}")
+        async for chunk in LLMFactory.astream_generate(self.llm, messages):
+            if chunk:
+                yield chunk
+
     async def optimize_itinerary(
         self,
         current_itinerary: Dict[str, Any],
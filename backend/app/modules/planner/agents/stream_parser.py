@@ -0,0 +1,174 @@
+"""
+Incremental JSON parser for streamed itineraries.
+
+Scans the model output as it arrives and returns every element of the
+root object's ``days`` array as soon as its closing brace is seen, so each
+day can be post-processed while later days are still being generated.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 字符串外只需要关心这些结构字符；字符串内只需要关心引号和转义
+_STRUCTURAL = re.compile(r'[{}\[\],:"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class IncrementalDaysParser:
+    """
+    Feed text chunks with :meth:`feed`; each call returns ``(position, day)``
+    pairs for the day objects completed by that chunk, where ``position`` is
+    the 1-based index of the object in the ``days`` array.
+
+    Text before the root ``{`` (markdown fences, preambles) and after the
+    root closes is ignored. Day objects that are not valid strict JSON are
+    skipped; the caller re-parses the full text with the tolerant parser
+    once the stream ends and picks them up there.
+    """
+
+    def __init__(self, array_key: str = "days"):
+        self.array_key = array_key
+        self._chunks: List[str] = []
+        # 只保留尚未扫描完的文本窗口（当前这一天的起点之后），避免长输出反复拼接
+        self._window = ""
+        self._pos = 0
+        # 容器栈：(括号类型, 该容器在父对象中的键)
+        self._stack: List[Tuple[str, Optional[str]]] = []
+        self._root_closed = False
+        self._in_string = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._expect_key = False
+        self._pending_key: Optional[str] = None
+        self._day_start: Optional[int] = None
+        # 数组中已开始的天数（含解析失败而跳过的天），用作缺少 day_number 时的编号
+        self._day_position = 0
+        self.days_emitted = 0
+        self.days_skipped = 0
+
+    @property
+    def text(self) -> str:
+        """目前收到的全部文本"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> List[Tuple[int, Dict[str, Any]]]:
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        if self._root_closed:
+            return []
+
+        # 丢弃窗口中已经不再需要的前缀，并平移记录的位置
+        keep = self._pos
+        if self._day_start is not None:
+            keep = min(keep, self._day_start)
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        if keep:
+            self._window = self._window[keep:]
+            self._pos -= keep
+            self._string_start -= keep
+            if self._day_start is not None:
+                self._day_start -= keep
+        self._window += chunk
+        return self._scan(self._window)
+
+    def _in_days_array(self) -> bool:
+        return len(self._stack) == 2 and self._stack[1] == ("[", self.array_key)
+
+    def _scan(self, text: str) -> List[Tuple[int, Dict[str, Any]]]:
+        completed: List[Tuple[int, Dict[str, Any]]] = []
+        pos = self._pos
+        end = len(text)
+
+        while pos < end:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    pos = end
+                    break
+                index = match.start()
+                if text[index] == "\\":
+                    if index + 1 >= end:
+                        # 转义符在块末尾，等下一块再处理
+                        pos = index
+                        break
+                    pos = index + 2
+                    continue
+                self._in_string = False
+                if self._string_is_key:
+                    try:
+                        self._pending_key = json.loads(text[self._string_start:index + 1])
+                    except json.JSONDecodeError:
+                        self._pending_key = None
+                pos = index + 1
+                continue
+
+            if not self._stack:
+                # 根对象开始前的内容（代码块标记、说明文字）直接跳过
+                index = text.find("{", pos)
+                if index < 0:
+                    pos = end
+                    break
+                self._stack.append(("{", None))
+                self._expect_key = True
+                pos = index + 1
+                continue
+
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                pos = end
+                break
+            index = match.start()
+            char = text[index]
+            pos = index + 1
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+                self._string_is_key = self._stack[-1][0] == "{" and self._expect_key
+            elif char in "{[":
+                key = self._pending_key if self._stack[-1][0] == "{" else None
+                if char == "{" and self._in_days_array():
+                    self._day_start = index
+                    self._day_position += 1
+                self._stack.append((char, key))
+                self._pending_key = None
+                self._expect_key = char == "{"
+            elif char in "}]":
+                opener, _key = self._stack.pop()
+                if opener == "{" and self._day_start is not None and self._in_days_array():
+                    day = self._decode_day(text[self._day_start:index + 1])
+                    if day is not None:
+                        completed.append((self._day_position, day))
+                    self._day_start = None
+                self._expect_key = False
+                if not self._stack:
+                    self._root_closed = True
+                    pos = end
+                    break
+            elif char == ",":
+                self._expect_key = self._stack[-1][0] == "{"
+            elif char == ":":
+                self._expect_key = False
+
+        self._pos = pos
+        return completed
+
+    def _decode_day(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            day = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.days_skipped += 1
+            logger.debug(f"Streamed day is not strict JSON, deferring to final parse: {e}")
+            return None
+        if not isinstance(day, dict):
+            return None
+        self.days_emitted += 1
+        return day
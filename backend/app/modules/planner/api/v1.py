@@ -1,20 +1,33 @@
 """
 Travel Planner API Routes (v1)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from typing import Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Body
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.db.session import get_db
 from app.core.security.deps import get_current_user
-from app.modules.planner.schemas.plan_schema import PlanCreate, PlanUpdate, PlanResponse
+from app.modules.planner.schemas.plan_schema import PlanCreate, PlanUpdate, PlanResponse, PlanSummaryPage
 from app.modules.planner.services.plan_service import PlanService
+from app.modules.planner.services.pdf_export import (
+    EXPORT_FAILED,
+    EXPORT_PENDING,
+    EXPORT_READY,
+    get_pdf_renderer,
+    parse_export_id,
+)
 from app.modules.users.services.quota_service import QuotaService
+import json
 
 router = APIRouter()
 
 
 class GenerateDetailRequest(BaseModel):
     use_strict_json: bool = Field(True, description="是否使用严格JSON格式")
+    reuse_similar: bool = Field(False, description="是否复用相同条件下已生成的行程")
+    parallel: bool = Field(False, description="是否按天并行生成（适合长行程）")
 
 
 class OptimizeRequest(BaseModel):
@@ -52,11 +65,45 @@ async def generate_detailed_itinerary(
     itinerary = await plan_service.generate_detailed_itinerary(
         current_user.id, 
         itinerary_id, 
-        request.use_strict_json
+        request.use_strict_json,
+        request.reuse_similar,
+        request.parallel
     )
     return itinerary
 
 
+@router.post("/itineraries/{itinerary_id}/generate-detail/stream")
+async def stream_detailed_itinerary(
+    itinerary_id: int,
+    request: GenerateDetailRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """流式生成详细行程（SSE，每天生成并落库后立即推送）"""
+    plan_service = PlanService(db)
+    itinerary = await plan_service.plan_dao.get_plan_by_id(itinerary_id, current_user.id)
+    if not itinerary:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Itinerary not found")
+
+    async def generate_stream():
+        async for event in plan_service.stream_detailed_itinerary(
+            current_user.id,
+            itinerary,
+            request.use_strict_json
+        ):
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @router.post("/itineraries/{itinerary_id}/optimize", response_model=PlanResponse)
 async def optimize_itinerary(
     itinerary_id: int,
@@ -91,6 +138,18 @@ async def get_my_itineraries(
     return result
 
 
+@router.get("/itineraries/summary", response_model=PlanSummaryPage)
+async def get_my_itinerary_summaries(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user),
+    size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """获取我的行程摘要列表（游标分页，详情通过 /itineraries/{id} 获取）"""
+    plan_service = PlanService(db)
+    return await plan_service.get_user_itinerary_summaries(user_id=current_user.id, size=size, cursor=cursor)
+
+
 @router.get("/itineraries/{itinerary_id}", response_model=PlanResponse)
 async def get_itinerary(
     itinerary_id: int,
@@ -133,6 +192,19 @@ async def delete_itinerary(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Itinerary not found")
 
 
+def _pdf_file_response(path, title: str) -> FileResponse:
+    # URL encode filename to support Chinese characters
+    encoded_filename = quote(f"{title}.pdf", safe='')
+    # 从磁盘分块发送，自动带 Content-Length
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
+        }
+    )
+
+
 @router.get("/itineraries/{itinerary_id}/export/pdf")
 async def export_itinerary_pdf(
     itinerary_id: int,
@@ -140,68 +212,59 @@ async def export_itinerary_pdf(
     current_user = Depends(get_current_user)
 ):
     """导出行程为 PDF"""
-    from app.modules.planner.services.pdf_service import PDFExportService
-    from fastapi.responses import Response
-    from sqlalchemy import select
-    from app.modules.planner.models.itinerary import Itinerary
-
-    # Query database model directly to get metadata_json
-    result = await db.execute(
-        select(Itinerary)
-        .where(Itinerary.id == itinerary_id)
-        .where(Itinerary.user_id == current_user.id)
-    )
-    itinerary = result.scalar_one_or_none()
+    plan_service = PlanService(db)
+    itinerary = await plan_service.plan_dao.get_plan_by_id(itinerary_id, current_user.id)
+    if not itinerary:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Itinerary not found")
+
+    # 在渲染线程池中直接渲染到缓存文件，相同版本的行程直接返回缓存
+    path = await get_pdf_renderer().render_itinerary_file(itinerary)
+    return _pdf_file_response(path, itinerary.title)
 
+
+@router.post("/itineraries/{itinerary_id}/export/pdf/prepare", status_code=status.HTTP_202_ACCEPTED)
+async def prepare_itinerary_pdf(
+    itinerary_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """后台准备 PDF 导出（适合长行程），返回导出任务状态和下载地址；重复调用可轮询状态"""
+    plan_service = PlanService(db)
+    itinerary = await plan_service.plan_dao.get_plan_by_id(itinerary_id, current_user.id)
     if not itinerary:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Itinerary not found")
 
-    # Get metadata from metadata_json
-    metadata = itinerary.metadata_json or {}
-
-    # Convert to dict for PDF service
-    itinerary_dict = {
-        "title": itinerary.title,
-        "destination": itinerary.destination,
-        "departure": itinerary.departure,
-        "days": itinerary.days,
-        "budget": float(itinerary.budget) if itinerary.budget else 0,
-        "travel_style": itinerary.travel_style,
-        "summary": metadata.get("summary", ""),
-        "highlights": metadata.get("highlights", []),
-        "best_season": metadata.get("best_season", ""),
-        "weather": metadata.get("weather", ""),
-        "actual_cost": metadata.get("actual_cost", 0),
-        "cost_breakdown": metadata.get("cost_breakdown", {}),
-        "days_detail": [
-            {
-                "day_number": day.day_number,
-                "title": day.title,
-                "date": day.date,
-                "summary": "",
-                "activities": day.activities if day.activities else [],
-                "total_cost": 0,
-            }
-            for day in itinerary.days_detail
-        ],
-        "preparation": metadata.get("preparation", {}),
-        "tips": metadata.get("tips", {}),
-    }
-
-    # Generate PDF
-    pdf_service = PDFExportService()
-    pdf_bytes = pdf_service.generate_itinerary_pdf(itinerary_dict)
-
-    # Return PDF file
-    # URL encode filename to support Chinese characters
-    from urllib.parse import quote
-    filename = f"{itinerary.title}.pdf"
-    encoded_filename = quote(filename, safe='')
+    export_id, export_status = get_pdf_renderer().prepare(itinerary)
+    download_url = request.url_for(
+        "download_itinerary_pdf_export", itinerary_id=itinerary_id, export_id=export_id
+    ).path
+    return {"export_id": export_id, "status": export_status, "download_url": download_url}
 
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-        }
-    )
+
+@router.get("/itineraries/{itinerary_id}/export/pdf/{export_id}", name="download_itinerary_pdf_export")
+async def download_itinerary_pdf_export(
+    itinerary_id: int,
+    export_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """下载后台准备好的 PDF；仍在渲染时返回 202 和当前状态"""
+    plan_service = PlanService(db)
+    itinerary = await plan_service.plan_dao.get_plan_by_id(itinerary_id, current_user.id)
+    if not itinerary or parse_export_id(export_id) != itinerary_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export not found")
+
+    renderer = get_pdf_renderer()
+    export_status = renderer.export_status(export_id)
+    if export_status == EXPORT_READY:
+        return _pdf_file_response(renderer.cache.path_for(export_id), itinerary.title)
+    if export_status == EXPORT_PENDING:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"export_id": export_id, "status": export_status}
+        )
+    if export_status == EXPORT_FAILED:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="PDF export failed")
+    # 未知任务或已被新版本替换，需要重新准备
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export not found")
@@ -4,9 +4,10 @@ Plan Data Access Object (DAO)
 Async database operations for travel plans.
 """
 
-from typing import List, Optional
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.orm import defer, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.planner.models.itinerary import Itinerary, DayDetail
 
@@ -19,10 +20,25 @@ class PlanDAO:
     def __init__(self, db_session: AsyncSession):
         self.db = db_session
 
-    async def get_user_plans(self, user_id: int, page: int, size: int) -> List[Itinerary]:
+    async def get_user_plans(
+        self,
+        user_id: int,
+        page: int,
+        size: int,
+        with_activities: bool = True
+    ) -> List[Itinerary]:
+        """
+        分页获取用户的行程，每日详情通过一次 selectin 查询预加载
+
+        with_activities=False 时不加载 activities JSON（列表视图用），
+        访问该字段会直接报错而不是触发额外查询。
+        """
+        days_loader = selectinload(Itinerary.days_detail)
+        if not with_activities:
+            days_loader = days_loader.options(defer(DayDetail.activities, raiseload=True))
         stmt = (
             select(Itinerary)
-            .options(selectinload(Itinerary.days_detail))
+            .options(days_loader)
             .where(Itinerary.user_id == user_id)
             .order_by(Itinerary.created_at.desc())
             .offset((page - 1) * size)
@@ -31,6 +47,41 @@ class PlanDAO:
         result = await self.db.execute(stmt)
         return list(result.scalars().all())
 
+    async def get_user_plan_summaries(
+        self,
+        user_id: int,
+        size: int,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Any]:
+        """
+        按 (created_at, id) 倒序游标分页获取行程摘要
+
+        只查询列表需要的列，不加载每日详情；after 为上一页最后一条的
+        (created_at, id)。多取一条用于判断是否还有下一页。
+        """
+        stmt = (
+            select(
+                Itinerary.id,
+                Itinerary.title,
+                Itinerary.destination,
+                Itinerary.days,
+                Itinerary.status,
+                Itinerary.created_at,
+                Itinerary.updated_at
+            )
+            .where(Itinerary.user_id == user_id)
+            .order_by(Itinerary.created_at.desc(), Itinerary.id.desc())
+            .limit(size + 1)
+        )
+        if after is not None:
+            created_at, plan_id = after
+            stmt = stmt.where(or_(
+                Itinerary.created_at < created_at,
+                and_(Itinerary.created_at == created_at, Itinerary.id < plan_id)
+            ))
+        result = await self.db.execute(stmt)
+        return list(result.all())
+
     async def create_plan(self, plan: Itinerary) -> Itinerary:
         self.db.add(plan)
         await self.db.commit()
@@ -42,6 +93,8 @@ class PlanDAO:
             select(Itinerary)
             .options(selectinload(Itinerary.days_detail))
             .where(Itinerary.id == plan_id, Itinerary.user_id == user_id)
+            # 每日详情可能已被批量语句改写，覆盖会话中已加载的旧数据
+            .execution_options(populate_existing=True)
         )
         result = await self.db.execute(stmt)
         return result.scalars().first()
@@ -113,9 +166,76 @@ class PlanDAO:
 
     async def delete_day_details(self, itinerary_id: int):
         """删除指定行程的所有每日详情"""
-        stmt = select(DayDetail).where(DayDetail.itinerary_id == itinerary_id)
-        result = await self.db.execute(stmt)
-        for day in result.scalars().all():
-            await self.db.delete(day)
+        await self.db.execute(delete(DayDetail).where(DayDetail.itinerary_id == itinerary_id))
         await self.db.commit()
 
+    @staticmethod
+    def _day_detail_row(itinerary_id: int, day: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "itinerary_id": itinerary_id,
+            "day_number": day.get("day_number"),
+            "title": day.get("title"),
+            "date": day.get("date"),
+            "activities": day.get("activities", []),
+            "notes": day.get("notes"),
+        }
+
+    async def replace_day_details(self, itinerary_id: int, days: List[Dict[str, Any]]) -> None:
+        """
+        用新的每日详情整体替换指定行程的旧数据
+
+        一条 DELETE + 一次批量 INSERT，在同一个事务中提交。
+        """
+        try:
+            await self.db.execute(delete(DayDetail).where(DayDetail.itinerary_id == itinerary_id))
+            rows = [self._day_detail_row(itinerary_id, day) for day in days]
+            if rows:
+                await self.db.execute(insert(DayDetail), rows)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+    async def upsert_day_details(self, itinerary_id: int, days: List[Dict[str, Any]]) -> None:
+        """
+        按 day_number 更新已有的每日详情，不存在的天批量插入
+
+        一次查询已有的天，再批量 UPDATE / INSERT，在同一个事务中提交。
+        已有的天只更新 title、activities、notes。
+        """
+        if not days:
+            return
+        try:
+            numbers = [day.get("day_number") for day in days]
+            result = await self.db.execute(
+                select(DayDetail.id, DayDetail.day_number).where(
+                    DayDetail.itinerary_id == itinerary_id,
+                    DayDetail.day_number.in_(numbers)
+                )
+            )
+            existing = {day_number: day_id for day_id, day_number in result.all()}
+
+            updates = []
+            inserts = []
+            for day in days:
+                row = self._day_detail_row(itinerary_id, day)
+                day_id = existing.get(row["day_number"])
+                if day_id is None:
+                    inserts.append(row)
+                    continue
+                updates.append({
+                    "id": day_id,
+                    "title": row["title"],
+                    "activities": row["activities"],
+                    "notes": row["notes"]
+                })
+
+            if updates:
+                # 按主键的批量 UPDATE（executemany）
+                await self.db.execute(update(DayDetail), updates)
+            if inserts:
+                await self.db.execute(insert(DayDetail), inserts)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
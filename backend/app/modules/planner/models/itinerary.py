@@ -4,7 +4,7 @@ Itinerary Model
 This module defines the SQLAlchemy model for itineraries.
 """
 
-from sqlalchemy import Column, String, Integer, Numeric, Boolean, ForeignKey, Enum as SqlEnum, JSON, Text
+from sqlalchemy import Column, String, Integer, Numeric, Boolean, ForeignKey, Enum as SqlEnum, JSON, Text, Index
 from sqlalchemy.orm import relationship
 from app.core.db.base import BaseModel
 
@@ -14,6 +14,10 @@ class Itinerary(BaseModel):
     Itinerary database model.
     """
     __tablename__ = "itineraries"
+    __table_args__ = (
+        # 用户行程列表按 (created_at, id) 倒序游标分页
+        Index("ix_itineraries_user_id_created_at", "user_id", "created_at"),
+    )
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     title = Column(String(200), nullable=False)
@@ -39,7 +43,8 @@ class Itinerary(BaseModel):
         "DayDetail",
         back_populates="itinerary",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="selectin",
+        order_by="DayDetail.day_number"
     )
 
 
@@ -194,6 +194,102 @@ FLEXIBLE_JSON_OUTPUT = """
 - 行前准备
 """
 
+# 分天并行生成提示词
+
+SKELETON_JSON_OUTPUT = """
+先只输出行程骨架，不要展开每天的具体活动。必须严格按照以下JSON格式输出，不要添加任何其他内容：
+
+{
+  "title": "目的地X日游",
+  "summary": "行程概述，用1-2句话概括这趟旅行的核心体验",
+  "highlights": ["亮点1", "亮点2", "亮点3"],
+  "best_season": "最佳旅行时间",
+  "weather": "天气提示",
+  "days": [
+    {
+      "day_number": 1,
+      "title": "第1天主题",
+      "area": "当天活动的主要区域",
+      "focus": ["当天主要景点或体验1", "当天主要景点或体验2"],
+      "accommodation_area": "当晚住宿区域",
+      "budget": 500
+    }
+  ],
+  "preparation": {
+    "documents": ["身份证"],
+    "essentials": ["充电宝"],
+    "suggestions": ["雨伞"],
+    "booking_reminders": ["热门景点需预约"]
+  },
+  "tips": {
+    "transportation": "交通建议",
+    "accommodation": "住宿建议",
+    "food": "餐饮建议",
+    "shopping": "购物建议",
+    "safety": "安全提醒",
+    "other": ["其他提醒"]
+  },
+  "cost_breakdown": {
+    "transportation": 1000,
+    "accommodation": 800,
+    "food": 600,
+    "tickets": 400,
+    "shopping": 200,
+    "other": 0
+  },
+  "actual_cost": 3000
+}
+
+⚠️ 输出要求：
+1. days 必须恰好包含每一天，day_number 从1开始连续编号
+2. 各天的 focus 不要重复，相邻两天的区域尽量顺路
+3. 各天 budget 之和与 cost_breakdown 总额一致
+4. 必须是有效的JSON格式，不要添加任何JSON之外的文字说明
+"""
+
+DAY_DETAIL_PROMPT = """
+这是一个{destination}{total_days}天行程中的第{day_number}天，请展开这一天的详细安排。
+
+整体行程：{title}
+旅行风格：{travel_style}
+当天骨架：{day_skeleton}
+其他天已安排（不要重复这些景点）：{other_days}
+
+只输出这一天的JSON对象，格式与完整行程中 days 数组的单个元素一致：
+
+{{
+  "day_number": {day_number},
+  "title": "当天主题",
+  "summary": "这一天主要体验什么",
+  "activities": [
+    {{
+      "type": "attraction",
+      "time": "09:00",
+      "title": "景点名称",
+      "duration": "3小时",
+      "description": "详细描述",
+      "highlights": ["推荐理由"],
+      "address": "具体地址",
+      "ticket_price": 80,
+      "need_booking": true,
+      "booking_info": "预订方式",
+      "average_cost": 80,
+      "best_time": "最佳游览时间",
+      "tips": ["实用贴士"],
+      "transportation": {{"method": "地铁", "from": "出发地", "to": "目的地", "duration": "30分钟", "cost": 5, "tips": "交通提示"}}
+    }}
+  ],
+  "accommodation": {{"name": "酒店名称", "address": "酒店地址", "type": "酒店", "facilities": ["WiFi"], "rating": 4.5, "booking_status": "建议预订"}},
+  "total_cost": 500,
+  "notes": "当日小结和建议"
+}}
+
+⚠️ 输出要求：
+1. 当天花费尽量接近骨架中的 budget
+2. 必须是有效的JSON格式，数值不要带引号
+3. 不要添加任何JSON之外的文字说明
+"""
+
 # 旅行风格提示词
 
 CULTURAL_PROMPT = """
@@ -202,6 +202,30 @@ class PlanListResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PlanSummary(BaseModel):
+    """
+    行程摘要（列表视图，直接由 SQL 投影得到，不含每日详情）
+    """
+    id: int
+    title: str
+    destination: str
+    days: int
+    status: str
+    cover_image: Optional[str] = Field(None, description="封面图片URL")
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PlanSummaryPage(BaseModel):
+    """
+    行程摘要分页结果（按创建时间倒序的游标分页）
+    """
+    items: List[PlanSummary] = []
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多数据")
+
+
 class GenerateDetailRequest(BaseModel):
     """
     生成详细行程请求
@@ -0,0 +1,235 @@
+"""
+PDF 导出
+在独立线程池中渲染行程 PDF，并按 (行程ID, 内容哈希) 缓存渲染结果
+
+内容哈希基于渲染所用的数据（build_pdf_payload）和 RENDER_VERSION 计算，
+任何会影响输出的修改（包括同一秒内的多次修改、删除某一天）都会生成新的缓存键；
+同一行程的旧版本文件在写入新版本时删除。PDF 直接渲染到缓存目录下的临时文件，
+完成后原子替换为缓存文件，响应从磁盘分块发送，不在内存中保留完整内容。
+缓存键同时作为后台导出任务的 ID。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config.settings import settings
+from app.modules.planner.models.itinerary import Itinerary
+
+logger = logging.getLogger(__name__)
+
+# 渲染输出变化（样式、布局）时递增，使旧缓存失效
+RENDER_VERSION = 1
+
+EXPORT_PENDING = "pending"
+EXPORT_READY = "ready"
+EXPORT_FAILED = "failed"
+
+_EXPORT_ID_PATTERN = re.compile(r"^(\d+)-[0-9a-f]{32}$")
+
+
+def make_pdf_cache_key(itinerary_id: int, payload: Dict[str, Any]) -> str:
+    """按渲染数据计算缓存键，内容相同的行程得到相同的键"""
+    content = json.dumps(
+        [RENDER_VERSION, payload], ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return f"{itinerary_id}-{hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]}"
+
+
+def parse_export_id(export_id: str) -> Optional[int]:
+    """校验导出任务 ID 并返回其中的行程ID"""
+    match = _EXPORT_ID_PATTERN.match(export_id)
+    return int(match.group(1)) if match else None
+
+
+def build_pdf_payload(itinerary: Itinerary) -> Dict[str, Any]:
+    """将行程模型转换为 PDF 渲染所需的字典"""
+    metadata = itinerary.metadata_json or {}
+    return {
+        "title": itinerary.title,
+        "destination": itinerary.destination,
+        "departure": itinerary.departure,
+        "days": itinerary.days,
+        "budget": float(itinerary.budget) if itinerary.budget else 0,
+        "travel_style": itinerary.travel_style,
+        "summary": metadata.get("summary", ""),
+        "highlights": metadata.get("highlights", []),
+        "best_season": metadata.get("best_season", ""),
+        "weather": metadata.get("weather", ""),
+        "actual_cost": metadata.get("actual_cost", 0),
+        "cost_breakdown": metadata.get("cost_breakdown", {}),
+        "days_detail": [
+            {
+                "day_number": day.day_number,
+                "title": day.title,
+                "date": day.date,
+                "summary": "",
+                "activities": day.activities if day.activities else [],
+                "total_cost": 0,
+            }
+            for day in itinerary.days_detail
+        ],
+        "preparation": metadata.get("preparation", {}),
+        "tips": metadata.get("tips", {}),
+    }
+
+
+class PDFCache:
+    """
+    渲染结果的磁盘缓存
+
+    每个键对应 cache_dir 下的一个 PDF 文件（文件名以行程ID开头），
+    写入采用临时文件 + 原子替换，超过 max_entries 时删除最早写入的文件。
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_entries: Optional[int] = None):
+        self.cache_dir = cache_dir or Path(__file__).resolve().parents[4] / ".cache" / "pdf"
+        self.max_entries = max_entries or settings.PDF_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        path = self.path_for(key)
+        if not path.is_file():
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return path
+
+    def store(self, key: str, write: Callable[[Path], None]) -> Path:
+        """调用 write 写入临时文件，成功后原子替换为缓存文件"""
+        path = self.path_for(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self._stats["writes"] += 1
+        self._prune(key)
+        return path
+
+    def _prune(self, key: str) -> None:
+        """删除同一行程的旧版本，并控制文件总数"""
+        prefix = key.split("-", 1)[0] + "-"
+        with self._lock:
+            try:
+                files = list(self.cache_dir.glob("*.pdf"))
+                for file in files:
+                    if file.name.startswith(prefix) and file.stem != key:
+                        file.unlink(missing_ok=True)
+                files = [file for file in files if file.exists()]
+                if len(files) > self.max_entries:
+                    files.sort(key=lambda file: file.stat().st_mtime)
+                    for file in files[:len(files) - self.max_entries]:
+                        file.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"PDF 缓存清理失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats, cache_dir=str(self.cache_dir))
+
+
+class PDFRenderer:
+    """
+    PDF 渲染器
+
+    ReportLab 渲染是 CPU 密集的同步调用，放到专用线程池中执行，避免阻塞事件循环；
+    同一缓存键的并发请求共享一次渲染。大文档可通过 prepare 在后台渲染，
+    之后按导出任务 ID 查询状态并下载。
+    """
+
+    def __init__(self, cache: Optional[PDFCache] = None, max_workers: Optional[int] = None):
+        self.cache = cache or PDFCache()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.PDF_RENDER_WORKERS,
+            thread_name_prefix="pdf-render"
+        )
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._failed: Dict[str, str] = {}
+
+    @staticmethod
+    def _render(payload: Dict[str, Any], path: Path) -> None:
+        from app.modules.planner.services.pdf_service import PDFExportService
+
+        PDFExportService().write_itinerary_pdf(payload, path)
+
+    def _render_and_store(self, key: str, payload: Dict[str, Any]) -> Path:
+        cached = self.cache.lookup(key)
+        if cached is not None:
+            return cached
+        return self.cache.store(key, lambda path: self._render(payload, path))
+
+    def _schedule(self, key: str, payload: Dict[str, Any]) -> asyncio.Future:
+        future = self._in_flight.get(key)
+        if future is None:
+            self._failed.pop(key, None)
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, self._render_and_store, key, payload)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        return future
+
+    def _finish(self, key: str, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"PDF 渲染失败 {key}: {error}")
+            self._failed[key] = str(error)
+
+    async def render_itinerary_file(self, itinerary: Itinerary) -> Path:
+        """渲染行程 PDF 并返回缓存文件路径，命中缓存时不重新渲染"""
+        payload = build_pdf_payload(itinerary)
+        key = make_pdf_cache_key(itinerary.id, payload)
+        cached = self.cache.lookup(key)
+        if cached is not None:
+            return cached
+        return await asyncio.shield(self._schedule(key, payload))
+
+    def prepare(self, itinerary: Itinerary) -> Tuple[str, str]:
+        """
+        在后台渲染行程 PDF，立即返回 (导出任务ID, 状态)
+
+        已有缓存时状态为 ready；否则开始（或复用正在进行的）渲染，状态为 pending。
+        需要在事件循环中调用。
+        """
+        payload = build_pdf_payload(itinerary)
+        key = make_pdf_cache_key(itinerary.id, payload)
+        if self.cache.lookup(key) is not None:
+            return key, EXPORT_READY
+        self._schedule(key, payload)
+        return key, EXPORT_PENDING
+
+    def export_status(self, export_id: str) -> Optional[str]:
+        """导出任务状态；任务不存在（或已被新版本替换）时返回 None"""
+        # 文件在渲染完成后才原子替换到位，存在即可下载
+        if self.cache.path_for(export_id).is_file():
+            return EXPORT_READY
+        if export_id in self._in_flight:
+            return EXPORT_PENDING
+        if export_id in self._failed:
+            return EXPORT_FAILED
+        return None
+
+
+_pdf_renderer: Optional[PDFRenderer] = None
+
+
+def get_pdf_renderer() -> PDFRenderer:
+    global _pdf_renderer
+    if _pdf_renderer is None:
+        _pdf_renderer = PDFRenderer()
+    return _pdf_renderer
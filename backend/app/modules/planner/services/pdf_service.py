@@ -3,8 +3,10 @@ PDF Export Service v2 - Match frontend styles
 Creates PDF that looks exactly like the frontend preview
 """
 
+import threading
 from io import BytesIO
-from typing import Dict, Any, Optional
+from pathlib import Path
+from typing import BinaryIO, Dict, Any, Optional, Tuple, Union
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
@@ -21,6 +23,7 @@ from reportlab.platypus import (
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from reportlab.lib.utils import ImageReader
 import logging
 
@@ -53,41 +56,35 @@ class PDFExportServiceV2:
         self.page_width, self.page_height = A4
         self.margin = 1.5 * cm
 
-        # Register Chinese font
-        try:
-            pdfmetrics.registerFont(TTFont('SimSun', 'C:\\Windows\\Fonts\\simsun.ttc', subfontIndex=0))
-            self.font_name = 'SimSun'
-        except:
-            logger.warning("Failed to register Chinese font, using default")
-            self.font_name = 'Helvetica'
-
-        self._setup_styles()
+        # 字体和样式每个进程只注册/构建一次
+        self.font_name, self.styles = get_pdf_styles()
 
-    def _setup_styles(self):
+    @classmethod
+    def _build_styles(cls, font_name: str):
         """Setup PDF styles matching frontend"""
-        self.styles = getSampleStyleSheet()
+        styles = getSampleStyleSheet()
 
         # Title
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='TitleCN',
-            parent=self.styles['Title'],
-            fontName=self.font_name,
+            parent=styles['Title'],
+            fontName=font_name,
             fontSize=28,
-            textColor=self.COLORS['text_primary'],
+            textColor=cls.COLORS['text_primary'],
             spaceAfter=20,
             alignment=TA_CENTER,
             leading=36
         ))
 
         # Section headers
-        for name, color in [('Yellow', self.COLORS['text_primary']),
-                            ('Blue', self.COLORS['text_primary']),
-                            ('Purple', self.COLORS['text_primary']),
-                            ('Orange', self.COLORS['text_primary'])]:
-            self.styles.add(ParagraphStyle(
+        for name, color in [('Yellow', cls.COLORS['text_primary']),
+                            ('Blue', cls.COLORS['text_primary']),
+                            ('Purple', cls.COLORS['text_primary']),
+                            ('Orange', cls.COLORS['text_primary'])]:
+            styles.add(ParagraphStyle(
                 name=f'Heading{name}',
-                parent=self.styles['Heading2'],
-                fontName=self.font_name,
+                parent=styles['Heading2'],
+                fontName=font_name,
                 fontSize=16,
                 textColor=color,
                 spaceAfter=12,
@@ -96,36 +93,38 @@ class PDFExportServiceV2:
             ))
 
         # Body text
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='BodyCN',
-            parent=self.styles['BodyText'],
-            fontName=self.font_name,
+            parent=styles['BodyText'],
+            fontName=font_name,
             fontSize=10,
             leading=14,
-            textColor=self.COLORS['text_secondary'],
+            textColor=cls.COLORS['text_secondary'],
             spaceAfter=6
         ))
 
         # Highlight text
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='Highlight',
-            parent=self.styles['BodyText'],
-            fontName=self.font_name,
+            parent=styles['BodyText'],
+            fontName=font_name,
             fontSize=9,
             leading=13,
-            textColor=self.COLORS['text_secondary']
+            textColor=cls.COLORS['text_secondary']
         ))
 
         # Small text
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='SmallCN',
-            parent=self.styles['BodyText'],
-            fontName=self.font_name,
+            parent=styles['BodyText'],
+            fontName=font_name,
             fontSize=8,
             leading=11,
-            textColor=self.COLORS['text_muted']
+            textColor=cls.COLORS['text_muted']
         ))
 
+        return styles
+
     def _safe_str(self, value: Any, default: str = '-') -> str:
         """Convert value to safe string"""
         if value is None:
@@ -137,8 +136,15 @@ class PDFExportServiceV2:
     def generate_itinerary_pdf(self, itinerary: Dict[str, Any]) -> bytes:
         """Generate PDF from itinerary data"""
         buffer = BytesIO()
+        self.write_itinerary_pdf(itinerary, buffer)
+        pdf_bytes = buffer.getvalue()
+        buffer.close()
+        return pdf_bytes
+
+    def write_itinerary_pdf(self, itinerary: Dict[str, Any], output: Union[str, Path, BinaryIO]) -> None:
+        """Render PDF directly into a file path or binary file object"""
         doc = SimpleDocTemplate(
-            buffer,
+            str(output) if isinstance(output, Path) else output,
             pagesize=A4,
             rightMargin=self.margin,
             leftMargin=self.margin,
@@ -149,10 +155,6 @@ class PDFExportServiceV2:
         story = self._build_content(itinerary)
         doc.build(story)
 
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
-        return pdf_bytes
-
     def _build_content(self, itinerary: Dict[str, Any]) -> list:
         """Build PDF content with frontend styling"""
         story = []
@@ -484,3 +486,56 @@ class PDFExportServiceV2:
                 content.append(Paragraph(f"  {other_tip}", self.styles['Highlight']))
 
         return content
+
+
+# 兼容旧的导入名
+PDFExportService = PDFExportServiceV2
+
+
+# 中文字体候选（按顺序尝试），都不可用时使用 ReportLab 内置的 CID 字体
+_FONT_CANDIDATES = [
+    ("SimSun", "C:\\Windows\\Fonts\\simsun.ttc"),
+    ("NotoSansCJK", "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"),
+    ("NotoSansCJK", "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc"),
+    ("WenQuanYiZenHei", "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc"),
+    ("PingFang", "/System/Library/Fonts/PingFang.ttc"),
+]
+_CID_FALLBACK_FONT = "STSong-Light"
+
+_registry_lock = threading.Lock()
+_registry: Optional[Tuple[str, Any]] = None
+
+
+def register_pdf_font() -> str:
+    """注册中文字体并返回字体名"""
+    for font_name, path in _FONT_CANDIDATES:
+        if not Path(path).exists():
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(font_name, path, subfontIndex=0))
+            return font_name
+        except Exception as e:
+            logger.warning(f"Failed to register font {path}: {e}")
+    try:
+        pdfmetrics.registerFont(UnicodeCIDFont(_CID_FALLBACK_FONT))
+        return _CID_FALLBACK_FONT
+    except Exception as e:
+        logger.warning(f"Failed to register Chinese font, using default: {e}")
+        return "Helvetica"
+
+
+def get_pdf_styles() -> Tuple[str, Any]:
+    """
+    进程级字体与样式注册表
+
+    首次调用时注册字体并构建样式表，之后直接返回同一份 (字体名, 样式表)。
+    样式表只读，可在多个渲染线程间共享。
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                font_name = register_pdf_font()
+                _registry = (font_name, PDFExportServiceV2._build_styles(font_name))
+                logger.info(f"PDF 字体与样式已注册: {font_name}")
+    return _registry
@@ -5,13 +5,18 @@ Plan Service V2.0
 This module contains business logic for travel planning.
 """
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.planner.daos.plan_dao import PlanDAO
-from app.modules.planner.schemas.plan_schema import PlanCreate, PlanUpdate, PlanResponse
+from app.modules.planner.schemas.plan_schema import PlanCreate, PlanUpdate, PlanResponse, PlanSummary, PlanSummaryPage
 from app.modules.planner.models.itinerary import Itinerary, DayDetail
 from fastapi import HTTPException
 
+import asyncio
+import base64
+import binascii
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,7 +54,9 @@ class PlanService:
         self,
         user_id: int,
         itinerary_id: int,
-        use_strict_json: bool = True
+        use_strict_json: bool = True,
+        reuse_similar: bool = False,
+        parallel: bool = False
     ) -> PlanResponse:
         """
         使用AI生成详细行程（V2.0 - 包含丰富的实用信息）
@@ -58,6 +65,8 @@ class PlanService:
             user_id: 用户ID
             itinerary_id: 行程ID
             use_strict_json: 是否使用严格JSON格式
+            reuse_similar: 是否复用相同条件下已生成的行程（命中 LLM 响应缓存时不再调用模型）
+            parallel: 是否按天并行生成（先生成骨架再并发展开每天，适合长行程）
 
         Returns:
             包含详细日程的行程响应
@@ -73,12 +82,14 @@ class PlanService:
 
         # 调用AI生成详细行程
         agent = TravelPlannerAgent(use_strict_json=use_strict_json)
-        result = await agent.generate_itinerary(
+        generate = agent.generate_itinerary_parallel if parallel else agent.generate_itinerary
+        result = await generate(
             destination=itinerary.destination,
             days=itinerary.days,
             budget=float(itinerary.budget) if itinerary.budget else 0,
             travel_style=itinerary.travel_style,
-            departure=itinerary.departure
+            departure=itinerary.departure,
+            reuse_similar=reuse_similar
         )
 
         logger.info(f"🎯 AI生成完成，开始添加地理坐标")
@@ -93,37 +104,12 @@ class PlanService:
 
         logger.info(f"✅ 地理坐标添加流程完成")
 
-        # 清除旧的DayDetail数据
-        await self.plan_dao.delete_day_details(itinerary_id)
-        logger.info(f"已清除旧的日程数据")
-
-        # 创建新的DayDetail记录（V2数据结构）
+        # 用新的DayDetail记录（V2数据结构）整体替换旧数据
         days_data = result.get('days', [])
         logger.info(f"AI返回{len(days_data)}天的数据")
 
-        for day_data in days_data:
-            day_detail = DayDetail(
-                itinerary_id=itinerary_id,
-                day_number=day_data.get('day_number'),
-                title=day_data.get('title'),
-                date=day_data.get('date'),  # V2新增
-                activities=day_data.get('activities', []),
-                notes=day_data.get('notes')
-            )
-            await self.plan_dao.create_day_detail(day_detail)
-            logger.info(f"已创建第{day_data.get('day_number')}天的日程")
-
-        # 构建metadata_json（保存V2新增的实用信息）
-        metadata = {
-            "summary": result.get('summary'),
-            "highlights": result.get('highlights', []),
-            "best_season": result.get('best_season'),
-            "weather": result.get('weather'),
-            "preparation": result.get('preparation', {}),
-            "tips": result.get('tips', {}),
-            "cost_breakdown": result.get('cost_breakdown'),
-            "actual_cost": result.get('actual_cost')
-        }
+        await self.plan_dao.replace_day_details(itinerary_id, days_data)
+        logger.info(f"已替换为{len(days_data)}天的日程")
 
         # 更新行程状态
         updated_itinerary = await self.plan_dao.update_plan(
@@ -132,7 +118,7 @@ class PlanService:
             {
                 "status": "active",
                 "ai_generated": True,
-                "metadata_json": metadata
+                "metadata_json": self._build_itinerary_metadata(result)
             }
         )
 
@@ -145,18 +131,179 @@ class PlanService:
         # 手动构建PlanResponse，避免days_detail类型转换问题
         return await self._build_plan_response(updated_itinerary)
 
-    async def _build_plan_response(self, itinerary: Itinerary) -> PlanResponse:
-        """构建PlanResponse，处理DayDetail到DayPlan的转换"""
-        from app.modules.planner.schemas.plan_schema import DayPlan, Activity
+    async def stream_detailed_itinerary(
+        self,
+        user_id: int,
+        itinerary: Itinerary,
+        use_strict_json: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式生成详细行程：每天的 JSON 一闭合就补全坐标并落库，同时推送进度事件
+
+        事件类型：
+            start: 开始生成，包含总天数
+            day: 某一天已落库，包含该天数据和已完成天数
+            done: 全部完成，包含完整的行程响应
+            error: 生成失败，已落库的天数保留
+
+        Args:
+            user_id: 用户ID
+            itinerary: 已校验归属的基础行程
+            use_strict_json: 是否使用严格JSON格式
+        """
+        from app.modules.planner.agents.planner_agent import TravelPlannerAgent
+        from app.modules.planner.agents.stream_parser import IncrementalDaysParser
+
+        itinerary_id = itinerary.id
+        destination = itinerary.destination
+        total_days = itinerary.days
+        logger.info(f"开始流式生成详细行程: {destination} {total_days}天, use_strict_json={use_strict_json}")
+
+        agent = TravelPlannerAgent(use_strict_json=use_strict_json)
+        parser = IncrementalDaysParser()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def produce():
+            # 读取模型输出与地理编码/落库并行：后面的天还在生成时，前面的天已经在处理
+            try:
+                async for chunk in agent.astream_itinerary(
+                    destination=destination,
+                    days=total_days,
+                    budget=float(itinerary.budget) if itinerary.budget else 0,
+                    travel_style=itinerary.travel_style,
+                    departure=itinerary.departure
+                ):
+                    for position, day_data in parser.feed(chunk):
+                        await queue.put(("day", (position, day_data)))
+                await queue.put(("end", None))
+            except Exception as e:
+                await queue.put(("error", e))
+
+        yield {"type": "start", "itinerary_id": itinerary_id, "total_days": total_days}
+
+        producer = asyncio.create_task(produce())
+        persisted: Set[int] = set()
+        try:
+            await self.plan_dao.delete_day_details(itinerary_id)
+
+            while True:
+                kind, payload = await queue.get()
+                if kind == "error":
+                    raise payload
+                if kind == "end":
+                    break
+                position, day_data = payload
+                event = await self._persist_streamed_day(
+                    itinerary_id, destination, position, day_data, persisted, agent
+                )
+                if event:
+                    event["total_days"] = total_days
+                    yield event
+
+            # 完整解析一次：补上流式阶段解析失败的天，并取得概述、费用等整体信息；
+            # 与流式阶段一样按对象在 days 数组中的位置编号
+            result = agent.complete_itinerary(parser.text, destination, total_days)
+            days = [day for day in result.get('days', []) if isinstance(day, dict)]
+            for position, day_data in enumerate(days, start=1):
+                event = await self._persist_streamed_day(
+                    itinerary_id, destination, position, day_data, persisted, agent
+                )
+                if event:
+                    event["total_days"] = total_days
+                    yield event
+
+            updated_itinerary = await self.plan_dao.update_plan(
+                itinerary_id,
+                user_id,
+                {
+                    "status": "active",
+                    "ai_generated": True,
+                    "metadata_json": self._build_itinerary_metadata(result)
+                }
+            )
+            response = await self._build_plan_response(updated_itinerary)
+            logger.info(
+                f"流式行程生成完成，行程ID: {itinerary_id}，"
+                f"流式解析 {parser.days_emitted} 天，回退解析 {parser.days_skipped} 天"
+            )
+            yield {"type": "done", "itinerary": response.model_dump(mode='json')}
+        except Exception as e:
+            logger.error(f"流式行程生成失败: {e}", exc_info=True)
+            yield {"type": "error", "message": str(e), "completed": len(persisted)}
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    async def _persist_streamed_day(
+        self,
+        itinerary_id: int,
+        destination: str,
+        position: int,
+        day_data: Dict[str, Any],
+        persisted: Set[int],
+        agent
+    ) -> Optional[Dict[str, Any]]:
+        """
+        补全单天默认值和坐标并落库，已落库的天跳过
+
+        缺少 day_number 时使用该天在 days 数组中的位置（从 1 开始），
+        前面的天被跳过时编号也不会错位。
+        """
+        if not isinstance(day_data, dict):
+            return None
+        day_number = day_data.get('day_number')
+        if not isinstance(day_number, int):
+            day_number = position
+            day_data['day_number'] = day_number
+        if day_number in persisted:
+            return None
+
+        agent.apply_day_defaults(day_data)
+        await self._enrich_itinerary_with_coordinates({"days": [day_data]}, destination)
+        await self.plan_dao.create_day_detail(self._build_day_detail(itinerary_id, day_data))
+        persisted.add(day_number)
+        logger.info(f"已流式创建第{day_number}天的日程")
+        return {"type": "day", "day_number": day_number, "day": day_data, "completed": len(persisted)}
 
-        # 获取days_detail
-        days_detail_models = await self.plan_dao.get_day_details_by_itinerary(itinerary.id)
+    @staticmethod
+    def _build_day_detail(itinerary_id: int, day_data: Dict[str, Any]) -> DayDetail:
+        return DayDetail(
+            itinerary_id=itinerary_id,
+            day_number=day_data.get('day_number'),
+            title=day_data.get('title'),
+            date=day_data.get('date'),  # V2新增
+            activities=day_data.get('activities', []),
+            notes=day_data.get('notes')
+        )
+
+    @staticmethod
+    def _build_itinerary_metadata(result: Dict[str, Any]) -> Dict[str, Any]:
+        """构建metadata_json（保存V2新增的实用信息）"""
+        return {
+            "summary": result.get('summary'),
+            "highlights": result.get('highlights', []),
+            "best_season": result.get('best_season'),
+            "weather": result.get('weather'),
+            "preparation": result.get('preparation', {}),
+            "tips": result.get('tips', {}),
+            "cost_breakdown": result.get('cost_breakdown'),
+            "actual_cost": result.get('actual_cost')
+        }
+
+    async def _build_plan_response(self, itinerary: Itinerary, include_activities: bool = True) -> PlanResponse:
+        """
+        构建PlanResponse，处理DayDetail到DayPlan的转换
+
+        直接使用已预加载的 itinerary.days_detail，不再单独查询；
+        include_activities=False 时（列表视图）不读取 activities。
+        """
+        from app.modules.planner.schemas.plan_schema import DayPlan, Activity
 
         # 转换DayDetail到DayPlan
         days_detail = []
-        for day_model in days_detail_models:
+        for day_model in itinerary.days_detail:
             activities = []
-            for act in (day_model.activities or []):
+            for act in ((day_model.activities or []) if include_activities else []):
                 if isinstance(act, dict):
                     # 标准化transportation字段
                     if 'transportation' in act and isinstance(act['transportation'], dict):
@@ -251,8 +398,8 @@ class PlanService:
         if not current_itinerary:
             raise HTTPException(status_code=404, detail="Itinerary not found")
 
-        # 获取当前的所有日程数据
-        current_days = await self.plan_dao.get_day_details_by_itinerary(itinerary_id)
+        # 当前的所有日程数据（已随行程预加载）
+        current_days = current_itinerary.days_detail
         logger.info(f"当前行程有{len(current_days)}天的数据")
 
         # 调用AI优化
@@ -282,111 +429,17 @@ class PlanService:
             affected_days=affected_days
         )
 
-        # 更新受影响的天数
-        optimized_days = result.get('days', [])
-        for day_data in optimized_days:
-            day_number = day_data.get('day_number')
-
-            # 如果指定了受影响的天数，只更新这些天
-            if affected_days and day_number not in affected_days:
-                continue
-
-            # 更新或创建DayDetail
-            existing_day = await self.plan_dao.get_day_detail(itinerary_id, day_number)
-            if existing_day:
-                await self.plan_dao.update_day_detail(existing_day.id, {
-                    "title": day_data.get('title'),
-                    "activities": day_data.get('activities', []),
-                    "notes": day_data.get('notes')
-                })
-                logger.info(f"已更新第{day_number}天的数据")
-            else:
-                day_detail = DayDetail(
-                    itinerary_id=itinerary_id,
-                    day_number=day_number,
-                    title=day_data.get('title'),
-                    activities=day_data.get('activities', []),
-                    notes=day_data.get('notes')
-                )
-                await self.plan_dao.create_day_detail(day_detail)
-                logger.info(f"已创建第{day_number}天的数据")
+        # 更新受影响的天数（如果指定了受影响的天数，只更新这些天）
+        optimized_days = [
+            day_data for day_data in result.get('days', [])
+            if not affected_days or day_data.get('day_number') in affected_days
+        ]
+        await self.plan_dao.upsert_day_details(itinerary_id, optimized_days)
+        logger.info(f"已更新{len(optimized_days)}天的数据")
 
         logger.info(f"行程优化完成，行程ID: {itinerary_id}")
         updated_itinerary = await self.plan_dao.get_plan_by_id(itinerary_id, user_id)
-
-        # 导入必要的类型
-        from app.modules.planner.schemas.plan_schema import DayPlan, Activity
-
-        # 获取更新后的所有日程数据
-        days_detail_models = await self.plan_dao.get_day_details_by_itinerary(itinerary_id)
-
-        # 转换为DayPlan对象（与generate_detail_itinerary相同的逻辑）
-        days_detail = []
-        for day_model in days_detail_models:
-            activities = []
-            for act in (day_model.activities or []):
-                if isinstance(act, dict):
-                    # 标准化transportation字段
-                    if 'transportation' in act and isinstance(act['transportation'], dict):
-                        trans = act['transportation']
-                        if 'from' in trans and 'from_location' not in trans:
-                            trans['from_location'] = trans.pop('from')
-                        if 'to' in trans and 'to_location' not in trans:
-                            trans['to_location'] = trans.pop('to')
-                    try:
-                        activities.append(Activity(**act))
-                    except Exception as e:
-                        logger.warning(f"Failed to parse activity {act.get('title')}: {e}")
-                        continue
-                else:
-                    logger.warning("Skipping non-dict activity payload in itinerary %s", itinerary_id)
-                    continue
-
-            day_plan = DayPlan(
-                day_number=day_model.day_number,
-                title=day_model.title or "",
-                date=day_model.date,
-                summary=None,
-                activities=activities,
-                notes=day_model.notes,
-                total_cost=None,
-                accommodation=None
-            )
-            days_detail.append(day_plan)
-
-        # 获取metadata
-        metadata = updated_itinerary.metadata_json or {}
-
-        # 确保cost_breakdown包含所有必需字段
-        cost_breakdown = self._normalize_cost_breakdown(metadata.get("cost_breakdown"))
-
-        # 构建response（与generate_detail_itinerary相同的格式）
-        response_dict = {
-            "id": updated_itinerary.id,
-            "user_id": updated_itinerary.user_id,
-            "title": updated_itinerary.title,
-            "destination": updated_itinerary.destination,
-            "departure": updated_itinerary.departure,
-            "days": updated_itinerary.days,
-            "budget": float(updated_itinerary.budget) if updated_itinerary.budget else None,
-            "travel_style": updated_itinerary.travel_style,
-            "status": updated_itinerary.status,
-            "ai_generated": updated_itinerary.ai_generated,
-            "cover_image": None,
-            "summary": metadata.get("summary"),
-            "highlights": metadata.get("highlights", []),
-            "best_season": metadata.get("best_season"),
-            "weather": metadata.get("weather"),
-            "actual_cost": metadata.get("actual_cost"),
-            "cost_breakdown": cost_breakdown,
-            "preparation": metadata.get("preparation"),
-            "tips": metadata.get("tips"),
-            "days_detail": days_detail,
-            "created_at": updated_itinerary.created_at,
-            "updated_at": updated_itinerary.updated_at
-        }
-
-        return PlanResponse(**response_dict)
+        return await self._build_plan_response(updated_itinerary)
 
     @staticmethod
     def _normalize_cost_breakdown(cost_breakdown):
@@ -432,9 +485,61 @@ class PlanService:
         page: int,
         size: int
     ) -> List[PlanResponse]:
-        plans = await self.plan_dao.get_user_plans(user_id, page, size)
-        # 使用 _build_plan_response 来正确处理 DayDetail 到 DayPlan 的转换
-        return [await self._build_plan_response(plan) for plan in plans]
+        # 列表视图不加载 activities，详情通过 get_itinerary 获取
+        plans = await self.plan_dao.get_user_plans(user_id, page, size, with_activities=False)
+        return [await self._build_plan_response(plan, include_activities=False) for plan in plans]
+
+    async def get_user_itinerary_summaries(
+        self,
+        user_id: int,
+        size: int,
+        cursor: Optional[str] = None
+    ) -> PlanSummaryPage:
+        """
+        获取行程摘要列表（游标分页）
+
+        Args:
+            user_id: 用户ID
+            size: 每页数量
+            cursor: 上一页返回的 next_cursor，为空时从最新的行程开始
+
+        Returns:
+            当前页的摘要和下一页游标
+        """
+        after = self._decode_cursor(cursor) if cursor else None
+        rows = await self.plan_dao.get_user_plan_summaries(user_id, size, after)
+
+        has_more = len(rows) > size
+        rows = rows[:size]
+        items = [
+            PlanSummary(
+                id=row.id,
+                title=row.title,
+                destination=row.destination,
+                days=row.days,
+                status=row.status,
+                cover_image=None,
+                created_at=row.created_at,
+                updated_at=row.updated_at
+            )
+            for row in rows
+        ]
+        next_cursor = self._encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+        return PlanSummaryPage(items=items, next_cursor=next_cursor)
+
+    @staticmethod
+    def _encode_cursor(created_at: datetime, plan_id: int) -> str:
+        payload = json.dumps([created_at.isoformat(), plan_id]).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            created_at, plan_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            return datetime.fromisoformat(created_at), int(plan_id)
+        except (binascii.Error, UnicodeError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
 
     async def get_itinerary(self, itinerary_id: int, user_id: int) -> Optional[PlanResponse]:
         plan = await self.plan_dao.get_plan_by_id(itinerary_id, user_id)
@@ -475,21 +580,21 @@ class PlanService:
         Returns:
             包含坐标的行程数据
         """
-        from app.services.baidu_geocoding_service import BaiduGeocodingService
+        from app.services.map_provider import get_map_provider
 
         logger.info(f"🗺️ 开始添加地理坐标，目的地: {destination}")
         logger.info(f"📊 行程数据包含 {len(itinerary.get('days', []))} 天")
 
-        geocoding_service = BaiduGeocodingService()
+        geocoding_service = get_map_provider()
         days_data = itinerary.get('days', [])
 
         total_activities = 0
         successful_coords = 0
 
+        # 收集需要解析的活动
+        pending = []
         for day_data in days_data:
-            activities = day_data.get('activities', [])
-
-            for activity in activities:
+            for activity in day_data.get('activities', []):
                 total_activities += 1
 
                 # 跳过已经有坐标的活动
@@ -503,27 +608,28 @@ class PlanService:
                     logger.warning(f"⚠️ 活动无地址信息: {activity.get('title')}")
                     continue
 
-                try:
-                    # 调用百度地图API获取坐标
-                    coords = await geocoding_service.geocode(
-                        address=address,
-                        city=destination
-                    )
-
-                    if coords:
-                        activity['coordinates'] = {
-                            'lng': coords['lng'],
-                            'lat': coords['lat']
-                        }
-                        successful_coords += 1
-                        logger.info(f"✅ 已获取坐标: {address} -> ({coords['lng']}, {coords['lat']})")
-                    else:
-                        logger.warning(f"⚠️ 未找到坐标: {address}")
-
-                except Exception as e:
-                    logger.error(f"❌ 地理编码失败: {address}, 错误: {e}")
-                    # 失败时继续处理下一个活动
-                    continue
+                pending.append((address, activity))
+
+        # 批量解析：地址去重、并发受限、按服务商 QPS 限流
+        resolved = await geocoding_service.geocode_many(
+            [address for address, _ in pending],
+            city=destination
+        )
 
+        for address, activity in pending:
+            coords = resolved.get(address)
+            if not coords:
+                logger.warning(f"⚠️ 未找到坐标: {address}")
+                continue
+            activity['coordinates'] = {
+                'lng': coords['lng'],
+                'lat': coords['lat']
+            }
+            successful_coords += 1
+
+        logger.info(
+            f"🔁 批量地理编码: {len(pending)} 个活动，"
+            f"缓存统计: {geocoding_service.cache.stats()}"
+        )
         logger.info(f"📍 地理坐标添加完成: {successful_coords}/{total_activities} 个活动成功获取坐标")
         return itinerary
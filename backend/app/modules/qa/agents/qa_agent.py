@@ -74,7 +74,8 @@ class QAAgent:
             return None
         if self._retriever is None:
             kb = self._get_knowledge_base()
-            self._retriever = Retriever(kb._store) if kb and kb._store else None
+            # 复用知识库当前的检索器（配置嵌入后端时为混合检索）
+            self._retriever = kb._retriever if kb else None
         return self._retriever
 
     async def _retrieve_context_async(self, query: str) -> List[Dict[str, Any]]:
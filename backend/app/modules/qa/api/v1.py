@@ -98,27 +98,13 @@ async def send_message_stream(
         agent = service._get_agent(use_rag=use_rag)
 
         async def generate_stream():
-            """生成流式响应"""
+            """生成流式响应（单次调用 LLM，边推送边累积并落库）"""
             try:
-                # 使用agent生成流式响应
-                async for chunk in agent.chat_stream(message_data.content, history, use_rag=use_rag):
+                async for event in service.stream_reply(
+                    agent, session.id, message_data.content, history, use_rag=use_rag
+                ):
                     # 发送SSE格式的数据
-                    yield f"data: {json.dumps({'chunk': chunk}, ensure_ascii=False)}\n\n"
-
-                # 流式结束
-                yield f"data: {json.dumps({'done': True}, ensure_ascii=False)}\n\n"
-
-                # 保存完整的AI回复到数据库
-                full_response = ""
-                async for chunk in agent.chat_stream(message_data.content, history, use_rag=use_rag):
-                    full_response += chunk
-
-                assistant_message = await service.message_dao.create(
-                    service._assistant_message_constructor(full_response, session.id)
-                )
-
-                # 发送最终消息ID
-                yield f"data: {json.dumps({'message_id': assistant_message.id}, ensure_ascii=False)}\n\n"
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
 
             except Exception as e:
                 logger.error(f"Streaming error: {e}")
@@ -260,6 +246,16 @@ async def query_weather(
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
 
 
+@router.get("/rag/stats", response_model=ResponseDTO)
+async def rag_index_stats(
+    current_user = Depends(get_current_active_user)
+):
+    """RAG 索引缓存与检索结果缓存的命中率、内存占用"""
+    from app.modules.qa.rag.knowledge_base import get_knowledge_base
+
+    return ResponseDTO(data=get_knowledge_base().index_stats())
+
+
 @router.post("/speech-to-text", response_model=ResponseDTO)
 async def speech_to_text(
     audio: UploadFile = File(...),
@@ -0,0 +1,11 @@
+"""
+Pre-ingest dataset PDFs into RAG index segments.
+
+    python -m app.modules.qa.rag [--dataset DIR] [--workers N]
+"""
+
+from app.modules.qa.rag.ingest import main
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+"""
+Cached catalogue of the QA RAG dataset directory.
+
+The directory is scanned at most once per ``poll_seconds`` (lazily, on
+access) instead of on every query. A scan refreshes the cached ``stat``
+metadata of every PDF; stems are tokenised and the inverted indexes from
+stem tokens / CJK characters to PDFs are rebuilt only when the set of files
+changes.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+import os
+import re
+import threading
+import time
+
+from app.modules.qa.rag.vector_store import tokenize
+
+
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    path: Path
+    stem_lower: str
+    tokens: FrozenSet[str]
+    size: int
+    mtime_ns: int
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    entries: Tuple[CatalogEntry, ...]
+    by_path: Dict[str, int]
+    by_token: Dict[str, Tuple[int, ...]]
+    by_cjk: Dict[str, Tuple[int, ...]]
+
+
+_EMPTY = _Snapshot((), {}, {}, {})
+
+
+def _build_postings(keys_per_entry: List[FrozenSet[str]]) -> Dict[str, Tuple[int, ...]]:
+    postings: Dict[str, List[int]] = {}
+    for index, keys in enumerate(keys_per_entry):
+        for key in keys:
+            postings.setdefault(key, []).append(index)
+    return {key: tuple(indexes) for key, indexes in postings.items()}
+
+
+def _rank(postings: Dict[str, Tuple[int, ...]], keys: FrozenSet[str]) -> List[int]:
+    """按命中的 key 个数降序，同分保持文件名顺序"""
+    counts: Counter = Counter()
+    for key in keys:
+        counts.update(postings.get(key, ()))
+    return sorted(counts, key=lambda index: (-counts[index], index))
+
+
+class DatasetCatalog:
+    """Polled view of ``*.pdf`` files in ``dataset_dir``, sorted by name."""
+
+    def __init__(
+        self,
+        dataset_dir: Path,
+        poll_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.dataset_dir = dataset_dir
+        self.poll_seconds = poll_seconds
+        self._clock = clock
+        self._snapshot = _EMPTY
+        self._last_poll: Optional[float] = None
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def invalidate(self) -> None:
+        """下次访问时强制重新扫描"""
+        with self._lock:
+            self._last_poll = None
+
+    def _scan(self) -> None:
+        entries = []
+        try:
+            with os.scandir(self.dataset_dir) as it:
+                for item in it:
+                    if item.name.endswith(".pdf") and item.is_file():
+                        stat = item.stat()
+                        entries.append((item.name, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            entries = []
+        entries.sort()
+        self.scans += 1
+
+        previous = self._snapshot
+        if [entry.path.name for entry in previous.entries] == [name for name, _size, _mtime in entries]:
+            # 文件集合未变，只更新 stat 元数据，复用分词结果和倒排索引
+            refreshed = tuple(
+                CatalogEntry(old.path, old.stem_lower, old.tokens, size, mtime_ns)
+                for old, (_name, size, mtime_ns) in zip(previous.entries, entries)
+            )
+            self._snapshot = _Snapshot(refreshed, previous.by_path, previous.by_token, previous.by_cjk)
+            return
+
+        catalog_entries = []
+        for name, size, mtime_ns in entries:
+            path = self.dataset_dir / name
+            catalog_entries.append(
+                CatalogEntry(path, path.stem.lower(), frozenset(tokenize(path.stem)), size, mtime_ns)
+            )
+        self._snapshot = _Snapshot(
+            entries=tuple(catalog_entries),
+            by_path={str(entry.path): index for index, entry in enumerate(catalog_entries)},
+            by_token=_build_postings([entry.tokens for entry in catalog_entries]),
+            by_cjk=_build_postings([frozenset(_CJK_PATTERN.findall(entry.path.stem)) for entry in catalog_entries]),
+        )
+
+    def snapshot(self) -> _Snapshot:
+        with self._lock:
+            now = self._clock()
+            if self._last_poll is None or now - self._last_poll >= self.poll_seconds:
+                self._scan()
+                self._last_poll = now
+            return self._snapshot
+
+    def entries(self) -> Tuple[CatalogEntry, ...]:
+        return self.snapshot().entries
+
+    def paths(self) -> List[Path]:
+        return [entry.path for entry in self.entries()]
+
+    def stat(self, path: Path) -> Optional[Tuple[int, int]]:
+        """缓存的 (size, mtime_ns)，不在目录中的文件返回 None"""
+        snapshot = self.snapshot()
+        index = snapshot.by_path.get(str(path))
+        if index is None:
+            return None
+        entry = snapshot.entries[index]
+        return entry.size, entry.mtime_ns
+
+    def match(self, query: str, limit: int) -> List[Path]:
+        """
+        按文件名匹配查询，依次尝试：
+
+        1. 文件名与查询互相包含
+        2. 文件名分词与查询分词的重合数（倒排索引）
+        3. 查询中出现在文件名里的汉字个数（倒排索引）
+
+        都没有命中时返回前 limit 个文件。
+        """
+        snapshot = self.snapshot()
+        entries = snapshot.entries
+        if not entries:
+            return []
+
+        query_lower = query.lower()
+        exact_matches = [
+            entry.path for entry in entries
+            if entry.stem_lower and (entry.stem_lower in query_lower or query_lower in entry.stem_lower)
+        ]
+        if exact_matches:
+            return exact_matches[:limit]
+
+        ranked = _rank(snapshot.by_token, frozenset(tokenize(query)))
+        if not ranked:
+            ranked = _rank(snapshot.by_cjk, frozenset(_CJK_PATTERN.findall(query)))
+        if ranked:
+            return [entries[index].path for index in ranked[:limit]]
+        return [entry.path for entry in entries[:limit]]
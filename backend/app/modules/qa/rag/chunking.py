@@ -0,0 +1,259 @@
+"""
+Semantic, page-aware chunking with duplicate suppression for QA RAG.
+
+Pages are consumed as a stream. Text is split on paragraph and sentence
+boundaries and packed into chunks of at most ``chunk_size`` characters that
+keep the real PDF page number of their first sentence. Before indexing,
+repeated header/footer lines and exact or near-duplicate chunks (MinHash over
+character shingles, looked up through LSH bands) are dropped.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import hashlib
+import re
+
+from app.modules.qa.rag.vector_store import Chunk
+
+
+# 句末标点后切分，标点保留在句子末尾
+_SENTENCE_PATTERN = re.compile(r"[^。！？；!?;\n]*(?:[。！？；!?;]+|\n+|$)")
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_SHINGLE_SIZE = 3
+# one-permutation MinHash：每个 shingle 只哈希一次，按哈希值分桶取桶内最小值
+_MINHASH_BUCKETS = 64
+_BUCKET_BITS = 6
+_EMPTY_BUCKET = 1 << 64
+# LSH：16 个 band × 4 行，Jaccard 约 0.5 以上的文本大概率成为候选，再按估计值精确判断
+_LSH_BANDS = 16
+_LSH_ROWS = _MINHASH_BUCKETS // _LSH_BANDS
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", text).strip().lower()
+
+
+def minhash(text: str, shingle_size: int = _SHINGLE_SIZE) -> Tuple[int, ...]:
+    """
+    One-permutation MinHash signature over character shingles of the
+    normalised text; empty buckets hold ``_EMPTY_BUCKET``.
+
+    Shingles are hashed with 64-bit BLAKE2b rather than the built-in
+    ``hash()``, which is randomised per process: the same text yields the
+    same signature in every worker and run, so deduplicated segments are
+    reproducible.
+    """
+    normalized = _normalize(text).replace(" ", "")
+    signature = [_EMPTY_BUCKET] * _MINHASH_BUCKETS
+    for i in range(max(len(normalized) - shingle_size, 0) + 1):
+        value = int.from_bytes(
+            hashlib.blake2b(normalized[i:i + shingle_size].encode("utf-8"), digest_size=8).digest(),
+            "little"
+        )
+        bucket = value & (_MINHASH_BUCKETS - 1)
+        value >>= _BUCKET_BITS
+        if value < signature[bucket]:
+            signature[bucket] = value
+    return tuple(signature)
+
+
+def estimate_jaccard(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """两个签名的 Jaccard 相似度估计，忽略两边都为空的桶"""
+    matched = compared = 0
+    for x, y in zip(a, b):
+        if x == _EMPTY_BUCKET and y == _EMPTY_BUCKET:
+            continue
+        compared += 1
+        matched += x == y
+    return matched / compared if compared else 1.0
+
+
+class NearDuplicateIndex:
+    """Exact (normalised digest) and MinHash near-duplicate detection."""
+
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self._exact: Set[bytes] = set()
+        self._signatures: List[Tuple[int, ...]] = []
+        self._bands: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(_LSH_BANDS)]
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(_LSH_BANDS):
+            rows = signature[band * _LSH_ROWS:(band + 1) * _LSH_ROWS]
+            # 全空的 band 对短文本没有区分度
+            if any(row != _EMPTY_BUCKET for row in rows):
+                yield band, rows
+
+    def check_and_add(self, text: str) -> Optional[str]:
+        """返回 "exact" / "near" 表示重复，否则记录该文本并返回 None"""
+        digest = hashlib.blake2b(_normalize(text).encode("utf-8"), digest_size=16).digest()
+        if digest in self._exact:
+            return "exact"
+        signature = minhash(text)
+        checked: Set[int] = set()
+        for band, key in self._band_keys(signature):
+            for candidate in self._bands[band].get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if estimate_jaccard(signature, self._signatures[candidate]) >= self.threshold:
+                    return "near"
+        self._exact.add(digest)
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in self._band_keys(signature):
+            self._bands[band].setdefault(key, []).append(index)
+        return None
+
+
+@dataclass
+class ChunkingStats:
+    pages: int = 0
+    input_chars: int = 0
+    boilerplate_lines: int = 0
+    raw_chunks: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    kept_chunks: int = 0
+    kept_chars: int = 0
+
+    def merge(self, other: "ChunkingStats") -> None:
+        for name in self.__dataclass_fields__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def as_dict(self) -> Dict[str, float]:
+        data: Dict[str, float] = {name: getattr(self, name) for name in self.__dataclass_fields__}
+        data["chunk_reduction"] = (
+            round(1 - self.kept_chunks / self.raw_chunks, 4) if self.raw_chunks else 0.0
+        )
+        return data
+
+
+class SemanticChunker:
+    """
+    Streaming sentence/paragraph chunker.
+
+    Args:
+        chunk_size: maximum chunk length in characters
+        chunk_overlap: trailing sentences of up to this many characters are
+            repeated at the start of the next chunk
+        dedup: drop exact/near-duplicate chunks and repeated header/footer lines
+        near_duplicate_threshold: estimated Jaccard similarity at or above which
+            a chunk counts as a near duplicate
+        boilerplate_min_pages: a short line already seen on this many earlier
+            pages is treated as header/footer and dropped
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1200,
+        chunk_overlap: int = 50,
+        dedup: bool = True,
+        near_duplicate_threshold: float = 0.8,
+        boilerplate_min_pages: int = 3,
+        boilerplate_max_line_length: int = 80
+    ):
+        self.chunk_size = max(chunk_size, 1)
+        self.chunk_overlap = max(min(chunk_overlap, self.chunk_size // 2), 0)
+        self.dedup = dedup
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.boilerplate_min_pages = boilerplate_min_pages
+        self.boilerplate_max_line_length = boilerplate_max_line_length
+
+    def _strip_boilerplate(self, text: str, line_pages: Dict[str, int], stats: ChunkingStats) -> str:
+        kept = []
+        seen_on_page = set()
+        for line in text.split("\n"):
+            key = _normalize(line)
+            if key and len(key) <= self.boilerplate_max_line_length and key not in seen_on_page:
+                seen_on_page.add(key)
+                pages_seen = line_pages.get(key, 0)
+                line_pages[key] = pages_seen + 1
+                if pages_seen >= self.boilerplate_min_pages:
+                    stats.boilerplate_lines += 1
+                    continue
+            kept.append(line)
+        return "\n".join(kept)
+
+    def _sentences(self, text: str) -> Iterator[str]:
+        """按段落、句子切分；段落之间产出空串作为边界标记"""
+        for paragraph in _PARAGRAPH_PATTERN.split(text):
+            for sentence in _SENTENCE_PATTERN.findall(paragraph):
+                if not sentence.strip():
+                    continue
+                # 超长句子按字符硬切
+                for start in range(0, len(sentence), self.chunk_size):
+                    yield sentence[start:start + self.chunk_size]
+            yield ""
+
+    def chunk(self, pages: Iterable[Tuple[int, str]], source: str) -> Tuple[List[Chunk], ChunkingStats]:
+        """
+        Chunk ``(page_no, text)`` pairs (0-based page numbers) as they arrive.
+
+        Returns the kept chunks, whose ``page`` is the 1-based PDF page of
+        their first sentence, and the chunking statistics.
+        """
+        stats = ChunkingStats()
+        dedup_index = NearDuplicateIndex(self.near_duplicate_threshold) if self.dedup else None
+        line_pages: Dict[str, int] = {}
+        chunks: List[Chunk] = []
+        # 当前块的 (句子, 页码) 列表及其总长度
+        parts: List[Tuple[str, int]] = []
+        length = 0
+
+        def flush(carry_overlap: bool) -> Tuple[List[Tuple[str, int]], int]:
+            content = "".join(text for text, _page in parts).strip()
+            if content:
+                stats.raw_chunks += 1
+                duplicate = dedup_index.check_and_add(content) if dedup_index else None
+                if duplicate == "exact":
+                    stats.exact_duplicates += 1
+                elif duplicate == "near":
+                    stats.near_duplicates += 1
+                else:
+                    first_page = next(page for text, page in parts if text.strip())
+                    chunks.append(Chunk(
+                        chunk_id=f"{source}-{len(chunks)}",
+                        content=content,
+                        source=source,
+                        page=first_page,
+                    ))
+                    stats.kept_chars += len(content)
+            carried: List[Tuple[str, int]] = []
+            carried_length = 0
+            if carry_overlap:
+                for text, page in reversed(parts):
+                    if carried_length + len(text) > self.chunk_overlap:
+                        break
+                    carried.insert(0, (text, page))
+                    carried_length += len(text)
+            return carried, carried_length
+
+        for page_no, text in pages:
+            stats.pages += 1
+            stats.input_chars += len(text)
+            if self.dedup:
+                text = self._strip_boilerplate(text, line_pages, stats)
+            page = page_no + 1
+            # 上一页留下的块已过半时在页边界切开，使块尽量与页对齐
+            if length >= self.chunk_size // 2:
+                parts, length = flush(carry_overlap=False)
+            for sentence in self._sentences(text):
+                if not sentence:
+                    if parts and parts[-1][0] != "\n":
+                        parts.append(("\n", page))
+                        length += 1
+                    continue
+                if length + len(sentence) > self.chunk_size:
+                    parts, length = flush(carry_overlap=True)
+                    if length + len(sentence) > self.chunk_size:
+                        parts, length = [], 0
+                parts.append((sentence, page))
+                length += len(sentence)
+        flush(carry_overlap=False)
+
+        stats.kept_chunks = len(chunks)
+        return chunks, stats
@@ -0,0 +1,271 @@
+"""
+Memory-mapped columnar persistence for BM25 index segments.
+
+A segment file holds a fixed header, a section table and a set of aligned
+columns:
+
+- ``doc_lens`` / ``doc_norms``: per-chunk length and BM25 length normalisation
+- ``content_offsets`` + ``content_blob``: UTF-8 chunk text
+- ``meta_offsets`` + ``meta_blob``: JSON ``[chunk_id, source, page]`` per chunk
+- ``term_offsets`` + ``term_blob``: sorted term dictionary
+- ``posting_offsets`` / ``idf``: per-term posting range and IDF
+- ``doc_ids`` / ``tfs``: concatenated posting lists
+
+Loading only maps the file and slices ``memoryview`` columns out of it, so the
+cost is independent of corpus size and every worker process shares the same
+page cache. Terms and chunks are decoded lazily on access.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+import json
+import mmap
+import os
+import struct
+import sys
+
+from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk
+
+
+_MAGIC = b"BM25COL2"
+_HEADER = struct.Struct("<8sBB6xIIQddd")
+_FLAG_CJK_BIGRAMS = 1
+_SECTIONS = (
+    ("doc_lens", "I"),
+    ("doc_norms", "d"),
+    ("content_offsets", "Q"),
+    ("content_blob", "B"),
+    ("meta_offsets", "Q"),
+    ("meta_blob", "B"),
+    ("term_offsets", "Q"),
+    ("term_blob", "B"),
+    ("posting_offsets", "Q"),
+    ("idf", "d"),
+    ("doc_ids", "I"),
+    ("tfs", "I"),
+)
+_SECTION_TABLE = struct.Struct("<%dQ" % (2 * len(_SECTIONS)))
+_ALIGN = 8
+# 列数据按本机字节序写入，加载时字节序不一致则视为无效文件
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+
+
+def _blob_with_offsets(items: List[bytes]) -> Tuple[array, bytes]:
+    offsets = array("Q", [0])
+    total = 0
+    for item in items:
+        total += len(item)
+        offsets.append(total)
+    return offsets, b"".join(items)
+
+
+def write_columnar(store: BM25VectorStore, path: Path) -> None:
+    """Serialise ``store`` to ``path`` atomically."""
+    chunks = list(store.chunks)
+    content_offsets, content_blob = _blob_with_offsets([chunk.content.encode("utf-8") for chunk in chunks])
+    meta_offsets, meta_blob = _blob_with_offsets(
+        [
+            json.dumps([chunk.chunk_id, chunk.source, chunk.page], ensure_ascii=False).encode("utf-8")
+            for chunk in chunks
+        ]
+    )
+
+    terms = sorted(store._postings)
+    term_offsets, term_blob = _blob_with_offsets([term.encode("utf-8") for term in terms])
+    posting_offsets = array("Q", [0])
+    idf = array("d")
+    doc_ids = array("I")
+    tfs = array("I")
+    for term in terms:
+        term_doc_ids, term_tfs = store._postings[term]
+        doc_ids.extend(term_doc_ids)
+        tfs.extend(term_tfs)
+        posting_offsets.append(len(doc_ids))
+        idf.append(store._idf_cache[term])
+
+    columns = {
+        "doc_lens": array("I", store._doc_lens).tobytes(),
+        "doc_norms": array("d", store._doc_norms).tobytes(),
+        "content_offsets": content_offsets.tobytes(),
+        "content_blob": content_blob,
+        "meta_offsets": meta_offsets.tobytes(),
+        "meta_blob": meta_blob,
+        "term_offsets": term_offsets.tobytes(),
+        "term_blob": term_blob,
+        "posting_offsets": posting_offsets.tobytes(),
+        "idf": idf.tobytes(),
+        "doc_ids": doc_ids.tobytes(),
+        "tfs": tfs.tobytes(),
+    }
+
+    header = _HEADER.pack(
+        _MAGIC, _BYTE_ORDER, _FLAG_CJK_BIGRAMS if store.cjk_bigrams else 0,
+        len(chunks), len(terms), len(doc_ids),
+        store._avg_doc_len, store.k1, store.b,
+    )
+    position = _HEADER.size + _SECTION_TABLE.size
+    table: List[int] = []
+    body: List[bytes] = []
+    for name, _fmt in _SECTIONS:
+        padding = -position % _ALIGN
+        body.append(b"\0" * padding)
+        position += padding
+        data = columns[name]
+        table.extend((position, len(data)))
+        body.append(data)
+        position += len(data)
+
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(header)
+        f.write(_SECTION_TABLE.pack(*table))
+        for data in body:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+class _ColumnarChunks(Sequence):
+    """Lazy chunk list decoded from the mapped file."""
+
+    def __init__(self, columns: Dict[str, memoryview], n_docs: int):
+        self._content_offsets = columns["content_offsets"]
+        self._content_blob = columns["content_blob"]
+        self._meta_offsets = columns["meta_offsets"]
+        self._meta_blob = columns["meta_blob"]
+        self._n_docs = n_docs
+
+    def __len__(self) -> int:
+        return self._n_docs
+
+    def __getitem__(self, index: int) -> Chunk:
+        if index < 0:
+            index += self._n_docs
+        if not 0 <= index < self._n_docs:
+            raise IndexError(index)
+        content = bytes(
+            self._content_blob[self._content_offsets[index]:self._content_offsets[index + 1]]
+        ).decode("utf-8")
+        chunk_id, source, page = json.loads(
+            bytes(self._meta_blob[self._meta_offsets[index]:self._meta_offsets[index + 1]])
+        )
+        return Chunk(chunk_id=chunk_id, content=content, source=source, page=page)
+
+
+class _TermDictionary:
+    """
+    Binary search over the sorted term column.
+
+    Lookups are not memoised: query terms are unbounded, and a memo would grow
+    for the life of the process while the search itself only touches
+    ``log2(n_terms)`` mapped entries.
+    """
+
+    def __init__(self, columns: Dict[str, memoryview], n_terms: int):
+        self._offsets = columns["term_offsets"]
+        self._blob = columns["term_blob"]
+        self._n_terms = n_terms
+
+    def __len__(self) -> int:
+        return self._n_terms
+
+    def term_at(self, index: int) -> str:
+        return sys.intern(bytes(self._blob[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8"))
+
+    def lookup(self, term: str) -> int:
+        target = term.encode("utf-8")
+        lo, hi = 0, self._n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._blob[self._offsets[mid]:self._offsets[mid + 1]]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n_terms and self.term_at(lo) == term:
+            return lo
+        return -1
+
+
+class _ColumnarPostings(Mapping):
+    """``term -> (doc_ids, tfs)`` view over the posting columns."""
+
+    def __init__(self, terms: _TermDictionary, columns: Dict[str, memoryview]):
+        self._terms = terms
+        self._offsets = columns["posting_offsets"]
+        self._doc_ids = columns["doc_ids"]
+        self._tfs = columns["tfs"]
+
+    def __getitem__(self, term: str) -> Tuple[memoryview, memoryview]:
+        index = self._terms.lookup(term)
+        if index < 0:
+            raise KeyError(term)
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._doc_ids[start:end], self._tfs[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._terms.term_at(i) for i in range(len(self._terms)))
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+class _ColumnarIdf(Mapping):
+    """``term -> idf`` view over the IDF column."""
+
+    def __init__(self, terms: _TermDictionary, columns: Dict[str, memoryview]):
+        self._terms = terms
+        self._idf = columns["idf"]
+
+    def __getitem__(self, term: str) -> float:
+        index = self._terms.lookup(term)
+        if index < 0:
+            raise KeyError(term)
+        return self._idf[index]
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._terms.term_at(i) for i in range(len(self._terms)))
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+def load_columnar(path: Path) -> BM25VectorStore:
+    """
+    Open a segment written by :func:`write_columnar`.
+
+    Raises ``ValueError`` if the file is truncated, has a different byte order
+    or is not a columnar segment.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    if len(view) < _HEADER.size + _SECTION_TABLE.size:
+        raise ValueError(f"truncated segment: {path}")
+
+    magic, byte_order, flags, n_docs, n_terms, _n_postings, avg_doc_len, k1, b = _HEADER.unpack_from(view, 0)
+    if magic != _MAGIC or byte_order != _BYTE_ORDER:
+        raise ValueError(f"not a columnar segment for this platform: {path}")
+
+    table = _SECTION_TABLE.unpack_from(view, _HEADER.size)
+    columns: Dict[str, memoryview] = {}
+    for i, (name, fmt) in enumerate(_SECTIONS):
+        offset, length = table[2 * i], table[2 * i + 1]
+        if offset + length > len(view):
+            raise ValueError(f"truncated segment: {path}")
+        column = view[offset:offset + length]
+        columns[name] = column if fmt == "B" else column.cast(fmt)
+
+    store = BM25VectorStore([], k1=k1, b=b, build_index=False, cjk_bigrams=bool(flags & _FLAG_CJK_BIGRAMS))
+    terms = _TermDictionary(columns, n_terms)
+    store.chunks = _ColumnarChunks(columns, n_docs)
+    store._postings = _ColumnarPostings(terms, columns)
+    store._idf_cache = _ColumnarIdf(terms, columns)
+    store._doc_lens = columns["doc_lens"]
+    store._doc_norms = columns["doc_norms"]
+    store._avg_doc_len = avg_doc_len
+    store._mapped_bytes = len(view)
+    return store
@@ -0,0 +1,224 @@
+"""
+Dense embeddings for hybrid QA RAG retrieval.
+
+Embedding backends are pluggable (:class:`Embedder`): a deterministic,
+offline :class:`HashingEmbedder` and an OpenAI-compatible
+:class:`OpenAIEmbedder`. Chunk embeddings are L2-normalised, quantised to
+int8 (per-row scale) or float16 and kept in an :class:`EmbeddingIndex`
+that is persisted next to the BM25 segment and searched with a vectorised
+cosine top-k.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from math import log
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+import os
+import zlib
+
+import httpx
+import numpy as np
+
+from app.core.config.settings import settings
+from app.modules.qa.rag.vector_store import tokenize
+
+
+_QUANTIZATIONS = ("int8", "float16")
+# 查询时按块把 int8 矩阵转成 float32 计算，限制临时内存
+_SEARCH_BLOCK_ROWS = 4096
+
+
+class Embedder(ABC):
+    """Embedding backend interface; ``name`` identifies the vector space."""
+
+    name: str = ""
+    dim: int = 0
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """返回 (len(texts), dim) 的 float32 矩阵"""
+
+
+@lru_cache(maxsize=65536)
+def _token_bucket(token: str, dim: int) -> Tuple[int, float]:
+    # crc32 跨进程稳定，持久化的向量在重启后仍可用
+    value = zlib.crc32(token.encode("utf-8"))
+    return value % dim, 1.0 if value & 0x80000000 else -1.0
+
+
+class HashingEmbedder(Embedder):
+    """
+    Signed feature hashing of BM25 tokens plus CJK bigrams.
+
+    Deterministic and dependency-free, so it works offline and in tests.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token, count in Counter(tokenize(text, bigrams=True)).items():
+                bucket, sign = _token_bucket(token, self.dim)
+                # 次线性词频，避免高频词主导方向
+                vectors[row, bucket] += sign * (1.0 + log(count))
+        return vectors
+
+
+class OpenAIEmbedder(Embedder):
+    """OpenAI-compatible ``/embeddings`` endpoint (``OPENAI_EMBEDDING_MODEL``)."""
+
+    def __init__(self, model: Optional[str] = None, dim: int = 1536):
+        self.model = model or settings.OPENAI_EMBEDDING_MODEL
+        self.dim = dim
+        self.name = f"openai:{self.model}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY is not configured")
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        timeout = settings.API_TIMEOUT_MS / 1000 if settings.API_TIMEOUT_MS else 60
+        # 在检索/构建线程中同步调用
+        response = httpx.post(
+            settings.OPENAI_BASE_URL.rstrip("/") + "/embeddings",
+            headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
+            json={"model": self.model, "input": list(texts)},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        vectors = np.asarray([item["embedding"] for item in data], dtype=np.float32)
+        self.dim = vectors.shape[1]
+        return vectors
+
+
+def get_embedder(name: Optional[str] = None) -> Optional[Embedder]:
+    """按名称（默认 RAG_EMBEDDER）创建嵌入后端；none 表示只用 BM25"""
+    name = (name if name is not None else os.getenv("RAG_EMBEDDER", "none")).strip().lower()
+    if name in ("", "none"):
+        return None
+    if name == "hashing":
+        return HashingEmbedder(int(os.getenv("RAG_HASHING_EMBEDDING_DIM", 256)))
+    if name == "openai":
+        return OpenAIEmbedder()
+    raise ValueError(f"Unsupported RAG embedder: {name}")
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    # 空文本的零向量保持为零，余弦得分为 0
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class EmbeddingIndex:
+    """
+    Quantised, row-normalised embedding matrix with cosine top-k search.
+
+    ``int8`` rows store ``round(v / scale)`` with a per-row float32 scale;
+    ``float16`` rows store the normalised vector directly.
+    """
+
+    def __init__(self, vectors: np.ndarray, scales: Optional[np.ndarray] = None):
+        if vectors.dtype == np.int8 and scales is None:
+            raise ValueError("int8 embeddings need per-row scales")
+        self.vectors = vectors
+        self.scales = scales
+
+    @property
+    def quantization(self) -> str:
+        return "int8" if self.vectors.dtype == np.int8 else "float16"
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @classmethod
+    def from_vectors(cls, vectors: np.ndarray, quantization: str = "int8") -> "EmbeddingIndex":
+        if quantization not in _QUANTIZATIONS:
+            raise ValueError(f"Unsupported embedding quantization: {quantization}")
+        normalized = _normalize_rows(vectors)
+        if quantization == "float16":
+            return cls(normalized.astype(np.float16))
+        peaks = np.abs(normalized).max(axis=1) if len(normalized) else np.zeros(0, dtype=np.float32)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        quantized = np.rint(normalized / scales[:, None]).astype(np.int8)
+        return cls(quantized, scales)
+
+    @classmethod
+    def merge(cls, indexes: Iterable["EmbeddingIndex"]) -> "EmbeddingIndex":
+        indexes = list(indexes)
+        if not indexes:
+            return cls(np.zeros((0, 0), dtype=np.float16))
+        if len({(index.quantization, index.vectors.shape[1]) for index in indexes}) > 1:
+            raise ValueError("cannot merge embeddings with different quantization or dimension")
+        vectors = np.concatenate([index.vectors for index in indexes])
+        scales = None
+        if indexes[0].scales is not None:
+            scales = np.concatenate([index.scales for index in indexes])
+        return cls(vectors, scales)
+
+    def memory_bytes(self) -> int:
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query_vector: np.ndarray) -> np.ndarray:
+        """所有行与查询向量的余弦相似度"""
+        query = _normalize_rows(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), _SEARCH_BLOCK_ROWS):
+            block = self.vectors[start:start + _SEARCH_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, query_vector: np.ndarray, top_k: int = 4) -> List[Tuple[int, float]]:
+        """返回 (行号, 余弦相似度)，按得分降序，同分按行号升序"""
+        if top_k <= 0 or len(self) == 0:
+            return []
+        scores = self.scores(query_vector)
+        if top_k < len(scores):
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        order = sorted(candidates.tolist(), key=lambda row: (-scores[row], row))
+        return [(row, float(scores[row])) for row in order if scores[row] > 0]
+
+    def save(self, path: Path) -> None:
+        """原子写入 .npz（未压缩）"""
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        arrays = {"vectors": self.vectors}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        with tmp_path.open("wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "EmbeddingIndex":
+        with np.load(path, allow_pickle=False) as data:
+            vectors = data["vectors"]
+            scales = data["scales"] if "scales" in data.files else None
+        return cls(vectors, scales)
+
+
+def embed_in_batches(
+    embedder: Embedder,
+    texts: Sequence[str],
+    batch_size: int = 64,
+    quantization: str = "int8"
+) -> EmbeddingIndex:
+    """分批计算文本嵌入并量化"""
+    batches = [
+        embedder.embed(texts[start:start + batch_size])
+        for start in range(0, len(texts), max(batch_size, 1))
+    ]
+    vectors = np.concatenate(batches) if batches else np.zeros((0, embedder.dim), dtype=np.float32)
+    return EmbeddingIndex.from_vectors(vectors, quantization)
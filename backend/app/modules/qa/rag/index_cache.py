@@ -0,0 +1,78 @@
+"""
+LRU cache of loaded RAG indexes, keyed by index signature or segment key.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import threading
+
+from app.modules.qa.rag.retriever import Retriever
+
+
+class IndexCache:
+    """
+    Bounded, size-aware LRU of retrievers.
+
+    The knowledge base keeps one instance for merged per-signature indexes
+    and one for the per-PDF segments they are merged from.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` (estimated via ``Retriever.memory_bytes``) is
+    exceeded. The most recently inserted entry is always kept, even if it
+    alone exceeds the byte budget.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max(max_entries, 1)
+        self._entries: "OrderedDict[str, Tuple[Retriever, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "evicted_bytes": 0}
+
+    def get(self, signature: str) -> Optional[Retriever]:
+        with self._lock:
+            entry = self._entries.get(signature)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(signature)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, signature: str, retriever: Retriever) -> None:
+        size = retriever.memory_bytes()
+        with self._lock:
+            previous = self._entries.pop(signature, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[signature] = (retriever, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _signature, (_retriever, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+                self._stats["evicted_bytes"] += evicted_size
+
+    def __contains__(self, signature: str) -> bool:
+        with self._lock:
+            return signature in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,150 @@
+"""
+PDF ingestion pipeline for QA RAG.
+
+Page text is extracted in a process pool (PyPDF2 is pure Python and holds the
+GIL), so extraction no longer stalls the server's thread pool. Pages are
+yielded in order as soon as they are available, so the chunker can consume
+them while later pages are still being extracted.
+
+CLI (pre-ingest the whole dataset before deployment)::
+
+    python -m app.modules.qa.rag [--dataset DIR] [--workers N]
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+import argparse
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from PyPDF2 import PdfReader
+
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _ingest_workers() -> int:
+    return int(os.getenv("RAG_INGEST_WORKERS", min(os.cpu_count() or 1, 4)))
+
+
+def get_ingest_executor() -> Optional[ProcessPoolExecutor]:
+    """进程级共享的抽取进程池；RAG_INGEST_WORKERS<=1 时在当前进程内抽取"""
+    global _executor
+    workers = _ingest_workers()
+    if workers <= 1:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: 服务进程里有线程在跑，fork 可能继承到被持有的锁
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def shutdown_ingest_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _count_pages(pdf_path: str) -> int:
+    return len(PdfReader(pdf_path).pages)
+
+
+def _extract_pages(pdf_path: str, start: int, stop: int) -> List[str]:
+    """在工作进程中抽取 [start, stop) 页的文本"""
+    reader = PdfReader(pdf_path)
+    return [(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+def iter_pdf_pages(
+    pdf_path: Path,
+    max_pages: int,
+    max_text_length: int,
+    executor: Optional[Executor] = None,
+    batch_size: int = 2
+) -> Iterator[Tuple[int, str]]:
+    """
+    按页序产出 (页码, 文本)，页码从 0 开始
+
+    最多处理 max_pages 页；累计文本超过 max_text_length 时截断最后一页并停止，
+    尚未开始的抽取任务会被取消。
+    """
+    path = str(pdf_path)
+    total_pages = min(_count_pages(path), max_pages)
+    if total_pages <= 0:
+        return
+
+    batches = [(start, min(start + batch_size, total_pages)) for start in range(0, total_pages, batch_size)]
+    if executor is None or len(batches) == 1:
+        pending = None
+        results = ((start, _extract_pages(path, start, stop)) for start, stop in batches)
+    else:
+        pending = [(start, executor.submit(_extract_pages, path, start, stop)) for start, stop in batches]
+        results = ((start, future.result()) for start, future in pending)
+
+    total_length = 0
+    try:
+        for start, texts in results:
+            for offset, text in enumerate(texts):
+                if total_length + len(text) > max_text_length:
+                    remaining = max_text_length - total_length
+                    if remaining > 0:
+                        yield start + offset, text[:remaining]
+                    return
+                total_length += len(text)
+                yield start + offset, text
+    finally:
+        if pending:
+            for _start, future in pending:
+                future.cancel()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.modules.qa.rag.knowledge_base import KnowledgeBase
+
+    parser = argparse.ArgumentParser(description="Pre-ingest dataset PDFs into RAG index segments")
+    parser.add_argument("--dataset", type=Path, default=None, help="PDF directory (default: backend/dataset)")
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes (RAG_INGEST_WORKERS)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.workers is not None:
+        os.environ["RAG_INGEST_WORKERS"] = str(args.workers)
+
+    kb = KnowledgeBase(dataset_dir=args.dataset)
+    pdfs = kb._list_pdfs()
+    if not pdfs:
+        logger.warning("No PDFs found in %s", kb.dataset_dir)
+        return 0
+
+    failed = 0
+    started = time.perf_counter()
+    try:
+        for pdf in pdfs:
+            try:
+                segment = kb._load_segment(pdf)
+                logger.info("Ingested %s: %s chunks", pdf.name, len(segment.store.chunks))
+            except Exception as e:
+                failed += 1
+                logger.error("Failed to ingest %s: %s", pdf.name, e)
+    finally:
+        shutdown_ingest_executor()
+
+    logger.info(
+        "Ingested %s/%s PDF(s) in %.1fs", len(pdfs) - failed, len(pdfs), time.perf_counter() - started
+    )
+    return 1 if failed else 0
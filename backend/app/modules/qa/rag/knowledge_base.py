@@ -4,33 +4,43 @@ Knowledge base for QA RAG.
 
 from __future__ import annotations
 
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Dict, Tuple
-import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import json
 import hashlib
-import pickle
 import asyncio
 import os
-
-import httpx
-from PyPDF2 import PdfReader
+import threading
 
 from app.core.config.settings import settings
+from app.core.http import get_http_client
 from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk, tokenize
+from app.modules.qa.rag.catalog import DatasetCatalog
+from app.modules.qa.rag.chunking import ChunkingStats, SemanticChunker
+from app.modules.qa.rag.embeddings import EmbeddingIndex, embed_in_batches, get_embedder
+from app.modules.qa.rag.columnar import load_columnar, write_columnar
+from app.modules.qa.rag.index_cache import IndexCache
+from app.modules.qa.rag.query_cache import QueryCache
+from app.modules.qa.rag.ingest import get_ingest_executor, iter_pdf_pages
 import logging
-from app.modules.qa.rag.retriever import Retriever
+from app.modules.qa.rag.retriever import HybridRetriever, Retriever
 
 
 
-_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+_SEGMENT_VERSION = 5
+# 最近使用的文档组合 -> 索引签名，超出后按 LRU 淘汰
+_MAX_DOC_SIGNATURES = 1024
 logger = logging.getLogger(__name__)
 
 
 @dataclass
 class RetrievalResult:
     chunks: List[Chunk]
+    # False 表示所需索引仍在后台构建，结果来自已有索引或为空（走通用回答）
+    ready: bool = True
 
 
 class KnowledgeBase:
@@ -40,69 +50,84 @@ class KnowledgeBase:
         chunk_size: int = 1200,
         chunk_overlap: int = 50,
         max_pages: int = 5,
-        max_docs: int = 1
+        max_docs: int = 1,
+        build_wait_seconds: float = 0.5,
+        index_cache_max_mb: int = 256,
+        index_cache_max_entries: int = 8,
+        segment_cache_max_mb: int = 256,
+        segment_cache_max_entries: int = 32,
+        cjk_bigrams: bool = False,
+        chunk_dedup: bool = True,
+        embedder: Optional[str] = None,
+        embedding_quantization: str = "int8",
+        embedding_batch_size: int = 64,
+        query_cache_max_entries: int = 1024,
+        query_cache_ttl_seconds: float = 300.0,
+        catalog_poll_seconds: float = 5.0
     ):
         self.dataset_dir = dataset_dir or Path(__file__).resolve().parents[4] / "dataset"
+        # 数据集目录最多每 catalog_poll_seconds 扫描一次，文件名分词、倒排索引和 stat 结果都被缓存
+        self._catalog = DatasetCatalog(
+            self.dataset_dir,
+            poll_seconds=float(os.getenv("RAG_CATALOG_POLL_SECONDS", catalog_poll_seconds))
+        )
         self.cache_dir = Path(__file__).resolve().parents[4] / ".cache" / "qa_rag"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         (self.cache_dir / "texts").mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / "segments").mkdir(parents=True, exist_ok=True)
         self.chunk_size = int(os.getenv("RAG_CHUNK_SIZE", chunk_size))
         self.chunk_overlap = int(os.getenv("RAG_CHUNK_OVERLAP", chunk_overlap))
         self.max_pages = int(os.getenv("RAG_MAX_PAGES", max_pages))
         self.max_docs = int(os.getenv("RAG_MAX_DOCS", max_docs))
+        # 额外索引相邻汉字二元组，提高多字词召回
+        self.cjk_bigrams = bool(int(os.getenv("RAG_CJK_BIGRAMS", cjk_bigrams)))
+        # 建索引前去掉页眉页脚以及完全重复/近似重复的分块
+        self.chunk_dedup = bool(int(os.getenv("RAG_CHUNK_DEDUP", chunk_dedup)))
+        # 配置嵌入后端（RAG_EMBEDDER=hashing/openai）后使用 BM25 + 向量的混合检索
+        self.embedder = get_embedder(embedder)
+        self.embedding_quantization = os.getenv("RAG_EMBEDDING_QUANTIZATION", embedding_quantization)
+        self.embedding_batch_size = int(os.getenv("RAG_EMBEDDING_BATCH_SIZE", embedding_batch_size))
+        # 请求等待后台索引构建的最长时间，超时后先用已有索引或通用回答
+        self.build_wait_seconds = float(os.getenv("RAG_BUILD_WAIT_SECONDS", build_wait_seconds))
         self._chunks: List[Chunk] = []
         self._store: Optional[BM25VectorStore] = None
         self._retriever: Optional[Retriever] = None
         self._current_index_key: Optional[str] = None
+        # 已加载的索引按签名放入有界 LRU，不同文档的并发请求可以同时命中内存
+        self._indexes = IndexCache(
+            max_bytes=int(os.getenv("RAG_INDEX_CACHE_MAX_MB", index_cache_max_mb)) * 1024 * 1024,
+            max_entries=int(os.getenv("RAG_INDEX_CACHE_MAX_ENTRIES", index_cache_max_entries))
+        )
+        # 热门问题的检索结果缓存，key 为索引签名 + 归一化的查询词 + top_k，
+        # PDF 修改后签名变化，旧结果不会再命中
+        self._query_cache = QueryCache(
+            max_entries=int(os.getenv("RAG_QUERY_CACHE_MAX_ENTRIES", query_cache_max_entries)),
+            ttl_seconds=float(os.getenv("RAG_QUERY_CACHE_TTL_SECONDS", query_cache_ttl_seconds))
+        )
+        # 文档组合 -> 最近一次计算出的索引签名（有界 LRU）
+        self._doc_signatures: "OrderedDict[Tuple[str, ...], str]" = OrderedDict()
+        # 每个 PDF 一个索引段（连同其嵌入），key 为文件内容哈希 + 分块参数；
+        # 与合并索引一样放入有界 LRU，按实际占用淘汰，淘汰后可从磁盘重新映射
+        self._segments = IndexCache(
+            max_bytes=int(os.getenv("RAG_SEGMENT_CACHE_MAX_MB", segment_cache_max_mb)) * 1024 * 1024,
+            max_entries=int(os.getenv("RAG_SEGMENT_CACHE_MAX_ENTRIES", segment_cache_max_entries))
+        )
+        # 文件路径 -> ((大小, mtime_ns), 内容哈希)；文件变化时覆盖，条目数不超过出现过的文件数
+        self._file_digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        # 本进程内新切分的索引段累计的分块统计
+        self._chunking_stats = ChunkingStats()
+        # 后台构建：同一签名只构建一次，完成后在锁内原子切换
+        self._state_lock = threading.Lock()
+        self._segment_locks: Dict[str, threading.Lock] = {}
+        self._pending_builds: Dict[str, Future] = {}
+        self._build_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-build")
         self._max_text_length = 500000  # 限制单个 PDF 文本最大长度 (500KB)
 
     def _list_pdfs(self) -> List[Path]:
-        if not self.dataset_dir.exists():
-            return []
-        return sorted(self.dataset_dir.glob("*.pdf"))
+        return self._catalog.paths()
 
     def _match_documents(self, query: str) -> List[Path]:
-        pdfs = self._list_pdfs()
-        if not pdfs:
-            return []
-
-        # Fast path: direct name match
-        exact_matches = []
-        query_lower = query.lower()
-        for pdf in pdfs:
-            name = pdf.stem
-            name_lower = name.lower()
-            if name_lower and (name_lower in query_lower or query_lower in name_lower):
-                exact_matches.append(pdf)
-        if exact_matches:
-            return exact_matches[: self.max_docs]
-
-        query_tokens = set(tokenize(query))
-        ranked = []
-        for pdf in pdfs:
-            name = pdf.stem
-            tokens = set(tokenize(name))
-            overlap = len(tokens & query_tokens)
-            if overlap:
-                ranked.append((pdf, overlap))
-        ranked.sort(key=lambda item: item[1], reverse=True)
-
-        if ranked:
-            return [item[0] for item in ranked[: self.max_docs]]
-
-        # fallback: match by CJK characters in filename
-        cjk_chars = set(_CJK_PATTERN.findall(query))
-        if cjk_chars:
-            scored = []
-            for pdf in pdfs:
-                score = sum(1 for char in cjk_chars if char in pdf.stem)
-                if score:
-                    scored.append((pdf, score))
-            scored.sort(key=lambda item: item[1], reverse=True)
-            if scored:
-                return [item[0] for item in scored[: self.max_docs]]
-
-        return pdfs[: min(self.max_docs, len(pdfs))]
+        return self._catalog.match(query, self.max_docs)
 
     def _cache_key_for_pdf(self, pdf_path: Path) -> str:
         return hashlib.sha256(str(pdf_path).encode("utf-8")).hexdigest()
@@ -113,183 +138,370 @@ class KnowledgeBase:
         meta_path = self.cache_dir / "texts" / f"{cache_key}.json"
         return text_path, meta_path
 
-    def _read_pdf_text(self, pdf_path: Path) -> str:
+    def _iter_pdf_pages(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        """
+        按页序产出 (页码, 文本)
+
+        优先读取文本缓存；未命中时通过进程池抽取，边抽取边产出，全部读完后写入缓存。
+        """
         text_path, meta_path = self._get_text_cache_paths(pdf_path)
         stats = pdf_path.stat()
-        meta = {"mtime": stats.st_mtime, "size": stats.st_size}
+        meta = {
+            "mtime": stats.st_mtime,
+            "size": stats.st_size,
+            "max_pages": self.max_pages,
+            "max_text_length": self._max_text_length,
+            "cjk_bigrams": self.cjk_bigrams,
+        }
         if text_path.exists() and meta_path.exists():
             try:
                 cached_meta = json.loads(meta_path.read_text(encoding="utf-8"))
-                if cached_meta == meta:
-                    text = text_path.read_text(encoding="utf-8", errors="ignore")
-                    # 限制返回的文本长度
-                    if len(text) > self._max_text_length:
-                        return text[:self._max_text_length]
-                    return text
+                page_lengths = cached_meta.pop("page_lengths", None)
+                if cached_meta == meta and page_lengths is not None:
+                    with open(text_path, encoding="utf-8", newline="") as f:
+                        text = f.read()
+                    offset = 0
+                    for page_no, page_length in enumerate(page_lengths):
+                        yield page_no, text[offset:offset + page_length]
+                        offset += page_length
+                    return
             except Exception:
                 pass
 
-        reader = PdfReader(str(pdf_path))
-        pages = reader.pages[: self.max_pages]
         texts = []
-        total_length = 0
-        for page in pages:
-            text = page.extract_text() or ""
-            # 累计长度检查
-            if total_length + len(text) > self._max_text_length:
-                remaining = self._max_text_length - total_length
-                if remaining > 0:
-                    texts.append(text[:remaining])
-                break
+        for page_no, text in iter_pdf_pages(
+            pdf_path, self.max_pages, self._max_text_length, executor=get_ingest_executor()
+        ):
             texts.append(text)
-            total_length += len(text)
-        full_text = "\n".join(texts)
+            yield page_no, text
+
         try:
-            text_path.write_text(full_text, encoding="utf-8")
+            with open(text_path, "w", encoding="utf-8", newline="") as f:
+                f.write("".join(texts))
+            meta["page_lengths"] = [len(text) for text in texts]
             meta_path.write_text(json.dumps(meta, ensure_ascii=True), encoding="utf-8")
         except Exception:
             pass
-        return full_text
 
-    def _chunk_text(self, text: str, source: str) -> List[Chunk]:
-        chunks: List[Chunk] = []
-        if not text:
-            return chunks
-        length = len(text)
-        start = 0
-        index = 0
-        while start < length:
-            end = min(start + self.chunk_size, length)
-            content = text[start:end].strip()
-            if content:
-                chunk_id = f"{source}-{index}"
-                chunks.append(Chunk(chunk_id=chunk_id, content=content, source=source, page=index))
-                index += 1
-            start = end - self.chunk_overlap
-            if start < 0:
-                start = 0
+    def _read_pdf_text(self, pdf_path: Path) -> str:
+        return "\n".join(text for _page_no, text in self._iter_pdf_pages(pdf_path))
+
+    def _chunk_pages(self, pages: Iterable[Tuple[int, str]], source: str) -> List[Chunk]:
+        """
+        流式分块：按段落/句子边界切分，分块页码为 PDF 实际页码（从 1 开始）
+        """
+        chunker = SemanticChunker(self.chunk_size, self.chunk_overlap, dedup=self.chunk_dedup)
+        chunks, stats = chunker.chunk(pages, source)
+        with self._state_lock:
+            self._chunking_stats.merge(stats)
+        logger.info("RAG chunked %s: %s", source, stats.as_dict())
         return chunks
 
-    def _build_index(self, pdfs: List[Path]) -> None:
+    def _chunk_text(self, text: str, source: str) -> List[Chunk]:
+        return self._chunk_pages([(0, text)] if text else [], source)
+
+    def _file_digest(self, pdf_path: Path) -> str:
+        cached_stat = self._catalog.stat(pdf_path)
+        if cached_stat is None:
+            stat = pdf_path.stat()
+            cached_stat = (stat.st_size, stat.st_mtime_ns)
+        path_key = str(pdf_path)
+        memo = self._file_digests.get(path_key)
+        if memo is not None and memo[0] == tuple(cached_stat):
+            return memo[1]
+        hasher = hashlib.sha256()
+        with pdf_path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        if memo is None:
+            # 新文件：顺便清理已从数据集目录删除的文件
+            known = {str(path) for path in self._catalog.paths()}
+            for stale in [key for key in self._file_digests if key not in known]:
+                self._file_digests.pop(stale, None)
+        self._file_digests[path_key] = (tuple(cached_stat), digest)
+        return digest
+
+    def _segment_key(self, pdf_path: Path) -> str:
+        payload = {
+            "version": _SEGMENT_VERSION,
+            "file": self._file_digest(pdf_path),
+            "source": pdf_path.stem,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "max_pages": self.max_pages,
+            "max_text_length": self._max_text_length,
+            "cjk_bigrams": self.cjk_bigrams,
+            "chunk_dedup": self.chunk_dedup,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _segment_path(self, segment_key: str) -> Path:
+        return self.cache_dir / "segments" / f"{segment_key}.col"
+
+    def _embedding_path(self, segment_key: str) -> Path:
+        """嵌入与索引段放在一起，文件名区分嵌入后端和量化方式"""
+        space = f"{self.embedder.name}|{self.embedding_quantization}"
+        space_key = hashlib.sha256(space.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / "segments" / f"{segment_key}.{space_key}.emb.npz"
+
+    def _load_embeddings(self, segment_key: str, store: BM25VectorStore) -> EmbeddingIndex:
+        """加载索引段的嵌入：磁盘 -> 分批计算；调用方持有段锁"""
+        embedding_path = self._embedding_path(segment_key)
+        if embedding_path.exists():
+            try:
+                embeddings = EmbeddingIndex.load(embedding_path)
+                if len(embeddings) == len(store.chunks):
+                    return embeddings
+            except Exception as e:
+                logger.warning("RAG embeddings %s unreadable, recomputing: %s", embedding_path.name, e)
+
+        embeddings = embed_in_batches(
+            self.embedder,
+            [chunk.content for chunk in store.chunks],
+            batch_size=self.embedding_batch_size,
+            quantization=self.embedding_quantization
+        )
+        try:
+            embeddings.save(embedding_path)
+        except Exception as e:
+            logger.warning("RAG embeddings %s not persisted: %s", embedding_path.name, e)
+        return embeddings
+
+    def _load_segment(self, pdf_path: Path, segment_key: Optional[str] = None) -> Retriever:
+        """
+        加载单个 PDF 的索引段：内存 -> 磁盘 -> 重新分块建索引
+
+        返回该段的检索器，配置了嵌入后端时同时带有该段的嵌入。
+        """
+        segment_key = segment_key or self._segment_key(pdf_path)
+        segment = self._segments.get(segment_key)
+        if segment is not None:
+            return segment
+
+        # 不同签名可能共享同一个新 PDF，按段加锁避免重复抽取
+        with self._state_lock:
+            segment_lock = self._segment_locks.setdefault(segment_key, threading.Lock())
+        with segment_lock:
+            segment = self._segments.get(segment_key)
+            if segment is not None:
+                return segment
+
+            store = None
+            segment_path = self._segment_path(segment_key)
+            if segment_path.exists():
+                try:
+                    # mmap 打开，加载耗时与语料大小无关，多个 worker 共享页缓存
+                    store = load_columnar(segment_path)
+                except Exception as e:
+                    logger.warning("RAG segment %s unreadable, rebuilding: %s", segment_path.name, e)
+                    store = None
+
+            if store is None:
+                logger.info("RAG indexing segment: %s", pdf_path.stem)
+                store = BM25VectorStore(
+                    self._chunk_pages(self._iter_pdf_pages(pdf_path), pdf_path.stem),
+                    cjk_bigrams=self.cjk_bigrams
+                )
+                try:
+                    write_columnar(store, segment_path)
+                    store = load_columnar(segment_path)
+                except Exception as e:
+                    logger.warning("RAG segment %s not persisted: %s", segment_path.name, e)
+
+            if self.embedder is None:
+                segment = Retriever(store)
+            else:
+                segment = HybridRetriever(store, self._load_embeddings(segment_key, store), self.embedder)
+            self._segments.put(segment_key, segment)
+        with self._state_lock:
+            self._segment_locks.pop(segment_key, None)
+        return segment
+
+    def _merge_segments(self, pdfs: List[Path], segment_keys: List[str]) -> Retriever:
+        """
+        合并所需 PDF 的索引段，未变化的 PDF 不会重新分块和分词
+
+        配置了嵌入后端时返回混合检索器，嵌入按段顺序拼接，与合并后的分块一一对应。
+        """
         if pdfs:
-            logger.info("RAG indexing %s document(s): %s", len(pdfs), [p.stem for p in pdfs])
-        chunks: List[Chunk] = []
-        for pdf in pdfs:
-            text = self._read_pdf_text(pdf)
-            chunks.extend(self._chunk_text(text, pdf.stem))
-        self._chunks = chunks
-        self._store = BM25VectorStore(chunks)
-        self._retriever = Retriever(self._store)
-        logger.info("RAG index ready with %s chunks", len(self._chunks))
+            logger.info("RAG loading %s document(s): %s", len(pdfs), [p.stem for p in pdfs])
+        segments = [self._load_segment(pdf, key) for pdf, key in zip(pdfs, segment_keys)]
+        store = BM25VectorStore.merge(segment.store for segment in segments)
+        if self.embedder is None:
+            return Retriever(store)
+        embeddings = EmbeddingIndex.merge(segment.embeddings for segment in segments)
+        return HybridRetriever(store, embeddings, self.embedder)
+
+    def _swap_index(self, signature: str, retriever: Retriever) -> Retriever:
+        """放入索引 LRU，并记录为最近使用的索引（降级检索使用）"""
+        store = retriever.store
+        self._indexes.put(signature, retriever)
+        with self._state_lock:
+            self._store = store
+            self._chunks = store.chunks
+            self._retriever = retriever
+            self._current_index_key = signature
+        logger.info(
+            "RAG index ready with %s chunks (~%.1f MB), cache: %s",
+            len(store.chunks), retriever.memory_bytes() / 1024 / 1024, self._indexes.stats()
+        )
+        return retriever
+
+    def _build_index(self, pdfs: List[Path], segment_keys: Optional[List[str]] = None) -> None:
+        """同步构建并切换到 pdfs 对应的索引"""
+        if segment_keys is None:
+            signature, segment_keys = self._index_signature(pdfs)
+        else:
+            signature = self._signature_for(segment_keys)
+        self._swap_index(signature, self._merge_segments(pdfs, segment_keys))
+
+    def _schedule_build(self, signature: str, pdfs: List[Path], segment_keys: List[str]) -> Future:
+        """提交后台构建；同一签名已在构建时复用同一个 Future（single-flight）"""
+        with self._state_lock:
+            future = self._pending_builds.get(signature)
+            if future is None:
+                future = self._build_executor.submit(self._run_build, signature, pdfs, segment_keys)
+                self._pending_builds[signature] = future
+            return future
+
+    def _run_build(self, signature: str, pdfs: List[Path], segment_keys: List[str]) -> Retriever:
+        try:
+            return self._swap_index(signature, self._merge_segments(pdfs, segment_keys))
+        finally:
+            with self._state_lock:
+                self._pending_builds.pop(signature, None)
+
+    def _active_retriever(self, signature: str) -> Optional[Retriever]:
+        return self._indexes.get(signature)
+
+    def index_stats(self) -> Dict[str, object]:
+        """索引 LRU 命中率、内存占用以及后台构建情况"""
+        with self._state_lock:
+            pending = len(self._pending_builds)
+        return {
+            **self._indexes.stats(),
+            "segments": self._segments.stats(),
+            "pending_builds": pending,
+            "chunking": self._chunking_stats.as_dict(),
+            "query_cache": self._query_cache.stats(),
+        }
+
+    def _fallback_retrieve(self, query: str, pdfs: List[Path], top_k: int) -> List[Chunk]:
+        """新索引构建期间，从当前已加载的索引中检索所需文档的分块"""
+        with self._state_lock:
+            store = self._store
+        if store is None:
+            return []
+        sources = {pdf.stem for pdf in pdfs}
+        results = store.search(query, top_k=top_k * 4)
+        return [chunk for chunk, _score in results if chunk.source in sources][:top_k]
 
     def prewarm(self, doc_names: List[str]) -> None:
         names = [name.strip() for name in doc_names if name and name.strip()]
         if not names:
             return
-        pdfs = self._list_pdfs()
-        if not pdfs:
+        entries = self._catalog.entries()
+        if not entries:
             return
         matched = []
         for name in names:
             name_lower = name.lower()
-            for pdf in pdfs:
-                if pdf.stem.lower() == name_lower:
-                    matched.append(pdf)
+            for entry in entries:
+                if entry.stem_lower == name_lower:
+                    matched.append(entry.path)
                     break
             else:
-                for pdf in pdfs:
-                    if name_lower in pdf.stem.lower():
-                        matched.append(pdf)
+                for entry in entries:
+                    if name_lower in entry.stem_lower:
+                        matched.append(entry.path)
                         break
         if not matched:
             return
-        self._build_index(matched[: self.max_docs])
+        pdfs = matched[: self.max_docs]
+        signature, segment_keys = self._index_signature(pdfs)
+        self._schedule_build(signature, pdfs, segment_keys).result()
 
     async def prewarm_async(self, doc_names: List[str]) -> None:
         await asyncio.to_thread(self.prewarm, doc_names)
 
-    def _index_signature(self, pdfs: List[Path]) -> Tuple[str, Dict[str, object]]:
-        files = []
-        for pdf in pdfs:
-            stat = pdf.stat()
-            files.append(
-                {
-                    "name": pdf.name,
-                    "size": stat.st_size,
-                    "mtime": stat.st_mtime,
-                }
-            )
-        payload = {
-            "files": sorted(files, key=lambda item: item["name"]),
-            "chunk_size": self.chunk_size,
-            "chunk_overlap": self.chunk_overlap,
-            "max_pages": self.max_pages,
-        }
-        signature = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
-        return signature, payload
-
-    def _index_paths(self, signature: str) -> Tuple[Path, Path]:
-        index_path = self.cache_dir / f"{signature}.pkl"
-        meta_path = self.cache_dir / f"{signature}.json"
-        return index_path, meta_path
-
-    def _load_index(self, signature: str) -> bool:
-        index_path, meta_path = self._index_paths(signature)
-        if not index_path.exists() or not meta_path.exists():
-            return False
-        try:
-            state = pickle.loads(index_path.read_bytes())
-            store = BM25VectorStore.from_state(state)
-            self._store = store
-            self._retriever = Retriever(store)
-            return True
-        except Exception:
-            return False
+    def _signature_for(self, segment_keys: List[str]) -> str:
+        return hashlib.sha256("|".join(segment_keys).encode("utf-8")).hexdigest()
+
+    def _index_signature(self, pdfs: List[Path]) -> Tuple[str, List[str]]:
+        segment_keys = [self._segment_key(pdf) for pdf in pdfs]
+        signature = self._signature_for(segment_keys)
+        doc_key = tuple(str(pdf) for pdf in pdfs)
+        with self._state_lock:
+            previous = self._doc_signatures.pop(doc_key, None)
+            self._doc_signatures[doc_key] = signature
+            if len(self._doc_signatures) > _MAX_DOC_SIGNATURES:
+                self._doc_signatures.popitem(last=False)
+        if previous is not None and previous != signature:
+            # PDF 内容或分块参数变化，旧索引上的缓存结果全部失效
+            dropped = self._query_cache.invalidate_signature(previous)
+            logger.info("RAG index signature changed for %s, dropped %s cached result(s)", doc_key, dropped)
+        return signature, segment_keys
+
+    def _resolve(self, query: str) -> Tuple[List[Path], str, List[str]]:
+        """匹配查询所需的文档并计算索引签名；目录和文件摘要都有缓存，开销很小"""
+        pdfs = self._match_documents(query)
+        signature, segment_keys = self._index_signature(pdfs)
+        return pdfs, signature, segment_keys
 
-    def _save_index(self, signature: str, meta: Dict[str, object]) -> None:
-        if not self._store:
-            return
-        index_path, meta_path = self._index_paths(signature)
-        try:
-            index_path.write_bytes(pickle.dumps(self._store.to_state()))
-            meta_path.write_text(json.dumps(meta, ensure_ascii=True), encoding="utf-8")
-        except Exception:
-            pass
+    def _query_cache_key(self, signature: str, query: str, top_k: int) -> Tuple[str, Tuple[str, ...], int]:
+        """归一化查询：大小写、空白和标点不同的同一问题在同一索引上命中同一缓存项"""
+        return signature, tuple(tokenize(query)), top_k
 
     async def retrieve_async(self, query: str, top_k: int = 4) -> RetrievalResult:
-        """异步版本的 retrieve，避免阻塞事件循环"""
-        # 在线程池中执行同步的匹配和索引操作
-        pdfs = await asyncio.to_thread(self._match_documents, query)
-        signature, meta = self._index_signature(pdfs)
-
-        if self._current_index_key != signature:
-            loaded = await asyncio.to_thread(self._load_index, signature)
-            if not loaded:
-                # 索引构建是最耗时的操作，在线程池中执行
-                await asyncio.to_thread(self._build_index, pdfs)
-                await asyncio.to_thread(self._save_index, signature, meta)
-            self._current_index_key = signature
-
-        if not self._retriever:
-            return RetrievalResult(chunks=[])
+        """
+        异步版本的 retrieve，避免阻塞事件循环
+
+        索引未就绪时在后台构建，最多等待 build_wait_seconds；超时则先从已有索引
+        检索（仅保留所需文档的分块），没有可用分块时返回空结果，由调用方走通用回答。
+        """
+        # 在线程池中执行同步的匹配和签名计算
+        pdfs, signature, segment_keys = await asyncio.to_thread(self._resolve, query)
+        cache_key = self._query_cache_key(signature, query, top_k)
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            return RetrievalResult(chunks=cached)
+
+        retriever = self._active_retriever(signature)
+        if retriever is None:
+            future = self._schedule_build(signature, pdfs, segment_keys)
+            try:
+                # shield: 超时只放弃等待，不取消后台构建
+                retriever = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)),
+                    timeout=self.build_wait_seconds
+                )
+            except asyncio.TimeoutError:
+                logger.info("RAG index for %s still building, serving fallback", [p.stem for p in pdfs])
+                chunks = await asyncio.to_thread(self._fallback_retrieve, query, pdfs, top_k)
+                return RetrievalResult(chunks=chunks, ready=False)
+            except Exception as e:
+                logger.error("RAG index build failed: %s", e)
+                return RetrievalResult(chunks=[], ready=False)
 
         # 检索操作也在线程池中执行
-        chunks = await asyncio.to_thread(self._retriever.retrieve, query, top_k=top_k)
+        chunks = await asyncio.to_thread(retriever.retrieve, query, top_k=top_k)
+        self._query_cache.put(cache_key, signature, chunks)
         return RetrievalResult(chunks=chunks)
 
     def retrieve(self, query: str, top_k: int = 4) -> RetrievalResult:
-        """同步版本的 retrieve（向后兼容）"""
-        pdfs = self._match_documents(query)
-        signature, meta = self._index_signature(pdfs)
-        if self._current_index_key != signature:
-            loaded = self._load_index(signature)
-            if not loaded:
-                self._build_index(pdfs)
-                self._save_index(signature, meta)
-            self._current_index_key = signature
-        if not self._retriever:
-            return RetrievalResult(chunks=[])
-        chunks = self._retriever.retrieve(query, top_k=top_k)
+        """同步版本的 retrieve（向后兼容），索引未就绪时等待构建完成"""
+        pdfs, signature, segment_keys = self._resolve(query)
+        cache_key = self._query_cache_key(signature, query, top_k)
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            return RetrievalResult(chunks=cached)
+
+        retriever = self._active_retriever(signature)
+        if retriever is None:
+            retriever = self._schedule_build(signature, pdfs, segment_keys).result()
+        chunks = retriever.retrieve(query, top_k=top_k)
+        self._query_cache.put(cache_key, signature, chunks)
         return RetrievalResult(chunks=chunks)
 
     async def generate_answer(self, query: str, top_k: int = 4) -> str:
@@ -329,39 +541,39 @@ class KnowledgeBase:
         }
 
         timeout = settings.API_TIMEOUT_MS / 1000 if settings.API_TIMEOUT_MS else 60
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            try:
-                resp = await client.post(url, headers=headers, json=payload)
-                if resp.status_code == 200:
-                    data = resp.json()
+        try:
+            resp = await get_http_client(url).post(url, headers=headers, json=payload, timeout=timeout)
+            if resp.status_code == 200:
+                data = resp.json()
+                if data.get("choices"):
+                    return data["choices"][0].get("message", {}).get("content", "")
+                if "content" in data and data["content"]:
+                    return data["content"][0].get("text", "")
+            # Fallback: try OpenAI-compatible endpoint for GLM
+            if "open.bigmodel.cn" in base_url:
+                fallback_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+                fallback_headers = {
+                    "Authorization": f"Bearer {settings.ANTHROPIC_AUTH_TOKEN}",
+                    "content-type": "application/json",
+                }
+                fallback_payload = {
+                    "model": settings.ANTHROPIC_MODEL or "glm-4.6",
+                    "max_tokens": 800,
+                    "temperature": 0.2,
+                    "messages": [{"role": "user", "content": prompt}],
+                }
+                fallback_resp = await get_http_client(fallback_url).post(
+                    fallback_url,
+                    headers=fallback_headers,
+                    json=fallback_payload,
+                    timeout=timeout
+                )
+                if fallback_resp.status_code == 200:
+                    data = fallback_resp.json()
                     if data.get("choices"):
                         return data["choices"][0].get("message", {}).get("content", "")
-                    if "content" in data and data["content"]:
-                        return data["content"][0].get("text", "")
-                # Fallback: try OpenAI-compatible endpoint for GLM
-                if "open.bigmodel.cn" in base_url:
-                    fallback_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
-                    fallback_headers = {
-                        "Authorization": f"Bearer {settings.ANTHROPIC_AUTH_TOKEN}",
-                        "content-type": "application/json",
-                    }
-                    fallback_payload = {
-                        "model": settings.ANTHROPIC_MODEL or "glm-4.6",
-                        "max_tokens": 800,
-                        "temperature": 0.2,
-                        "messages": [{"role": "user", "content": prompt}],
-                    }
-                    fallback_resp = await client.post(
-                        fallback_url,
-                        headers=fallback_headers,
-                        json=fallback_payload
-                    )
-                    if fallback_resp.status_code == 200:
-                        data = fallback_resp.json()
-                        if data.get("choices"):
-                            return data["choices"][0].get("message", {}).get("content", "")
-            except Exception:
-                return ""
+        except Exception:
+            return ""
         return ""
 
 
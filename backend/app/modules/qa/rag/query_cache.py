@@ -0,0 +1,95 @@
+"""
+LRU + TTL cache of retrieval results, keyed by normalised query.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+import threading
+import time
+
+from app.modules.qa.rag.vector_store import Chunk
+
+
+class QueryCache:
+    """
+    Bounded cache of ``key -> chunks`` with per-entry expiry.
+
+    Each entry remembers the index signature it was computed against, so
+    all results of an outdated index can be dropped with
+    :meth:`invalidate_signature`. Expired entries are removed lazily on
+    lookup and when the cache overflows.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max(max_entries, 0)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[str, List[Chunk], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Optional[List[Chunk]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            _signature, chunks, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return list(chunks)
+
+    def put(self, key: Hashable, signature: str, chunks: List[Chunk]) -> None:
+        if self.max_entries == 0 or self.ttl_seconds <= 0:
+            return
+        now = self._clock()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (signature, list(chunks), now + self.ttl_seconds)
+            if len(self._entries) > self.max_entries:
+                # 先清理过期项，仍然超出时再按 LRU 淘汰
+                for expired_key in [k for k, (_s, _c, expires_at) in self._entries.items() if expires_at <= now]:
+                    del self._entries[expired_key]
+                    self._stats["expirations"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate_signature(self, signature: str) -> int:
+        """删除基于该索引签名的所有结果，返回删除数量"""
+        with self._lock:
+            stale = [key for key, (entry_signature, _c, _e) in self._entries.items() if entry_signature == signature]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
@@ -4,9 +4,12 @@ Retriever for QA knowledge base.
 
 from __future__ import annotations
 
-from typing import List
+from typing import TYPE_CHECKING, Dict, List
 from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk
 
+if TYPE_CHECKING:
+    from app.modules.qa.rag.embeddings import Embedder, EmbeddingIndex
+
 
 class Retriever:
     def __init__(self, store: BM25VectorStore):
@@ -15,3 +18,50 @@ class Retriever:
     def retrieve(self, query: str, top_k: int = 4) -> List[Chunk]:
         results = self.store.search(query, top_k=top_k)
         return [chunk for chunk, _score in results]
+
+    def memory_bytes(self) -> int:
+        return self.store.memory_bytes()
+
+
+class HybridRetriever(Retriever):
+    """
+    BM25 + dense cosine retrieval fused with reciprocal-rank fusion.
+
+    Both rankers return ``candidates`` results; each chunk scores
+    ``sum(1 / (rrf_k + rank))`` over the rankings it appears in.
+    """
+
+    def __init__(
+        self,
+        store: BM25VectorStore,
+        embeddings: "EmbeddingIndex",
+        embedder: "Embedder",
+        rrf_k: int = 60,
+        candidates: int = 20
+    ):
+        super().__init__(store)
+        if len(embeddings) != len(store.chunks):
+            raise ValueError("embedding rows do not match indexed chunks")
+        self.embeddings = embeddings
+        self.embedder = embedder
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+
+    def retrieve(self, query: str, top_k: int = 4) -> List[Chunk]:
+        if top_k <= 0:
+            return []
+        depth = max(self.candidates, top_k)
+        rankings = [
+            self.store.search_ids(query, top_k=depth),
+            self.embeddings.search(self.embedder.embed([query])[0], top_k=depth),
+        ]
+        fused: Dict[int, float] = {}
+        for ranking in rankings:
+            for rank, (doc_id, _score) in enumerate(ranking, start=1):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank)
+        # 同分时按文档顺序返回
+        best = sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return [self.store.chunks[doc_id] for doc_id, _score in best]
+
+    def memory_bytes(self) -> int:
+        return self.store.memory_bytes() + self.embeddings.memory_bytes()
@@ -4,17 +4,51 @@ Simple in-memory vector store using BM25 scoring.
 
 from __future__ import annotations
 
+from array import array
+from collections import Counter
 from dataclasses import dataclass
 from math import log
-from typing import List, Dict, Iterable, Tuple
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+import heapq
 import re
+import sys
 
 
-_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]|[a-zA-Z0-9]+")
+# 先整体小写再匹配，比逐个 token 调用 lower() 少一轮分配
+_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]|[a-z0-9]+")
+_CJK_RUN_PATTERN = re.compile(r"[\u4e00-\u9fff]{2,}")
+_STATE_VERSION = 2
+# 每个词项的字典槽位、tuple 和两个 array 头部的近似开销
+_TERM_OVERHEAD = 200
 
 
-def tokenize(text: str) -> List[str]:
-    return [token.lower() for token in _TOKEN_PATTERN.findall(text)]
+def _cjk_bigrams(lowered: str) -> Iterator[str]:
+    for run in _CJK_RUN_PATTERN.findall(lowered):
+        for i in range(len(run) - 1):
+            yield run[i:i + 2]
+
+
+def iter_tokens(text: str, bigrams: bool = False) -> Iterator[str]:
+    """
+    Stream tokens lazily: single CJK characters and lowercase ASCII words.
+
+    With ``bigrams`` every pair of adjacent CJK characters is emitted as well,
+    which improves recall for multi-character words without indexing every
+    n-gram.
+    """
+    lowered = text.lower()
+    for match in _TOKEN_PATTERN.finditer(lowered):
+        yield match.group()
+    if bigrams:
+        yield from _cjk_bigrams(lowered)
+
+
+def tokenize(text: str, bigrams: bool = False) -> List[str]:
+    lowered = text.lower()
+    tokens = _TOKEN_PATTERN.findall(lowered)
+    if bigrams:
+        tokens.extend(_cjk_bigrams(lowered))
+    return tokens
 
 
 @dataclass
@@ -28,6 +62,11 @@ class Chunk:
 class BM25VectorStore:
     """
     Minimal BM25 implementation for chunk retrieval.
+
+    Documents are stored as an inverted index: each term maps to a pair of
+    parallel arrays ``(doc_ids, tfs)``. IDF and the per-document length
+    normalisation are precomputed, so a query only touches postings of its
+    own terms.
     """
 
     def __init__(
@@ -35,60 +74,148 @@ class BM25VectorStore:
         chunks: Iterable[Chunk],
         k1: float = 1.5,
         b: float = 0.75,
-        build_index: bool = True
+        build_index: bool = True,
+        cjk_bigrams: bool = False
     ):
         self.chunks = list(chunks)
         self.k1 = k1
         self.b = b
-        self._doc_tokens: List[List[str]] = []
-        self._doc_freq: Dict[str, int] = {}
+        self.cjk_bigrams = cjk_bigrams
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._idf_cache: Dict[str, float] = {}
+        self._doc_lens: array = array("I")
+        self._doc_norms: List[float] = []
         self._avg_doc_len = 0.0
+        # mmap 加载的索引段记录映射文件大小，用于内存统计
+        self._mapped_bytes: Optional[int] = None
         if build_index:
             self._build_index()
 
+    @property
+    def _doc_freq(self) -> Dict[str, int]:
+        return {term: len(doc_ids) for term, (doc_ids, _tfs) in self._postings.items()}
+
     def _build_index(self) -> None:
-        total_len = 0
-        for chunk in self.chunks:
-            tokens = tokenize(chunk.content)
-            self._doc_tokens.append(tokens)
-            total_len += len(tokens)
-            seen = set(tokens)
-            for token in seen:
-                self._doc_freq[token] = self._doc_freq.get(token, 0) + 1
-        self._avg_doc_len = total_len / max(len(self.chunks), 1)
+        postings: Dict[str, Tuple[array, array]] = {}
+        doc_lens = array("I")
+        for doc_id, chunk in enumerate(self.chunks):
+            counts = Counter(tokenize(chunk.content, self.cjk_bigrams))
+            doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = (array("I"), array("I"))
+                    # 词项驻留：多个索引段合并后共享同一个字符串对象
+                    postings[sys.intern(term)] = entry
+                entry[0].append(doc_id)
+                entry[1].append(tf)
+        self._postings = postings
+        self._doc_lens = doc_lens
+        self._finalize()
+
+    def _finalize(self) -> None:
+        """Precompute IDF per term and length normalisation per document."""
+        n_docs = max(len(self.chunks), 1)
+        total_len = sum(self._doc_lens)
+        self._avg_doc_len = total_len / n_docs
+        avg = self._avg_doc_len or 1
+        self._doc_norms = [
+            self.k1 * (1 - self.b + self.b * doc_len / avg) for doc_len in self._doc_lens
+        ]
+        self._idf_cache = {
+            term: log((n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5) + 1)
+            for term, (doc_ids, _tfs) in self._postings.items()
+        }
+
+    @classmethod
+    def merge(cls, stores: Iterable["BM25VectorStore"]) -> "BM25VectorStore":
+        """
+        Merge independently built stores (one per document segment).
+
+        Postings are concatenated with shifted doc ids; only the corpus-wide
+        statistics (IDF, average length) are recomputed, so no chunk is
+        re-tokenised.
+
+        The result always lives on the heap: postings of memory-mapped
+        segments are copied into ``array`` columns and their chunks are
+        decoded, so a merged store is accounted by :meth:`memory_bytes` at
+        its full in-memory size rather than the mapped file size. A single
+        store is returned unchanged and stays mapped.
+        """
+        stores = list(stores)
+        if len(stores) == 1:
+            return stores[0]
+        k1 = stores[0].k1 if stores else 1.5
+        b = stores[0].b if stores else 0.75
+        cjk_bigrams = stores[0].cjk_bigrams if stores else False
+        if any(store.cjk_bigrams != cjk_bigrams for store in stores):
+            raise ValueError("cannot merge stores with different tokenization")
+        merged = cls([], k1=k1, b=b, build_index=False, cjk_bigrams=cjk_bigrams)
+        postings: Dict[str, Tuple[array, array]] = {}
+        for store in stores:
+            offset = len(merged.chunks)
+            merged.chunks.extend(store.chunks)
+            merged._doc_lens.extend(store._doc_lens)
+            for term, (doc_ids, tfs) in store._postings.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = (array("I"), array("I"))
+                    postings[sys.intern(term)] = entry
+                entry[0].extend(doc_id + offset for doc_id in doc_ids)
+                entry[1].extend(tfs)
+        merged._postings = postings
+        merged._finalize()
+        return merged
+
+    def memory_bytes(self) -> int:
+        """Approximate memory footprint; mapped stores report the mapped size."""
+        if self._mapped_bytes is not None:
+            return self._mapped_bytes
+        total = sum(sys.getsizeof(chunk.content) + sys.getsizeof(chunk.chunk_id) for chunk in self.chunks)
+        for term, (doc_ids, tfs) in self._postings.items():
+            total += sys.getsizeof(term) + _TERM_OVERHEAD
+            total += len(doc_ids) * doc_ids.itemsize + len(tfs) * tfs.itemsize
+        total += len(self._doc_lens) * 4 + len(self._doc_norms) * 8
+        return total
 
     def _idf(self, term: str) -> float:
+        idf = self._idf_cache.get(term)
+        if idf is not None:
+            return idf
         n_docs = max(len(self.chunks), 1)
-        df = self._doc_freq.get(term, 0)
-        return log((n_docs - df + 0.5) / (df + 0.5) + 1)
+        return log((n_docs + 0.5) / 0.5 + 1)
 
     def search(self, query: str, top_k: int = 4) -> List[Tuple[Chunk, float]]:
-        q_tokens = tokenize(query)
-        scores: List[Tuple[int, float]] = []
-        for idx, tokens in enumerate(self._doc_tokens):
-            if not tokens:
+        return [(self.chunks[doc_id], score) for doc_id, score in self.search_ids(query, top_k)]
+
+    def search_ids(self, query: str, top_k: int = 4) -> List[Tuple[int, float]]:
+        """返回 (文档序号, BM25 得分)，按得分降序"""
+        if top_k <= 0:
+            return []
+        scores: Dict[int, float] = {}
+        k1_plus_one = self.k1 + 1
+        doc_norms = self._doc_norms
+        # 重复出现的查询词按次数累加，与逐词打分的结果保持一致
+        for term, q_count in Counter(tokenize(query, self.cjk_bigrams)).items():
+            entry = self._postings.get(term)
+            if entry is None:
                 continue
-            freq: Dict[str, int] = {}
-            for token in tokens:
-                freq[token] = freq.get(token, 0) + 1
-            doc_len = len(tokens)
-            score = 0.0
-            for term in q_tokens:
-                if term not in freq:
-                    continue
-                idf = self._idf(term)
-                tf = freq[term]
-                denom = tf + self.k1 * (1 - self.b + self.b * doc_len / (self._avg_doc_len or 1))
-                score += idf * (tf * (self.k1 + 1)) / (denom or 1)
-            if score > 0:
-                scores.append((idx, score))
-
-        scores.sort(key=lambda item: item[1], reverse=True)
-        results = [(self.chunks[idx], score) for idx, score in scores[:top_k]]
-        return results
+            weight = self._idf_cache[term] * q_count
+            doc_ids, tfs = entry
+            for doc_id, tf in zip(doc_ids, tfs):
+                denom = tf + doc_norms[doc_id]
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * (tf * k1_plus_one) / (denom or 1)
+
+        # 同分时按文档顺序返回
+        best = heapq.nlargest(
+            top_k,
+            ((score, -doc_id) for doc_id, score in scores.items() if score > 0),
+        )
+        return [(-neg_id, score) for score, neg_id in best]
 
     def to_state(self) -> Dict[str, object]:
         return {
+            "version": _STATE_VERSION,
             "chunks": [
                 {
                     "chunk_id": chunk.chunk_id,
@@ -98,11 +225,14 @@ class BM25VectorStore:
                 }
                 for chunk in self.chunks
             ],
-            "doc_tokens": self._doc_tokens,
-            "doc_freq": self._doc_freq,
+            "postings": self._postings,
+            "idf": self._idf_cache,
+            "doc_lens": self._doc_lens,
+            "doc_norms": self._doc_norms,
             "avg_doc_len": self._avg_doc_len,
             "k1": self.k1,
             "b": self.b,
+            "cjk_bigrams": self.cjk_bigrams,
         }
 
     @classmethod
@@ -116,8 +246,20 @@ class BM25VectorStore:
             )
             for item in state.get("chunks", [])
         ]
-        store = cls(chunks, k1=state.get("k1", 1.5), b=state.get("b", 0.75), build_index=False)
-        store._doc_tokens = state.get("doc_tokens", [])
-        store._doc_freq = state.get("doc_freq", {})
-        store._avg_doc_len = state.get("avg_doc_len", 0.0)
+        store = cls(
+            chunks,
+            k1=state.get("k1", 1.5),
+            b=state.get("b", 0.75),
+            build_index=False,
+            cjk_bigrams=state.get("cjk_bigrams", False),
+        )
+        if state.get("version") == _STATE_VERSION:
+            store._postings = state.get("postings", {})
+            store._idf_cache = state.get("idf", {})
+            store._doc_lens = state.get("doc_lens", array("I"))
+            store._doc_norms = state.get("doc_norms", [])
+            store._avg_doc_len = state.get("avg_doc_len", 0.0)
+        else:
+            # 旧版状态只保存了 doc_tokens，重建倒排索引
+            store._build_index()
         return store
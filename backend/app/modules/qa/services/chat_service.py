@@ -2,7 +2,8 @@
 QA Chat Service
 """
 
-from typing import List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.qa.daos.conversation_dao import ConversationDAO
 from app.modules.qa.daos.message_dao import MessageDAO
@@ -120,6 +121,45 @@ class ChatService:
         )
         return await self.message_dao.create(assistant_message)
 
+    async def stream_reply(
+        self,
+        agent: QAAgent,
+        conversation_id: int,
+        query: str,
+        history: List[Dict[str, str]],
+        use_rag: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        单次调用 agent.chat_stream，把同一个生成器同时输出给客户端和累积器。
+
+        依次产出 {"chunk": ...}、{"done": True}、{"message_id": ...} 事件。
+        流结束时保存完整回复；客户端中途断开或上游出错时保存已生成的部分。
+        完整回复保存失败时直接抛出原始错误，不再在同一个会话上重试。
+        """
+        parts: List[str] = []
+        finished = False
+        try:
+            async for chunk in agent.chat_stream(query, history, use_rag=use_rag):
+                parts.append(chunk)
+                yield {"chunk": chunk}
+            finished = True
+
+            # 客户端断开时任务会被取消，shield 保证回复仍然落库
+            assistant_message = await asyncio.shield(
+                self._save_assistant_reply("".join(parts), conversation_id)
+            )
+            yield {"done": True}
+            yield {"message_id": assistant_message.id}
+        finally:
+            if not finished and parts:
+                # 只有流被中途打断（取消或上游出错）时才保存已生成的部分
+                await asyncio.shield(self._save_assistant_reply("".join(parts), conversation_id))
+
+    async def _save_assistant_reply(self, content: str, conversation_id: int) -> Message:
+        return await self.message_dao.create(
+            self._assistant_message_constructor(content, conversation_id)
+        )
+
     def _user_message_constructor(self, content: str, message_type: str, conversation_id: int) -> Message:
         """创建用户消息对象（用于流式接口）"""
         return Message(
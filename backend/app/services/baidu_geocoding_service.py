@@ -5,91 +5,79 @@
 
 import httpx
 import logging
-from typing import Optional, Dict, Any, List
-from app.core.config.settings import settings
+from typing import Optional, Dict, Any, List, Tuple
+from app.services.geocode_cache import GeocodeCache
+from app.services.map_provider import BaseMapProvider, MapProviderThrottled
 
 logger = logging.getLogger(__name__)
 
 
-class BaiduGeocodingService:
+class BaiduGeocodingService(BaseMapProvider):
     """百度地图API服务"""
 
     BASE_URL = "http://api.map.baidu.com"
-
-    def __init__(self, api_key: Optional[str] = None):
+    PROVIDER = "baidu"
+    DEFAULT_QPS = 3.0
+    # status=1 表示服务端无相关结果，可以负缓存；其余非 0 状态多为配额/权限问题，不缓存
+    NO_RESULT_STATUS = {1}
+    # 401/402: 并发量超过配额，可退避重试
+    THROTTLE_STATUS = {401, 402}
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[GeocodeCache] = None,
+        qps: Optional[float] = None
+    ):
         """
         初始化百度地图服务
 
         Args:
             api_key: 百度地图API密钥（AK），如果为None则从配置读取
+            cache: 地理编码缓存，如果为None则使用进程级共享缓存
+            qps: 每秒请求数配额，如果为None则从配置读取
         """
-        self.api_key = api_key or settings.MAP_API_KEY
+        super().__init__(api_key=api_key, cache=cache, qps=qps)
 
         if not self.api_key:
             logger.warning("百度地图API密钥未配置，地理编码功能将不可用")
 
-    async def geocode(self, address: str, city: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """
-        地址解析：将结构化地址转换为经纬度坐标
+    def _prepare_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        params["ak"] = self.api_key
+        return params
 
-        Args:
-            address: 待解析的结构化地址描述
-            city: 指定查询的城市（可选）
+    def _is_throttled(self, data: Dict[str, Any]) -> bool:
+        return data.get("status") in self.THROTTLE_STATUS
 
-        Returns:
-            包含经纬度信息的字典，格式：
-            {
-                "lng": 经度,
-                "lat": 纬度,
-                "formatted_address": 格式化地址,
-                "level": 地址精度
-            }
-            如果解析失败返回None
-        """
-        if not self.api_key:
-            logger.error("API密钥未配置")
-            return None
+    async def geocode_uncached(self, address: str, city: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+        params = {
+            "address": address,
+            "output": "json"
+        }
 
-        try:
-            url = f"{self.BASE_URL}/geocoding/v3/"
-            params = {
-                "address": address,
-                "output": "json",
-                "ak": self.api_key
-            }
+        if city:
+            params["city"] = city
 
-            if city:
-                params["city"] = city
+        logger.info(f"调用百度地图地理编码API: address={address}, city={city}")
 
-            logger.info(f"调用百度地图地理编码API: address={address}, city={city}")
+        data = await self._request("/geocoding/v3/", params)
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+        logger.debug(f"API响应: status={data.get('status')}")
 
-                logger.debug(f"API响应: status={data.get('status')}")
+        status = data.get("status")
+        if status == 0:
+            result = data.get("result", {})
+            location = result.get("location", {})
 
-                if data.get("status") == 0:
-                    result = data.get("result", {})
-                    location = result.get("location", {})
+            return {
+                "lng": location.get("lng"),
+                "lat": location.get("lat"),
+                "formatted_address": result.get("level", ""),
+                "level": result.get("level", "")
+            }, True
 
-                    return {
-                        "lng": location.get("lng"),
-                        "lat": location.get("lat"),
-                        "formatted_address": result.get("level", ""),
-                        "level": result.get("level", "")
-                    }
-
-                logger.warning(f"地址解析失败: {address}, message={data.get('message')}")
-                return None
-
-        except httpx.HTTPError as e:
-            logger.error(f"百度地图API请求失败: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"地理编码异常: {e}")
-            return None
+        logger.warning(f"地址解析失败: {address}, message={data.get('message')}")
+        return None, status in self.NO_RESULT_STATUS
 
     async def regeocode(self, lng: float, lat: float) -> Optional[Dict[str, Any]]:
         """
@@ -115,36 +103,31 @@ class BaiduGeocodingService:
             return None
 
         try:
-            url = f"{self.BASE_URL}/reverse_geocoding/v3/"
             coords = f"{lng},{lat}"
 
             params = {
                 "location": coords,
-                "output": "json",
-                "ak": self.api_key
+                "output": "json"
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            data = await self._request("/reverse_geocoding/v3/", params)
 
-                if data.get("status") == 0:
-                    result = data.get("result", {})
-                    address_component = result.get("addressComponent", {})
+            if data.get("status") == 0:
+                result = data.get("result", {})
+                address_component = result.get("addressComponent", {})
 
-                    return {
-                        "formatted_address": result.get("formatted_address", ""),
-                        "province": address_component.get("province", ""),
-                        "city": address_component.get("city", ""),
-                        "district": address_component.get("district", ""),
-                        "street": address_component.get("street", "")
-                    }
+                return {
+                    "formatted_address": result.get("formatted_address", ""),
+                    "province": address_component.get("province", ""),
+                    "city": address_component.get("city", ""),
+                    "district": address_component.get("district", ""),
+                    "street": address_component.get("street", "")
+                }
 
-                logger.warning(f"逆地理编码失败: {coords}, message={data.get('message')}")
-                return None
+            logger.warning(f"逆地理编码失败: {coords}, message={data.get('message')}")
+            return None
 
-        except httpx.HTTPError as e:
+        except (httpx.HTTPError, MapProviderThrottled) as e:
             logger.error(f"百度地图API请求失败: {e}")
             return None
         except Exception as e:
@@ -179,42 +162,37 @@ class BaiduGeocodingService:
             return []
 
         try:
-            url = f"{self.BASE_URL}/place/v2/search"
             params = {
                 "query": keywords,
                 "output": "json",
-                "ak": self.api_key,
                 "page_size": min(limit, 20)
             }
 
             if city:
                 params["region"] = city
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("status") == 0:
-                    results = []
-                    for poi in data.get("results", []):
-                        location = poi.get("location", {})
-                        results.append({
-                            "name": poi.get("name", ""),
-                            "location": {
-                                "lng": float(location.get("lng", 0)),
-                                "lat": float(location.get("lat", 0))
-                            },
-                            "address": poi.get("address", ""),
-                            "type": poi.get("detail_info", {}).get("tag", "")
-                        })
-
-                    return results
-
-                logger.warning(f"POI搜索失败: {keywords}, message={data.get('message')}")
-                return []
-
-        except httpx.HTTPError as e:
+            data = await self._request("/place/v2/search", params)
+
+            if data.get("status") == 0:
+                results = []
+                for poi in data.get("results", []):
+                    location = poi.get("location", {})
+                    results.append({
+                        "name": poi.get("name", ""),
+                        "location": {
+                            "lng": float(location.get("lng", 0)),
+                            "lat": float(location.get("lat", 0))
+                        },
+                        "address": poi.get("address", ""),
+                        "type": poi.get("detail_info", {}).get("tag", "")
+                    })
+
+                return results
+
+            logger.warning(f"POI搜索失败: {keywords}, message={data.get('message')}")
+            return []
+
+        except (httpx.HTTPError, MapProviderThrottled) as e:
             logger.error(f"百度地图API请求失败: {e}")
             return []
         except Exception as e:
@@ -241,35 +219,30 @@ class BaiduGeocodingService:
             return None
 
         try:
-            url = f"{self.BASE_URL}/direction/v2/driving"
             origin_str = f"{origin['lng']},{origin['lat']}"
             dest_str = f"{destination['lng']},{destination['lat']}"
 
             params = {
                 "origin": origin_str,
-                "destination": dest_str,
-                "ak": self.api_key
+                "destination": dest_str
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("status") == 0:
-                    result = data.get("result", {})
-                    routes = result.get("routes", [])
-                    if routes:
-                        return {
-                            "distance": routes[0].get("distance", 0),  # 米
-                            "duration": routes[0].get("duration", 0),  # 秒
-                            "steps": routes[0].get("steps", [])
-                        }
-
-                logger.warning(f"路径规划失败: message={data.get('message')}")
-                return None
-
-        except httpx.HTTPError as e:
+            data = await self._request("/direction/v2/driving", params)
+
+            if data.get("status") == 0:
+                result = data.get("result", {})
+                routes = result.get("routes", [])
+                if routes:
+                    return {
+                        "distance": routes[0].get("distance", 0),  # 米
+                        "duration": routes[0].get("duration", 0),  # 秒
+                        "steps": routes[0].get("steps", [])
+                    }
+
+            logger.warning(f"路径规划失败: message={data.get('message')}")
+            return None
+
+        except (httpx.HTTPError, MapProviderThrottled) as e:
             logger.error(f"百度地图API请求失败: {e}")
             return None
         except Exception as e:
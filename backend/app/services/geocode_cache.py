@@ -0,0 +1,97 @@
+"""
+地理编码缓存
+两级缓存：进程内 LRU + 磁盘 SQLite 持久化存储
+按 (标准化地址, 城市, 服务商) 作为键，支持 TTL 和未命中结果的负缓存
+"""
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.cache import MISSING, TieredTTLCache
+from app.core.config.settings import settings
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_geocode_key(address: str, city: Optional[str], provider: str) -> str:
+    """标准化缓存键：全角转半角、去除多余空白、统一小写"""
+    def _norm(value: Optional[str]) -> str:
+        value = unicodedata.normalize("NFKC", value or "")
+        return _WHITESPACE_PATTERN.sub(" ", value).strip().lower()
+
+    return f"{_norm(provider)}|{_norm(city)}|{_norm(address)}"
+
+
+def _encode(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+
+def _decode(payload: Optional[str]) -> Optional[Dict[str, Any]]:
+    return json.loads(payload) if payload else None
+
+
+class GeocodeCache:
+    """
+    地理编码两级缓存（进程内 LRU + 磁盘 SQLite，见 TieredTTLCache）
+
+    命中失败的地址以 None 缓存（负缓存），使用更短的 TTL
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        max_size: Optional[int] = None,
+        ttl: Optional[int] = None,
+        negative_ttl: Optional[int] = None
+    ):
+        self.db_path = db_path or Path(__file__).resolve().parents[2] / ".cache" / "geocode" / "geocode.sqlite3"
+        self.ttl = ttl if ttl is not None else settings.GEOCODE_CACHE_TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.GEOCODE_NEGATIVE_CACHE_TTL
+        self._store = TieredTTLCache(
+            db_path=self.db_path,
+            table="geocode_entries",
+            max_size=max_size or settings.GEOCODE_CACHE_MAX_SIZE,
+            encode=_encode,
+            decode=_decode,
+            counters=("negative_hits",),
+            label="地理编码"
+        )
+
+    async def get(self, address: str, city: Optional[str], provider: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        查询缓存
+
+        Returns:
+            (是否命中, 坐标结果)。命中负缓存时返回 (True, None)
+        """
+        value = await self._store.get(normalize_geocode_key(address, city, provider))
+        if value is MISSING:
+            return False, None
+        if value is None:
+            self._store.record("negative_hits")
+        return True, value
+
+    async def set(self, address: str, city: Optional[str], provider: str, value: Optional[Dict[str, Any]]) -> None:
+        """写入缓存，value 为 None 表示负缓存"""
+        ttl = self.ttl if value is not None else self.negative_ttl
+        await self._store.set(normalize_geocode_key(address, city, provider), value, ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        return self._store.stats()
+
+    def clear_memory(self) -> None:
+        self._store.clear_memory()
+
+
+_geocode_cache: Optional[GeocodeCache] = None
+
+
+def get_geocode_cache() -> GeocodeCache:
+    global _geocode_cache
+    if _geocode_cache is None:
+        _geocode_cache = GeocodeCache()
+    return _geocode_cache
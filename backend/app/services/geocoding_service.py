@@ -7,27 +7,40 @@
 import httpx
 import hashlib
 import logging
-from typing import Optional, Dict, Any, List
-from urllib.parse import urlencode
+from typing import Optional, Dict, Any, List, Tuple
 from app.core.config.settings import settings
+from app.services.geocode_cache import GeocodeCache
+from app.services.map_provider import BaseMapProvider, MapProviderThrottled
 
 logger = logging.getLogger(__name__)
 
 
-class AMapGeocodingService:
+class AMapGeocodingService(BaseMapProvider):
     """高德地图API服务（支持安全密钥）"""
 
     BASE_URL = "https://restapi.amap.com"
+    PROVIDER = "amap"
+    DEFAULT_QPS = 3.0
+    # 10004/10014/10019/10020/10021: 单位时间内访问过于频繁，可退避重试
+    THROTTLE_INFOCODES = {"10004", "10014", "10019", "10020", "10021"}
 
-    def __init__(self, api_key: Optional[str] = None, secret_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        cache: Optional[GeocodeCache] = None,
+        qps: Optional[float] = None
+    ):
         """
         初始化高德地图服务
 
         Args:
             api_key: 高德地图API密钥，如果为None则从配置读取
             secret_key: 高德地图安全密钥，如果为None则从配置读取
+            cache: 地理编码缓存，如果为None则使用进程级共享缓存
+            qps: 每秒请求数配额，如果为None则从配置读取
         """
-        self.api_key = api_key or settings.MAP_API_KEY
+        super().__init__(api_key=api_key, cache=cache, qps=qps)
         self.secret_key = secret_key or settings.MAP_SECRET_KEY
 
         if not self.api_key:
@@ -68,75 +81,45 @@ class AMapGeocodingService:
 
         return signature
 
-    async def geocode(self, address: str, city: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """
-        地址解析：将结构化地址转换为经纬度坐标
-
-        Args:
-            address: 待解析的结构化地址描述
-            city: 指定查询的城市（可选）
+    def _prepare_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        # 签名不包含 key 本身
+        if self.secret_key:
+            params["sig"] = self._generate_signature(params)
+        params["key"] = self.api_key
+        return params
 
-        Returns:
-            包含经纬度信息的字典，格式：
-            {
-                "lng": 经度,
-                "lat": 纬度,
-                "formatted_address": 格式化地址,
-                "level": 地址精度
-            }
-            如果解析失败返回None
-        """
-        if not self.api_key:
-            logger.error("API密钥未配置")
-            return None
+    def _is_throttled(self, data: Dict[str, Any]) -> bool:
+        return data.get("status") != "1" and str(data.get("infocode")) in self.THROTTLE_INFOCODES
 
-        try:
-            url = f"{self.BASE_URL}/v3/geocode/geo"
-            params = {
-                "address": address
-            }
+    async def geocode_uncached(self, address: str, city: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+        params = {
+            "address": address
+        }
 
-            if city:
-                params["city"] = city
+        if city:
+            params["city"] = city
 
-            # 添加签名
-            if self.secret_key:
-                sig = self._generate_signature(params)
-                params["sig"] = sig
+        logger.info(f"调用地理编码API: address={address}, city={city}")
 
-            # 添加 key
-            params["key"] = self.api_key
+        data = await self._request("/v3/geocode/geo", params)
 
-            logger.info(f"调用地理编码API: address={address}, city={city}")
+        logger.debug(f"API响应: status={data.get('status')}, info={data.get('info')}")
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+        if data.get("status") == "1" and data.get("geocodes"):
+            geocode = data["geocodes"][0]
+            location = geocode.get("location", "")
+            if "," in location:
+                lng, lat = location.split(",")
+                return {
+                    "lng": float(lng),
+                    "lat": float(lat),
+                    "formatted_address": geocode.get("formatted_address", ""),
+                    "level": geocode.get("level", "")
+                }, True
 
-                logger.debug(f"API响应: status={data.get('status')}, info={data.get('info')}")
-
-                if data.get("status") == "1" and data.get("geocodes"):
-                    geocode = data["geocodes"][0]
-                    location = geocode.get("location", "")
-                    if "," in location:
-                        lng, lat = location.split(",")
-                        return {
-                            "lng": float(lng),
-                            "lat": float(lat),
-                            "formatted_address": geocode.get("formatted_address", ""),
-                            "level": geocode.get("level", "")
-                        }
-
-                logger.warning(f"地址解析失败: {address}, info={data.get('info')}, infocode={data.get('infocode')}")
-                return None
-
-        except httpx.HTTPError as e:
-            logger.error(f"高德地图API请求失败: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"地理编码异常: {e}")
-            return None
+        logger.warning(f"地址解析失败: {address}, info={data.get('info')}, infocode={data.get('infocode')}")
+        # status=1 但没有结果表示地址无法解析，可以负缓存
+        return None, data.get("status") == "1"
 
     async def regeocode(self, lng: float, lat: float) -> Optional[Dict[str, Any]]:
         """
@@ -162,41 +145,30 @@ class AMapGeocodingService:
             return None
 
         try:
-            url = f"{self.BASE_URL}/v3/geocode/regeo"
             location = f"{lng},{lat}"
             params = {
                 "location": location,
                 "extensions": "base"  # 返回基本信息
             }
 
-            # 添加签名
-            if self.secret_key:
-                sig = self._generate_signature(params)
-                params["sig"] = sig
+            data = await self._request("/v3/geocode/regeo", params)
 
-            params["key"] = self.api_key
+            if data.get("status") == "1" and data.get("regeocode"):
+                regeocode = data["regeocode"]
+                address_component = regeocode.get("addressComponent", {})
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+                return {
+                    "formatted_address": regeocode.get("formatted_address", ""),
+                    "province": address_component.get("province", ""),
+                    "city": address_component.get("city", ""),
+                    "district": address_component.get("district", ""),
+                    "street": address_component.get("streetNumber", {}).get("street", "")
+                }
 
-                if data.get("status") == "1" and data.get("regeocode"):
-                    regeocode = data["regeocode"]
-                    address_component = regeocode.get("addressComponent", {})
-
-                    return {
-                        "formatted_address": regeocode.get("formatted_address", ""),
-                        "province": address_component.get("province", ""),
-                        "city": address_component.get("city", ""),
-                        "district": address_component.get("district", ""),
-                        "street": address_component.get("streetNumber", {}).get("street", "")
-                    }
-
-                logger.warning(f"逆地理编码失败: {location}, info={data.get('info')}")
-                return None
+            logger.warning(f"逆地理编码失败: {location}, info={data.get('info')}")
+            return None
 
-        except httpx.HTTPError as e:
+        except (httpx.HTTPError, MapProviderThrottled) as e:
             logger.error(f"高德地图API请求失败: {e}")
             return None
         except Exception as e:
@@ -231,7 +203,6 @@ class AMapGeocodingService:
             return []
 
         try:
-            url = f"{self.BASE_URL}/v5/place/text"
             params = {
                 "keywords": keywords,
                 "offset": limit
@@ -240,40 +211,30 @@ class AMapGeocodingService:
             if city:
                 params["city"] = city
 
-            # 添加签名
-            if self.secret_key:
-                sig = self._generate_signature(params)
-                params["sig"] = sig
+            data = await self._request("/v5/place/text", params)
 
-            params["key"] = self.api_key
-
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("status") == "1" and data.get("pois"):
-                    results = []
-                    for poi in data["pois"]:
-                        location = poi.get("location", "")
-                        lng, lat = 0.0, 0.0
-                        if "," in location:
-                            lng_str, lat_str = location.split(",")
-                            lng, lat = float(lng_str), float(lat_str)
+            if data.get("status") == "1" and data.get("pois"):
+                results = []
+                for poi in data["pois"]:
+                    location = poi.get("location", "")
+                    lng, lat = 0.0, 0.0
+                    if "," in location:
+                        lng_str, lat_str = location.split(",")
+                        lng, lat = float(lng_str), float(lat_str)
 
-                        results.append({
-                            "name": poi.get("name", ""),
-                            "location": {"lng": lng, "lat": lat},
-                            "address": poi.get("address", ""),
-                            "type": poi.get("type", "")
-                        })
+                    results.append({
+                        "name": poi.get("name", ""),
+                        "location": {"lng": lng, "lat": lat},
+                        "address": poi.get("address", ""),
+                        "type": poi.get("type", "")
+                    })
 
-                    return results
+                return results
 
-                logger.warning(f"POI搜索失败: {keywords}, info={data.get('info')}")
-                return []
+            logger.warning(f"POI搜索失败: {keywords}, info={data.get('info')}")
+            return []
 
-        except httpx.HTTPError as e:
+        except (httpx.HTTPError, MapProviderThrottled) as e:
             logger.error(f"高德地图API请求失败: {e}")
             return []
         except Exception as e:
@@ -300,7 +261,6 @@ class AMapGeocodingService:
             return None
 
         try:
-            url = f"{self.BASE_URL}/v5/direction/driving"
             origin_str = f"{origin['lng']},{origin['lat']}"
             dest_str = f"{destination['lng']},{destination['lat']}"
 
@@ -309,32 +269,22 @@ class AMapGeocodingService:
                 "destination": dest_str
             }
 
-            # 添加签名
-            if self.secret_key:
-                sig = self._generate_signature(params)
-                params["sig"] = sig
-
-            params["key"] = self.api_key
+            data = await self._request("/v5/direction/driving", params)
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("status") == "1" and data.get("route"):
-                    route = data["route"]
-                    paths = route.get("paths", [])
-                    if paths:
-                        return {
-                            "distance": paths[0].get("distance", 0),  # 米
-                            "duration": paths[0].get("duration", 0),  # 秒
-                            "steps": paths[0].get("steps", [])
-                        }
+            if data.get("status") == "1" and data.get("route"):
+                route = data["route"]
+                paths = route.get("paths", [])
+                if paths:
+                    return {
+                        "distance": paths[0].get("distance", 0),  # 米
+                        "duration": paths[0].get("duration", 0),  # 秒
+                        "steps": paths[0].get("steps", [])
+                    }
 
-                logger.warning(f"路径规划失败: info={data.get('info')}")
-                return None
+            logger.warning(f"路径规划失败: info={data.get('info')}")
+            return None
 
-        except httpx.HTTPError as e:
+        except (httpx.HTTPError, MapProviderThrottled) as e:
             logger.error(f"高德地图API请求失败: {e}")
             return None
         except Exception as e:
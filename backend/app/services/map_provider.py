@@ -0,0 +1,241 @@
+"""
+地图服务商公共抽象
+百度、高德等地图服务共享的请求管线：
+- 复用进程级 HTTP 连接池
+- 按服务商 QPS 配额的令牌桶限流
+- 服务商限流错误码 / HTTP 429 / 5xx 的抖动退避重试
+- 带缓存和并发控制的批量地理编码 geocode_many
+"""
+
+import asyncio
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config.settings import settings
+from app.core.http import get_http_client
+from app.services.geocode_cache import GeocodeCache, get_geocode_cache, normalize_geocode_key
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """异步令牌桶：以 rate 个/秒的速度补充令牌，最多积累 capacity 个"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = max(rate, 0.001)
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class MapProviderThrottled(Exception):
+    """服务商返回限流错误"""
+
+
+# 令牌桶按 (服务商, 事件循环) 共享，保证同一进程内所有实例共用配额
+_buckets: Dict[Tuple[str, int], TokenBucket] = {}
+
+
+class BaseMapProvider(ABC):
+    """地图服务商基类，子类实现具体接口的参数和响应解析"""
+
+    PROVIDER = ""
+    BASE_URL = ""
+    DEFAULT_QPS = 3.0
+    REQUEST_TIMEOUT = 10.0
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[GeocodeCache] = None,
+        qps: Optional[float] = None
+    ):
+        self.api_key = api_key or settings.MAP_API_KEY
+        self.cache = cache or get_geocode_cache()
+        self.qps = qps or settings.MAP_QPS or self.DEFAULT_QPS
+        self.max_retries = settings.MAP_MAX_RETRIES
+
+    # ------------------------------------------------------------------
+    # 子类钩子
+    # ------------------------------------------------------------------
+    def _prepare_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """添加鉴权等公共参数"""
+        return params
+
+    @abstractmethod
+    def _is_throttled(self, data: Dict[str, Any]) -> bool:
+        """响应是否为服务商限流错误"""
+
+    @abstractmethod
+    async def geocode_uncached(self, address: str, city: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        直接调用服务商地址解析接口
+
+        Returns:
+            (坐标结果, 是否可以缓存)。仅在服务商明确给出结果或明确“无结果”时允许缓存
+        """
+
+    @abstractmethod
+    async def regeocode(self, lng: float, lat: float) -> Optional[Dict[str, Any]]:
+        """逆地理编码"""
+
+    @abstractmethod
+    async def text_search(self, keywords: str, city: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """POI 搜索"""
+
+    @abstractmethod
+    async def driving_route(self, origin: Dict[str, float], destination: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """驾车路径规划"""
+
+    # ------------------------------------------------------------------
+    # 公共请求管线
+    # ------------------------------------------------------------------
+    def _bucket(self) -> TokenBucket:
+        key = (self.PROVIDER, id(asyncio.get_running_loop()))
+        bucket = _buckets.get(key)
+        if bucket is None or bucket.rate != self.qps:
+            bucket = TokenBucket(self.qps)
+            _buckets[key] = bucket
+        return bucket
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """指数退避 + 全抖动"""
+        return random.uniform(0, settings.MAP_RETRY_BASE_DELAY * (2 ** attempt))
+
+    async def _request(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        发送 GET 请求并返回 JSON
+
+        限流错误和 HTTP 429/5xx 会按抖动退避重试，重试耗尽后抛出异常
+        """
+        url = f"{self.BASE_URL}{path}"
+        params = self._prepare_params(dict(params))
+        client = get_http_client(url)
+
+        for attempt in range(self.max_retries + 1):
+            await self._bucket().acquire()
+            try:
+                response = await client.get(url, params=params, timeout=self.REQUEST_TIMEOUT)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise MapProviderThrottled(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                data = response.json()
+                if self._is_throttled(data):
+                    raise MapProviderThrottled(f"provider throttled: {data}")
+                return data
+            except (MapProviderThrottled, httpx.TransportError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"{self.PROVIDER} 地图接口限流或网络异常，{delay:.2f}s 后重试 ({attempt + 1}/{self.max_retries}): {e}")
+                await asyncio.sleep(delay)
+
+        raise MapProviderThrottled("retries exhausted")
+
+    # ------------------------------------------------------------------
+    # 地理编码（带缓存）
+    # ------------------------------------------------------------------
+    async def geocode(self, address: str, city: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        地址解析：将结构化地址转换为经纬度坐标
+
+        Args:
+            address: 待解析的结构化地址描述
+            city: 指定查询的城市（可选）
+
+        Returns:
+            包含经纬度信息的字典，格式：
+            {
+                "lng": 经度,
+                "lat": 纬度,
+                "formatted_address": 格式化地址,
+                "level": 地址精度
+            }
+            如果解析失败返回None
+        """
+        if not self.api_key:
+            logger.error("API密钥未配置")
+            return None
+
+        hit, cached = await self.cache.get(address, city, self.PROVIDER)
+        if hit:
+            logger.debug(f"地理编码缓存命中: address={address}, city={city}")
+            return cached
+
+        try:
+            result, cacheable = await self.geocode_uncached(address, city)
+        except (httpx.HTTPError, MapProviderThrottled) as e:
+            logger.error(f"{self.PROVIDER} 地图API请求失败: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"地理编码异常: {e}")
+            return None
+
+        if cacheable:
+            await self.cache.set(address, city, self.PROVIDER, result)
+        return result
+
+    async def geocode_many(
+        self,
+        addresses: List[str],
+        city: Optional[str] = None,
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        批量地理编码
+
+        按标准化地址去重后并发解析，并发数受 concurrency 限制，实际请求速率受令牌桶限制
+
+        Returns:
+            {原始地址: 坐标结果或None}
+        """
+        unique: Dict[str, List[str]] = {}
+        for address in addresses:
+            if not address:
+                continue
+            key = normalize_geocode_key(address, city, self.PROVIDER)
+            unique.setdefault(key, []).append(address)
+
+        semaphore = asyncio.Semaphore(max(concurrency or settings.GEOCODE_CONCURRENCY, 1))
+
+        async def resolve(address: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.geocode(address=address, city=city)
+
+        groups = list(unique.values())
+        results = await asyncio.gather(*(resolve(group[0]) for group in groups))
+
+        resolved: Dict[str, Optional[Dict[str, Any]]] = {}
+        for group, result in zip(groups, results):
+            for address in group:
+                resolved[address] = result
+        return resolved
+
+
+def get_map_provider(provider: Optional[str] = None) -> BaseMapProvider:
+    """根据配置创建地图服务商实例（baidu 或 amap）"""
+    name = (provider or settings.MAP_PROVIDER or "baidu").lower()
+    if name == "amap":
+        from app.services.geocoding_service import AMapGeocodingService
+        return AMapGeocodingService()
+    if name == "baidu":
+        from app.services.baidu_geocoding_service import BaiduGeocodingService
+        return BaiduGeocodingService()
+    raise ValueError(f"Unsupported map provider: {name}")
@@ -0,0 +1,114 @@
+"""
+HTTP 连接池基准测试
+
+在本地启动一个 Anthropic 兼容的桩服务器，比较两种调用方式的 p50/p99 延迟：
+  - before: 每次请求新建 httpx.AsyncClient（旧实现）
+  - after:  通过 app.core.http 的进程级连接池复用连接
+
+用法:
+    python benchmarks/bench_http_pool.py [--requests 500] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.core.http import HTTPClientRegistry
+
+_BODY = json.dumps({"content": [{"type": "text", "text": "北京三日游推荐故宫、长城、颐和园"}]}).encode("utf-8")
+_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Connection: keep-alive\r\n"
+    b"Content-Length: " + str(len(_BODY)).encode() + b"\r\n\r\n" + _BODY
+)
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """极简 HTTP/1.1 keep-alive 桩服务"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            writer.write(_RESPONSE)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run(label, call, total, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    wall = time.perf_counter() - wall_start
+    print(
+        f"{label:<8} p50={_percentile(latencies, 50):7.3f}ms  p99={_percentile(latencies, 99):7.3f}ms  "
+        f"mean={statistics.mean(latencies):7.3f}ms  throughput={total / wall:8.1f} req/s"
+    )
+
+
+async def main(total: int, concurrency: int) -> None:
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/anthropic/v1/messages"
+    payload = {"model": "stub", "max_tokens": 16, "messages": [{"role": "user", "content": "你好"}]}
+
+    async def fresh_client_call():
+        async with httpx.AsyncClient(timeout=10) as client:
+            return await client.post(url, json=payload)
+
+    registry = HTTPClientRegistry()
+
+    async def pooled_call():
+        return await registry.get(url).post(url, json=payload, timeout=10)
+
+    print(f"requests={total} concurrency={concurrency} server=127.0.0.1:{port}")
+    # 预热一次，避免首次导入/解析的开销计入
+    await fresh_client_call()
+    await pooled_call()
+    await _run("before", fresh_client_call, total, concurrency)
+    await _run("after", pooled_call, total, concurrency)
+
+    await registry.aclose()
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,163 @@
+"""
+JSON 修复基准测试
+
+对比两种修复方式在录制的模型错误输出和合成的大体积输出（30-60KB）上的耗时与成功率，
+并测量深层嵌套 + 不匹配闭括号的病态输入下修复耗时是否随长度线性增长：
+  - legacy: 旧实现，re.findall 提取最大 {...} 后最多三轮、每轮约 13 次正则替换并 json.loads
+  - repair: app.modules.planner.agents.json_repair 单遍修复
+
+用法:
+    python benchmarks/bench_json_repair.py [--repeat 5] [--days 7 14]
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.planner.agents.json_repair import repair_json
+
+FIXTURES = project_root / "tests" / "fixtures" / "llm_outputs"
+
+_LEGACY_REPAIRS = [
+    (r'"', '"'),
+    (r'"', '"'),
+    (r'}\s*"', '},"'),
+    (r']\s*"', '],"'),
+    (r'"\s*\{', '",{'),
+    (r'(\d)\s*"', r'\1,"'),
+    (r'(true|false)\s*"', r'\1,"'),
+    (r']\s*}', ']}'),
+    (r',\s*}', '}'),
+    (r',\s*]', ']'),
+    (r'(\w+)\s*:', r'"\1":'),
+    (r"'([^']*)'", r'"\1"'),
+]
+
+
+def legacy_repair(json_str):
+    try:
+        json.loads(json_str)
+        return json_str
+    except json.JSONDecodeError:
+        pass
+    repaired = json_str
+    for _ in range(3):
+        original = repaired
+        for pattern, replacement in _LEGACY_REPAIRS:
+            repaired = re.sub(pattern, replacement, repaired)
+        try:
+            json.loads(repaired)
+            return repaired
+        except json.JSONDecodeError:
+            if repaired == original:
+                break
+    return None
+
+
+def legacy_parse(response):
+    for json_str in sorted(re.findall(r'\{[\s\S]*\}', response), key=len, reverse=True):
+        repaired = legacy_repair(json_str)
+        if repaired:
+            try:
+                return json.loads(repaired)
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def repair_parse(response):
+    repaired = repair_json(response)
+    return json.loads(repaired) if repaired else None
+
+
+def _synthetic_output(days, seed):
+    """生成一份大体积行程输出，并注入模型常见错误"""
+    rng = random.Random(seed)
+    itinerary = {
+        "title": f"云南{days}日游",
+        "summary": "昆明、大理、丽江、香格里拉深度游",
+        "days": [
+            {
+                "day_number": day,
+                "title": f"第{day}天",
+                "activities": [
+                    {
+                        "type": "attraction",
+                        "time": f"{8 + index}:00",
+                        "title": f"景点{day}-{index}",
+                        "description": "这里是一段较长的景点描述，介绍历史背景、特色亮点与游览路线。" * 3,
+                        "ticket_price": rng.randint(0, 200),
+                        "need_booking": rng.random() < 0.5,
+                        "tips": ["建议提前预约", "注意防晒", "穿舒适的鞋子"],
+                        "transportation": {"method": "打车", "from": "酒店", "to": f"景点{day}-{index}", "cost": 30},
+                    }
+                    for index in range(6)
+                ],
+                "notes": "当日小结",
+            }
+            for day in range(1, days + 1)
+        ],
+    }
+    text = json.dumps(itinerary, ensure_ascii=False, indent=2)
+    text = text.replace('"need_booking": true,', '"need_booking": true', 3)
+    text = text.replace("]\n", "],\n", 5)
+    return "```json\n" + text[: int(len(text) * 0.97)]
+
+
+def _cases(days_list):
+    cases = [(path.stem, path.read_text(encoding="utf-8")) for path in sorted(FIXTURES.glob("*.txt"))]
+    for days in days_list:
+        cases.append((f"synthetic_{days}d", _synthetic_output(days, days)))
+    return cases
+
+
+def _measure(fn, text, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, isinstance(result, dict)
+
+
+def main(repeat, days_list):
+    print(f"{'case':<36}{'size(KB)':>10}{'legacy(ms)':>12}{'ok':>4}{'repair(ms)':>12}{'ok':>4}{'speedup':>10}")
+    for name, text in _cases(days_list):
+        legacy_time, legacy_ok = _measure(legacy_parse, text, repeat)
+        repair_time, repair_ok = _measure(repair_parse, text, repeat)
+        print(
+            f"{name:<36}{len(text.encode('utf-8')) / 1024:>10.1f}"
+            f"{legacy_time * 1000:>12.2f}{'Y' if legacy_ok else 'N':>4}"
+            f"{repair_time * 1000:>12.2f}{'Y' if repair_ok else 'N':>4}"
+            f"{legacy_time / repair_time:>9.1f}x"
+        )
+
+    # 病态输入：深层嵌套后跟同样多的不匹配闭括号，修复耗时应随长度线性增长
+    # （嵌套超出 json 模块递归限制，只测修复本身）
+    print(f"\n{'case':<36}{'size(KB)':>10}{'repair(ms)':>12}{'us/KB':>10}")
+    for depth in (2000, 8000, 32000):
+        text = '{"a":' * depth + "]" * depth
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            repair_json(text)
+            best = min(best, time.perf_counter() - start)
+        size_kb = len(text) / 1024
+        print(f"{f'unmatched_closers_{depth}':<36}{size_kb:>10.1f}{best * 1000:>12.2f}{best * 1e6 / size_kb:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 14])
+    args = parser.parse_args()
+    main(args.repeat, args.days)
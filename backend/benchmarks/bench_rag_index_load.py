@@ -0,0 +1,89 @@
+"""
+RAG 索引加载基准测试
+
+生成一个合成语料并构建 BM25 索引段，比较两种持久化格式的冷加载耗时和首个查询延迟：
+  - before: pickle 序列化的 to_state()（旧实现）
+  - after:  app.modules.qa.rag.columnar 的 mmap 列式格式
+
+用法:
+    python benchmarks/bench_rag_index_load.py [--chunks 20000] [--repeat 5]
+"""
+
+import argparse
+import pickle
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.columnar import load_columnar, write_columnar
+from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk
+
+_CJK = [chr(code) for code in range(0x4E00, 0x4E00 + 3000)]
+_WORDS = [f"word{i}" for i in range(5000)]
+
+
+def _make_chunks(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(count):
+        parts = [rng.choice(_CJK) for _ in range(300)] + [f" {rng.choice(_WORDS)} " for _ in range(40)]
+        rng.shuffle(parts)
+        chunks.append(Chunk(chunk_id=f"doc-{i}", content="".join(parts), source="doc", page=i))
+    return chunks
+
+
+def _timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main(chunk_count: int, repeat: int) -> None:
+    print(f"构建合成语料: {chunk_count} chunks")
+    store = BM25VectorStore(_make_chunks(chunk_count))
+    query = "".join(random.Random(7).choice(_CJK) for _ in range(8)) + " word42"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = Path(tmp) / "segment.pkl"
+        columnar_path = Path(tmp) / "segment.col"
+        pickle_path.write_bytes(pickle.dumps(store.to_state()))
+        write_columnar(store, columnar_path)
+
+        def load_pickle():
+            return BM25VectorStore.from_state(pickle.loads(pickle_path.read_bytes()))
+
+        def load_mmap():
+            return load_columnar(columnar_path)
+
+        rows = []
+        for label, path, loader in [
+            ("before (pickle)", pickle_path, load_pickle),
+            ("after (mmap)", columnar_path, load_mmap),
+        ]:
+            load_ms = _timed(loader, repeat)
+            loaded = loader()
+            first_query_ms = _timed(lambda: loaded.search(query, top_k=4), 1)[0]
+            assert [c.chunk_id for c, _ in loaded.search(query)] == [c.chunk_id for c, _ in store.search(query)]
+            rows.append((label, path.stat().st_size / 1024 / 1024, statistics.median(load_ms), first_query_ms))
+
+    print(f"{'format':<18}{'size(MB)':>10}{'load p50(ms)':>15}{'1st query(ms)':>15}")
+    for label, size_mb, load_ms, query_ms in rows:
+        print(f"{label:<18}{size_mb:>10.1f}{load_ms:>15.2f}{query_ms:>15.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.chunks, args.repeat)
@@ -0,0 +1,130 @@
+"""
+流式响应解析回放基准测试
+
+将录制的流（tests/fixtures/llm_streams）和合成的长流按固定大小切块回放，
+比较两种解析方式输出文本增量的耗时（每个输出 token 的微秒数）：
+  - legacy: 旧实现，按行切分，每个 data: 行都 json.loads，只识别 delta/content
+  - sse:    app.core.ai.sse 增量解码，thinking 块在解析 JSON 前跳过
+
+用法:
+    python benchmarks/bench_sse_replay.py [--repeat 5] [--tokens 4000] [--thinking-ratio 0.5] [--chunk-size 256]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.core.ai.sse import SSEDecoder, StreamTextExtractor
+
+FIXTURES = project_root / "tests" / "fixtures" / "llm_streams"
+
+
+def legacy_parse(chunks):
+    """旧实现：aiter_lines + 逐行 json.loads"""
+    buffer = ""
+    deltas = []
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line = line.rstrip("\r")
+            if not line.startswith("data: "):
+                continue
+            data_str = line[6:]
+            if data_str.strip() == "[DONE]":
+                return deltas
+            try:
+                data = json.loads(data_str)
+            except json.JSONDecodeError:
+                continue
+            if "delta" in data:
+                delta = data["delta"]
+                content = (delta.get("content") or delta.get("text") or "") if isinstance(delta, dict) else str(delta)
+                deltas.append(content)
+            elif "content" in data:
+                deltas.append(data.get("content", ""))
+    return deltas
+
+
+def sse_parse(chunks):
+    decoder = SSEDecoder()
+    extractor = StreamTextExtractor()
+    deltas = []
+    for chunk in chunks:
+        deltas.extend(extractor.feed(decoder.feed(chunk)))
+        if extractor.done:
+            return deltas
+    deltas.extend(extractor.feed(decoder.flush()))
+    return deltas
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+def _synthetic_stream(tokens, thinking_ratio):
+    """合成一条 Anthropic 兼容长流：thinking 块在前，文本块在后"""
+    thinking_tokens = int(tokens * thinking_ratio)
+    parts = [_event("message_start", {"type": "message_start", "message": {"id": "msg", "content": []}})]
+    parts.append(_event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "thinking", "thinking": ""}}))
+    for index in range(thinking_tokens):
+        parts.append(_event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "thinking_delta", "thinking": f"思考{index}"}}))
+    parts.append(_event("content_block_stop", {"type": "content_block_stop", "index": 0}))
+    parts.append(_event("content_block_start", {"type": "content_block_start", "index": 1, "content_block": {"type": "text", "text": ""}}))
+    for index in range(tokens - thinking_tokens):
+        parts.append(_event("content_block_delta", {"type": "content_block_delta", "index": 1, "delta": {"type": "text_delta", "text": f"行程{index}"}}))
+    parts.append(_event("content_block_stop", {"type": "content_block_stop", "index": 1}))
+    parts.append(_event("message_stop", {"type": "message_stop"}))
+    return "".join(parts)
+
+
+def _split(text, chunk_size):
+    return [text[index:index + chunk_size] for index in range(0, len(text), chunk_size)]
+
+
+def _measure(fn, chunks, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best, [delta for delta in result if delta]
+
+
+def main(repeat, tokens, thinking_ratio, chunk_size):
+    cases = []
+    for path in sorted(FIXTURES.glob("*.sse")):
+        with open(path, encoding="utf-8", newline="") as f:
+            cases.append((path.stem, f.read()))
+    cases.append((f"synthetic_{tokens}tok", _synthetic_stream(tokens, thinking_ratio)))
+
+    print(f"{'case':<28}{'events':>8}{'legacy(ms)':>12}{'out':>6}{'sse(ms)':>10}{'out':>6}{'sse us/tok':>12}{'speedup':>9}")
+    for name, text in cases:
+        chunks = _split(text, chunk_size)
+        legacy_time, legacy_out = _measure(legacy_parse, chunks, repeat)
+        sse_time, sse_out = _measure(sse_parse, chunks, repeat)
+        events = text.replace("\r\n", "\n").count("\n\n")
+        per_token = sse_time * 1e6 / max(len(sse_out), 1)
+        print(
+            f"{name:<28}{events:>8}"
+            f"{legacy_time * 1000:>12.2f}{len(legacy_out):>6}"
+            f"{sse_time * 1000:>10.2f}{len(sse_out):>6}"
+            f"{per_token:>12.2f}{legacy_time / sse_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=4000)
+    parser.add_argument("--thinking-ratio", type=float, default=0.5)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    args = parser.parse_args()
+    main(args.repeat, args.tokens, args.thinking_ratio, args.chunk_size)
@@ -0,0 +1,98 @@
+"""
+分词器微基准测试
+
+对 dataset/ 下旅游攻略 PDF 的文本（没有 PDF 时使用合成中文语料）逐块分词，
+报告各实现的 tokens/sec 以及子进程峰值 RSS：
+  - legacy:   原实现，正则 findall 后逐个 token 调用 lower()
+  - tokenize: 整体小写后一次 findall（建索引和查询使用的路径）
+  - stream:   iter_tokens 生成器，不物化 token 列表
+  - bigrams:  tokenize 并输出相邻汉字二元组
+
+每个实现在独立的子进程中运行，RSS 互不影响。
+
+用法:
+    python benchmarks/bench_tokenizer.py [--dataset DIR] [--chunk-size 1200] [--repeat 3]
+"""
+
+import argparse
+import multiprocessing
+import random
+import re
+import resource
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.ingest import iter_pdf_pages
+from app.modules.qa.rag.vector_store import iter_tokens, tokenize
+
+_LEGACY_PATTERN = re.compile(r"[一-鿿]|[a-zA-Z0-9]+")
+_TRAVEL_WORDS = [
+    "北京", "故宫", "长城", "颐和园", "上海", "外滩", "签证", "护照", "酒店", "机场",
+    "地铁", "门票", "景点", "美食", "攻略", "行程", "Day", "Metro", "Hotel", "2024",
+]
+
+
+def legacy_tokenize(text):
+    return [token.lower() for token in _LEGACY_PATTERN.findall(text)]
+
+
+def _load_chunks(dataset: Path, chunk_size: int) -> list:
+    texts = []
+    for pdf in sorted(dataset.glob("*.pdf")) if dataset.exists() else []:
+        texts.append("\n".join(text for _, text in iter_pdf_pages(pdf, max_pages=10 ** 6, max_text_length=10 ** 9)))
+    if not texts:
+        rng = random.Random(42)
+        texts = ["".join(rng.choice(_TRAVEL_WORDS) + rng.choice("，。 \n") for _ in range(200000))]
+    text = "\n".join(texts)
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def _run_variant(name: str, chunks: list, repeat: int, queue) -> None:
+    variants = {
+        "legacy": lambda: sum(len(legacy_tokenize(chunk)) for chunk in chunks),
+        "tokenize": lambda: sum(len(tokenize(chunk)) for chunk in chunks),
+        "stream": lambda: sum(sum(1 for _ in iter_tokens(chunk)) for chunk in chunks),
+        "bigrams": lambda: sum(len(tokenize(chunk, bigrams=True)) for chunk in chunks),
+    }
+    fn = variants[name]
+    best = float("inf")
+    tokens = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = fn()
+        best = min(best, time.perf_counter() - start)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((name, tokens, tokens / best, peak_rss_mb))
+
+
+def main(dataset: Path, chunk_size: int, repeat: int) -> None:
+    chunks = _load_chunks(dataset, chunk_size)
+    print(f"语料: {len(chunks)} chunks, {sum(len(c) for c in chunks)} 字符")
+
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    rows = []
+    for name in ["legacy", "tokenize", "stream", "bigrams"]:
+        process = ctx.Process(target=_run_variant, args=(name, chunks, repeat, queue))
+        process.start()
+        rows.append(queue.get())
+        process.join()
+
+    baseline = rows[0][2]
+    print(f"{'variant':<10}{'tokens':>12}{'tokens/sec':>14}{'speedup':>10}{'peak RSS(MB)':>14}")
+    for name, tokens, rate, rss_mb in rows:
+        print(f"{name:<10}{tokens:>12}{rate:>14,.0f}{rate / baseline:>9.2f}x{rss_mb:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", type=Path, default=project_root / "dataset")
+    parser.add_argument("--chunk-size", type=int, default=1200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.dataset, args.chunk_size, args.repeat)
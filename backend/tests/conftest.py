@@ -0,0 +1,54 @@
+"""
+测试共享 fixture
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+
+@pytest.fixture
+def make_kb(tmp_path, monkeypatch):
+    """
+    KnowledgeBase 工厂：数据集和缓存目录都在 tmp_path 下，PDF 按纯文本文件读取
+
+    make_kb(docs=None, gate=None, **kwargs)
+        docs: 写入数据集目录的 {文件名: 文本}
+        gate: {文件名: threading.Event}，读取该文件前等待事件（模拟慢速构建）
+        kwargs: 传给 KnowledgeBase，默认 chunk_size=20、chunk_overlap=5
+
+    make_kb.reads 按顺序记录被读取的文件名，make_kb.dataset 为数据集目录。
+    多次调用共享同一个数据集和缓存目录，可以模拟进程重启。
+    """
+    from app.modules.qa.rag.knowledge_base import KnowledgeBase
+
+    dataset = tmp_path / "dataset"
+    reads = []
+    gates = {}
+
+    def fake_read(self, pdf_path):
+        reads.append(pdf_path.stem)
+        if pdf_path.stem in gates:
+            gates[pdf_path.stem].wait(timeout=5)
+        yield 0, pdf_path.read_text(encoding="utf-8")
+
+    monkeypatch.setattr(KnowledgeBase, "_iter_pdf_pages", fake_read)
+
+    def factory(docs=None, gate=None, **kwargs):
+        dataset.mkdir(exist_ok=True)
+        for name, text in (docs or {}).items():
+            (dataset / f"{name}.pdf").write_text(text, encoding="utf-8")
+        gates.update(gate or {})
+        kb = KnowledgeBase(dataset_dir=dataset, **{"chunk_size": 20, "chunk_overlap": 5, **kwargs})
+        kb.cache_dir = tmp_path / "cache"
+        (kb.cache_dir / "segments").mkdir(parents=True, exist_ok=True)
+        return kb
+
+    factory.reads = reads
+    factory.dataset = dataset
+    return factory
@@ -0,0 +1,21 @@
+"""
+测试共享工具
+"""
+
+
+class SyncSessionAdapter:
+    """用同步 SQLite 会话模拟 AsyncSession，并统计提交次数"""
+
+    def __init__(self, session):
+        self.session = session
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        return self.session.execute(statement, params)
+
+    async def commit(self):
+        self.commits += 1
+        self.session.commit()
+
+    async def rollback(self):
+        self.session.rollback()
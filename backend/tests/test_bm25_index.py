@@ -0,0 +1,111 @@
+"""
+BM25 倒排索引测试
+验证倒排索引检索结果与逐文档打分一致，且 to_state/from_state 不需要重建索引
+"""
+
+import pickle
+import sys
+from collections import Counter
+from math import log
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk, tokenize
+
+
+CHUNKS = [
+    Chunk(chunk_id="1", content="北京是中国的首都，拥有故宫、长城等著名景点", source="北京", page=0),
+    Chunk(chunk_id="2", content="上海是中国的经济中心，有外滩、东方明珠等景点", source="上海", page=0),
+    Chunk(chunk_id="3", content="泰国签证需要护照、照片和申请表 visa passport", source="泰国", page=0),
+    Chunk(chunk_id="4", content="日本旅游需要提前办理签证，推荐春季赏樱 Tokyo visa", source="日本", page=0),
+    Chunk(chunk_id="5", content="", source="空", page=0),
+    Chunk(chunk_id="6", content="北京烤鸭 北京胡同 北京 地铁", source="北京", page=1),
+]
+
+
+def _reference_search(chunks, query, top_k, k1=1.5, b=0.75):
+    """逐文档打分的参考实现（旧版算法）"""
+    doc_tokens = [tokenize(chunk.content) for chunk in chunks]
+    doc_freq = Counter()
+    for tokens in doc_tokens:
+        doc_freq.update(set(tokens))
+    n_docs = max(len(chunks), 1)
+    avg_len = sum(len(t) for t in doc_tokens) / n_docs
+    scores = []
+    for idx, tokens in enumerate(doc_tokens):
+        freq = Counter(tokens)
+        score = 0.0
+        for term in tokenize(query):
+            if term not in freq:
+                continue
+            df = doc_freq[term]
+            idf = log((n_docs - df + 0.5) / (df + 0.5) + 1)
+            tf = freq[term]
+            denom = tf + k1 * (1 - b + b * len(tokens) / (avg_len or 1))
+            score += idf * (tf * (k1 + 1)) / (denom or 1)
+        if score > 0:
+            scores.append((idx, score))
+    scores.sort(key=lambda item: item[1], reverse=True)
+    return [(chunks[idx].chunk_id, score) for idx, score in scores[:top_k]]
+
+
+def _ids_and_scores(results):
+    return [(chunk.chunk_id, round(score, 9)) for chunk, score in results]
+
+
+def test_matches_reference_scoring():
+    """倒排索引与逐文档打分结果一致"""
+    store = BM25VectorStore(CHUNKS)
+    for query in ["北京有什么好玩的", "签证 visa", "中国景点", "北京北京", "不存在的词 xyz", ""]:
+        for top_k in (1, 3, 10):
+            expected = [(cid, round(score, 9)) for cid, score in _reference_search(CHUNKS, query, top_k)]
+            assert _ids_and_scores(store.search(query, top_k=top_k)) == expected, query
+
+
+def test_only_postings_of_query_terms_are_scored():
+    """查询只命中包含查询词的文档"""
+    store = BM25VectorStore(CHUNKS)
+    results = store.search("护照", top_k=10)
+    assert [chunk.chunk_id for chunk, _ in results] == ["3"]
+    assert store.search("北京", top_k=0) == []
+
+
+def test_state_roundtrip_does_not_rebuild():
+    """from_state 直接恢复倒排索引，不重新分词"""
+    store = BM25VectorStore(CHUNKS)
+    state = pickle.loads(pickle.dumps(store.to_state()))
+    restored = BM25VectorStore.from_state(state)
+
+    restored._build_index = None  # 若被调用会直接报错
+    for query in ["北京", "签证 visa", "上海外滩"]:
+        assert _ids_and_scores(restored.search(query, top_k=4)) == _ids_and_scores(store.search(query, top_k=4))
+
+
+def test_legacy_state_is_upgraded():
+    """旧版 doc_tokens 状态仍可加载"""
+    legacy_state = {
+        "chunks": [
+            {"chunk_id": c.chunk_id, "content": c.content, "source": c.source, "page": c.page}
+            for c in CHUNKS
+        ],
+        "doc_tokens": [tokenize(c.content) for c in CHUNKS],
+        "doc_freq": {},
+        "avg_doc_len": 0.0,
+        "k1": 1.5,
+        "b": 0.75,
+    }
+    restored = BM25VectorStore.from_state(legacy_state)
+    assert _ids_and_scores(restored.search("北京", top_k=3)) == _ids_and_scores(
+        BM25VectorStore(CHUNKS).search("北京", top_k=3)
+    )
+
+
+if __name__ == "__main__":
+    test_matches_reference_scoring()
+    test_only_postings_of_query_terms_are_scored()
+    test_state_roundtrip_does_not_rebuild()
+    test_legacy_state_is_upgraded()
+    print("PASS: BM25 倒排索引测试全部通过")
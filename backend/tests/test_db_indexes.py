@@ -0,0 +1,46 @@
+"""
+启动时补建索引测试
+验证已存在的表缺少模型中声明的索引时，启动流程会补建而不重复创建
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.core.db.base import Base
+from app.core.db.session import ensure_indexes
+from app.modules.planner.models.itinerary import DayDetail, Itinerary
+from app.modules.users.models.user import User
+
+
+def _index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def test_missing_itinerary_index_is_created_on_existing_table():
+    engine = create_engine("sqlite://")
+    tables = [User.__table__, Itinerary.__table__, DayDetail.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    with engine.begin() as conn:
+        # 模拟索引加入模型之前创建的旧表
+        conn.execute(text("DROP INDEX ix_itineraries_user_id_created_at"))
+    assert "ix_itineraries_user_id_created_at" not in _index_names(engine, "itineraries")
+
+    with engine.begin() as conn:
+        ensure_indexes(conn)
+    assert "ix_itineraries_user_id_created_at" in _index_names(engine, "itineraries")
+
+    # 再次启动时不会重复创建
+    with engine.begin() as conn:
+        ensure_indexes(conn)
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,108 @@
+"""
+地理编码缓存测试
+验证两级缓存、负缓存、TTL 以及行程坐标补全时的地址去重
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.services.geocode_cache import GeocodeCache, normalize_geocode_key
+from app.services.baidu_geocoding_service import BaiduGeocodingService
+from app.modules.planner.services.plan_service import PlanService
+
+
+def test_normalized_key_ignores_width_case_and_spaces():
+    """全角/半角、大小写、空白不影响缓存键"""
+    assert normalize_geocode_key(" 故宫  博物院 ", "北京", "baidu") == normalize_geocode_key("故宫 博物院", "北京", "Baidu")
+    assert normalize_geocode_key("ＡＢＣ广场", "上海", "baidu") == normalize_geocode_key("abc广场", "上海", "baidu")
+    assert normalize_geocode_key("外滩", "上海", "baidu") != normalize_geocode_key("外滩", "上海", "amap")
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    """内存未命中时从磁盘加载，并统计命中率"""
+    db_path = tmp_path / "geocode.sqlite3"
+
+    async def run():
+        cache = GeocodeCache(db_path=db_path, max_size=10, ttl=60, negative_ttl=60)
+        assert await cache.get("故宫", "北京", "baidu") == (False, None)
+        await cache.set("故宫", "北京", "baidu", {"lng": 116.4, "lat": 39.9})
+        assert await cache.get("故宫", "北京", "baidu") == (True, {"lng": 116.4, "lat": 39.9})
+
+        # 新实例（模拟进程重启）从磁盘命中
+        fresh = GeocodeCache(db_path=db_path, max_size=10, ttl=60, negative_ttl=60)
+        assert await fresh.get("故宫", "北京", "baidu") == (True, {"lng": 116.4, "lat": 39.9})
+        return cache.stats(), fresh.stats()
+
+    stats, fresh_stats = asyncio.run(run())
+    assert stats["misses"] == 1 and stats["memory_hits"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert fresh_stats["disk_hits"] == 1
+
+
+def test_negative_cache_and_ttl(tmp_path):
+    """未命中结果负缓存，过期后重新查询"""
+    async def run():
+        cache = GeocodeCache(db_path=tmp_path / "geocode.sqlite3", max_size=10, ttl=60, negative_ttl=-1)
+        await cache.set("不存在的地方", "北京", "baidu", None)
+        expired = await cache.get("不存在的地方", "北京", "baidu")
+
+        cache.negative_ttl = 60
+        await cache.set("不存在的地方", "北京", "baidu", None)
+        negative = await cache.get("不存在的地方", "北京", "baidu")
+        return expired, negative, cache.stats()
+
+    expired, negative, stats = asyncio.run(run())
+    assert expired == (False, None)
+    assert negative == (True, None)
+    assert stats["negative_hits"] == 1
+
+
+def test_lru_eviction(tmp_path):
+    """超过容量时淘汰最久未使用的条目"""
+    async def run():
+        cache = GeocodeCache(db_path=tmp_path / "geocode.sqlite3", max_size=2, ttl=60, negative_ttl=60)
+        for name in ["a", "b", "c"]:
+            await cache.set(name, "北京", "baidu", {"lng": 1, "lat": 1})
+        return cache.stats()["memory_size"]
+
+    assert asyncio.run(run()) == 2
+
+
+def test_enrichment_dedupes_addresses(monkeypatch, tmp_path):
+    """行程中重复的地址只解析一次"""
+    calls = []
+
+    async def fake_geocode(self, address, city=None):
+        calls.append(address)
+        await asyncio.sleep(0)
+        return {"lng": 116.0, "lat": 39.0} if address != "无名小巷" else None
+
+    monkeypatch.setattr(BaiduGeocodingService, "geocode", fake_geocode)
+    itinerary = {
+        "days": [
+            {"activities": [{"title": "故宫"}, {"title": "景山", "location": "故宫"}, {"title": "无名小巷"}]},
+            {"activities": [{"title": "故宫 "}, {"title": "长城", "coordinates": {"lng": 1, "lat": 2}}]},
+        ]
+    }
+
+    service = PlanService(db_session=None)
+    result = asyncio.run(service._enrich_itinerary_with_coordinates(itinerary, "北京"))
+
+    assert sorted(calls) == ["故宫", "无名小巷"]
+    activities = [act for day in result["days"] for act in day["activities"]]
+    assert activities[0]["coordinates"] == {"lng": 116.0, "lat": 39.0}
+    assert activities[1]["coordinates"] == {"lng": 116.0, "lat": 39.0}
+    assert "coordinates" not in activities[2]
+    assert activities[3]["coordinates"] == {"lng": 116.0, "lat": 39.0}
+    assert activities[4]["coordinates"] == {"lng": 1, "lat": 2}
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
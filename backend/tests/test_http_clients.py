@@ -0,0 +1,78 @@
+"""
+出站 HTTP 连接池测试
+验证同一事件循环内复用客户端，事件循环变化时旧客户端被关闭或记录日志而不是静默丢弃
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.core.http.clients import HTTPClientRegistry
+
+URL = "https://api.example.com/v1/messages"
+
+
+def test_client_is_reused_within_one_loop():
+    registry = HTTPClientRegistry(http2=False)
+
+    async def run():
+        first = registry.get(URL)
+        second = registry.get("https://API.example.com/other")
+        await registry.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second and first.is_closed
+
+
+def test_client_on_running_loop_is_closed_when_replaced():
+    registry = HTTPClientRegistry(http2=False)
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        async def create():
+            return registry.get(URL)
+
+        old = asyncio.run_coroutine_threadsafe(create(), other_loop).result(timeout=5)
+
+        async def replace():
+            client = registry.get(URL)
+            await registry.aclose()
+            return client
+
+        new = asyncio.run(replace())
+        # 关闭在旧客户端所属的事件循环上执行
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other_loop).result(timeout=5)
+        assert new is not old
+        assert old.is_closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(timeout=5)
+        other_loop.close()
+
+
+def test_client_on_finished_loop_is_logged_when_replaced(caplog):
+    registry = HTTPClientRegistry(http2=False)
+
+    async def get():
+        return registry.get(URL)
+
+    old = asyncio.run(get())
+    with caplog.at_level(logging.WARNING, logger="app.core.http.clients"):
+        new = asyncio.run(get())
+
+    assert new is not old
+    assert "Discarding pooled HTTP client for https://api.example.com" in caplog.text
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,163 @@
+"""
+JSON 修复引擎测试
+验证录制的模型错误输出能被修复，以及随机破坏后的行程 JSON 能恢复为有效结构
+"""
+
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.planner.agents.json_repair import loads_tolerant, repair_json
+from app.modules.planner.agents.planner_agent import TravelPlannerAgent
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "llm_outputs"
+
+
+def make_itinerary(days, seed=0):
+    rng = random.Random(seed)
+    return {
+        "title": f"北京{days}日游",
+        "summary": "皇城文化、胡同生活与\"京味\"美食",
+        "days": [
+            {
+                "day_number": day,
+                "title": f"第{day}天主题",
+                "activities": [
+                    {
+                        "type": rng.choice(["attraction", "meal"]),
+                        "time": f"{8 + index * 2:02d}:00",
+                        "title": rng.choice(["故宫", "景山公园", "南锣鼓巷", "全聚德"]) + str(index),
+                        "ticket_price": rng.randint(0, 200),
+                        "need_booking": rng.random() < 0.5,
+                        "tips": ["提前预约", "避开周末"],
+                        "coordinates": {"lng": 116.4 + rng.random() / 10, "lat": 39.9},
+                    }
+                    for index in range(4)
+                ],
+                "notes": None,
+            }
+            for day in range(1, days + 1)
+        ],
+    }
+
+
+def test_valid_json_is_returned_unchanged():
+    text = json.dumps(make_itinerary(2), ensure_ascii=False)
+    assert repair_json(text) == text
+    assert repair_json("没有任何 JSON") is None
+    with pytest.raises(ValueError):
+        loads_tolerant("")
+
+
+@pytest.mark.parametrize("name", sorted(path.name for path in FIXTURES.glob("*.txt")))
+def test_recorded_bad_outputs_are_repaired(name):
+    data = loads_tolerant((FIXTURES / name).read_text(encoding="utf-8"))
+
+    assert isinstance(data, dict)
+    assert data["title"].endswith("日游")
+    assert data["days"][0]["day_number"] == 1
+    assert data["days"][0]["activities"]
+
+
+def test_recorded_bad_outputs_keep_values():
+    hangzhou = loads_tolerant((FIXTURES / "missing_commas_raw_newlines.txt").read_text(encoding="utf-8"))
+    assert hangzhou["summary"] == "西湖十景，\n湖光山色尽收眼底"
+    assert hangzhou["days"][0]["activities"][0]["description"] == "白娘子传说中的\"断桥\"，清晨人少"
+    assert hangzhou["days"][0]["activities"][1]["tips"] == ["西湖醋鱼", "东坡肉"]
+    assert hangzhou["actual_cost"] == 1800
+
+    xian = loads_tolerant((FIXTURES / "chinese_quotes_unquoted_keys.txt").read_text(encoding="utf-8"))
+    activity = xian["days"][0]["activities"][0]
+    assert activity == {
+        "type": "attraction", "time": "09:00", "title": "西安城墙",
+        "ticket_price": 54, "need_booking": False, "tips": ["建议骑行一圈"],
+    }
+
+    yunnan = loads_tolerant((FIXTURES / "truncated_tail.txt").read_text(encoding="utf-8"))
+    assert [day["day_number"] for day in yunnan["days"]] == [1, 2]
+    assert yunnan["days"][1]["activities"][0]["ticket_price"] == 75
+
+
+# 可逆的破坏：修复后应与原始数据完全一致
+_REVERSIBLE = {
+    "trailing_commas": lambda text: text.replace("}", ",}").replace("]", ",]"),
+    "unquoted_keys": lambda text: text.replace('"title":', "title:").replace('"day_number":', "day_number:"),
+    "chinese_quoted_keys": lambda text: text.replace('"tips":', "“tips”:"),
+    "missing_commas": lambda text: text.replace(",\n", "\n"),
+    "single_quotes": lambda text: text.replace('"type": "meal"', "'type': 'meal'"),
+    "python_literals": lambda text: text.replace("true", "True").replace("null", "None"),
+    "markdown_fence": lambda text: "好的：\n```json\n" + text + "\n```\n以上。",
+}
+
+
+@pytest.mark.parametrize("corruption", sorted(_REVERSIBLE))
+def test_reversible_corruptions_round_trip(corruption):
+    for seed in range(5):
+        original = make_itinerary(3, seed)
+        text = _REVERSIBLE[corruption](json.dumps(original, ensure_ascii=False, indent=2))
+        assert loads_tolerant(text) == original
+
+
+def test_fuzz_random_corruptions_always_yield_json():
+    """随机删除/插入结构字符、随机截断，修复结果总是有效 JSON 对象"""
+    rng = random.Random(2024)
+    noise = [",", "}", "]", "{", "[", '"', "'", ":", "“", "\n", "\\", "//"]
+    for seed in range(300):
+        chars = list(json.dumps(make_itinerary(2, seed), ensure_ascii=False, indent=1))
+        for _ in range(rng.randint(1, 8)):
+            position = rng.randrange(len(chars))
+            if rng.random() < 0.5:
+                del chars[position]
+            else:
+                chars.insert(position, rng.choice(noise))
+        text = "".join(chars)[:rng.randint(1, len(chars))]
+
+        repaired = repair_json(text)
+        assert repaired is not None
+        assert isinstance(json.loads(repaired), (dict, list))
+
+
+def test_unmatched_closers_take_linear_time():
+    """大量没有对应开括号的闭括号不会退化为平方复杂度"""
+    n = 32000
+    text = '{"a":' * n + "]" * n
+    start = time.perf_counter()
+    repaired = repair_json(text)
+    # 修复前约需一分钟
+    assert time.perf_counter() - start < 5
+    assert repaired == '{"a":' * n + "null" + "}" * n
+    # 嵌套过深超出 json 模块的递归限制，按无法解析处理
+    with pytest.raises(ValueError):
+        loads_tolerant(text)
+
+
+def test_truncation_at_every_position_keeps_prefix():
+    """任意位置截断都能闭合；已完整输出的天不丢失"""
+    original = make_itinerary(2)
+    text = json.dumps(original, ensure_ascii=False)
+    first_day_end = text.index('{"day_number": 2')
+    for end in range(1, len(text)):
+        data = json.loads(repair_json(text[:end]))
+        assert isinstance(data, dict)
+        if end >= first_day_end:
+            assert data["days"][0] == original["days"][0]
+
+
+def test_agent_flexible_parse_uses_repair_engine():
+    agent = TravelPlannerAgent.__new__(TravelPlannerAgent)
+    agent.use_strict_json = True
+    text = (FIXTURES / "fenced_trailing_commas.txt").read_text(encoding="utf-8")
+    assert agent._parse_ai_response(text)["title"] == "成都3日游"
+    assert agent._parse_ai_response("完全不是 JSON")["days"] == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
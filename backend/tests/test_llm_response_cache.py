@@ -0,0 +1,148 @@
+"""
+LLM 响应缓存测试
+验证缓存键规范化、两级缓存与 TTL、磁盘条目上限、缓存策略以及行程复用模式
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app.core.ai import factory
+from app.core.ai.factory import LLMFactory
+from app.core.ai.response_cache import LLMResponseCache, make_cache_key
+from app.modules.planner.agents.planner_agent import TravelPlannerAgent
+
+
+class FakeClient:
+    """记录调用次数的 OpenAI 兼容客户端"""
+
+    openai_api_base = None
+    model_name = "fake-model"
+    temperature = 0.7
+    max_tokens = 1024
+
+    def __init__(self, reply="ok"):
+        self.reply = reply
+        self.calls = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        return AIMessage(content=self.reply)
+
+
+def _key(messages, temperature=0.7, model="fake-model"):
+    return make_cache_key("openai", model, temperature, 1024, messages)
+
+
+def test_cache_key_ignores_whitespace_and_width_only():
+    """空白、全角/半角不影响缓存键，内容、模型和参数不同则键不同"""
+    base = [SystemMessage(content="你是旅行规划师"), HumanMessage(content="北京 3 天\n\n\n预算 5000")]
+    same = [SystemMessage(content="  你是旅行规划师 "), HumanMessage(content="北京  ３ 天\n\n预算　5000")]
+
+    assert _key(base) == _key(same)
+    assert _key(base) != _key([SystemMessage(content="你是旅行规划师"), HumanMessage(content="北京 4 天\n\n预算 5000")])
+    assert _key(base) != _key(base, temperature=0.2)
+    assert _key(base) != _key(base, model="other-model")
+    # 角色不同内容相同时不应视为相同请求
+    assert _key([HumanMessage(content="hi")]) != _key([SystemMessage(content="hi")])
+
+
+def test_memory_disk_tiers_and_ttl(tmp_path):
+    """内存未命中时从磁盘加载，过期条目视为未命中"""
+    db_path = tmp_path / "responses.sqlite3"
+
+    async def run():
+        cache = LLMResponseCache(db_path=db_path, max_size=10, max_disk_entries=10, ttl=60)
+        assert await cache.get("k") is None
+        await cache.set("k", "行程")
+        await cache.set("expired", "旧行程", ttl=-1)
+        assert await cache.get("k") == "行程"
+
+        # 新实例（模拟进程重启）从磁盘命中
+        fresh = LLMResponseCache(db_path=db_path, max_size=10, max_disk_entries=10, ttl=60)
+        assert await fresh.get("k") == "行程"
+        assert await fresh.get("expired") is None
+        return cache.stats(), fresh.stats()
+
+    stats, fresh_stats = asyncio.run(run())
+    assert stats["misses"] == 1 and stats["memory_hits"] == 1
+    assert fresh_stats["disk_hits"] == 1 and fresh_stats["misses"] == 1
+
+
+def test_size_caps_evict_oldest_entries(tmp_path):
+    """内存按 LRU 淘汰，磁盘超过上限时删除最早写入的条目"""
+    async def run():
+        cache = LLMResponseCache(db_path=tmp_path / "responses.sqlite3", max_size=2, max_disk_entries=3, ttl=60)
+        for name in ["a", "b", "c", "d"]:
+            await cache.set(name, name.upper())
+            await asyncio.sleep(0.01)
+        memory_size = cache.stats()["memory_size"]
+        cache.clear_memory()
+        return memory_size, [await cache.get(name) for name in ["a", "b", "c", "d"]]
+
+    memory_size, values = asyncio.run(run())
+    assert memory_size == 2
+    assert values == [None, "B", "C", "D"]
+
+
+def test_agenerate_cache_policies(monkeypatch, tmp_path):
+    """off 不读不写，write 只刷新缓存，read_write 命中后不再调用模型；空结果不缓存"""
+    cache = LLMResponseCache(db_path=tmp_path / "responses.sqlite3", max_size=10, max_disk_entries=10, ttl=60)
+    monkeypatch.setattr(factory, "get_response_cache", lambda: cache)
+    messages = [HumanMessage(content="规划北京三日游")]
+
+    async def run():
+        client = FakeClient("第一版")
+        assert await LLMFactory.agenerate(client, messages, cache="off") == "第一版"
+        assert cache.stats()["writes"] == 0
+
+        assert await LLMFactory.agenerate(client, messages, cache="write") == "第一版"
+        client.reply = "第二版"
+        assert await LLMFactory.agenerate(client, messages, cache="write") == "第二版"
+        assert await LLMFactory.agenerate(client, messages, cache="read_write") == "第二版"
+        calls = client.calls
+
+        empty = FakeClient("  ")
+        await LLMFactory.agenerate(empty, [HumanMessage(content="空响应")], cache="read_write")
+        await LLMFactory.agenerate(empty, [HumanMessage(content="空响应")], cache="read_write")
+        return calls, empty.calls
+
+    calls, empty_calls = asyncio.run(run())
+    assert calls == 3
+    assert empty_calls == 2
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_planner_reuse_similar_serves_cached_plan(monkeypatch, tmp_path):
+    """复用模式下相同条件的行程只调用一次模型；普通生成总是调用模型"""
+    cache = LLMResponseCache(db_path=tmp_path / "responses.sqlite3", max_size=10, max_disk_entries=10, ttl=60)
+    monkeypatch.setattr(factory, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(factory.settings, "LLM_CACHE_ENABLED", False)
+
+    client = FakeClient(json.dumps({"title": "北京3日游", "days": []}, ensure_ascii=False))
+    monkeypatch.setattr(LLMFactory, "create_client", staticmethod(lambda **kwargs: client))
+    agent = TravelPlannerAgent(use_strict_json=True)
+
+    async def run():
+        kwargs = dict(destination="北京", days=3, budget=5000, travel_style="leisure")
+        first = await agent.generate_itinerary(**kwargs, reuse_similar=True)
+        second = await agent.generate_itinerary(**kwargs, reuse_similar=True)
+        await agent.generate_itinerary(**kwargs)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["title"] == second["title"] == "北京3日游"
+    assert client.calls == 2
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
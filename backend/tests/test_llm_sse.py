@@ -0,0 +1,158 @@
+"""
+LLM 流式响应解析测试
+验证 SSE 增量解码在任意切分位置下的正确性、thinking 块跳过、TTFT 记录，
+以及 MiniMax/GLM 流式调用逐个输出文本增量
+"""
+
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.core.ai import factory
+from app.core.ai.factory import LLMFactory
+from app.core.ai.sse import SSEDecoder, StreamError, StreamTextExtractor
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "llm_streams"
+
+EXPECTED = {
+    "anthropic_thinking.sse": "北京三日游推荐：第一天故宫、景山；第二天八达岭长城；第三天颐和园。",
+    "glm_redacted_crlf.sse": "杭州西湖适合春季游览，记得带\"伞\"。",
+    "openai_reasoning.sse": "成都美食很多，推荐火锅。",
+}
+
+
+def _read(name):
+    with open(FIXTURES / name, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def _chunks(text, seed, max_size=17):
+    rng = random.Random(seed)
+    index = 0
+    while index < len(text):
+        size = rng.randint(1, max_size)
+        yield text[index:index + size]
+        index += size
+
+
+def _extract(chunks):
+    decoder = SSEDecoder()
+    extractor = StreamTextExtractor()
+    deltas = []
+    for chunk in chunks:
+        deltas.extend(extractor.feed(decoder.feed(chunk)))
+    deltas.extend(extractor.feed(decoder.flush()))
+    return deltas, extractor.finish()
+
+
+def test_decoder_handles_fields_multiline_data_and_comments():
+    text = (
+        ": comment\n"
+        "event: content_block_delta\n"
+        "id: 7\n"
+        "data: first line\n"
+        "data:second line\n"
+        "data\n"
+        "\n"
+        "retry: 1000\n"
+        "\n"
+        "data: tail without blank line"
+    )
+    decoder = SSEDecoder()
+    events = decoder.feed(text) + decoder.flush()
+
+    assert [(event.event, event.data, event.id) for event in events] == [
+        ("content_block_delta", "first line\nsecond line\n", "7"),
+        # id 按 SSE 规范沿用到后续事件；末尾缺少空行的事件在 flush 时输出
+        ("message", "tail without blank line", "7"),
+    ]
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_recorded_streams_across_arbitrary_chunk_boundaries(name):
+    text = _read(name)
+    for seed in range(20):
+        deltas, _ = _extract(_chunks(text, seed))
+        assert "".join(deltas) == EXPECTED[name]
+        # 文本增量逐个输出，不合并也不输出空串
+        assert all(deltas)
+
+
+def test_thinking_blocks_are_skipped_and_ttft_is_recorded():
+    deltas, metrics = _extract([_read("anthropic_thinking.sse")])
+
+    assert deltas[0] == "北京三日游"
+    assert metrics.text_deltas == 6
+    # 3 个 thinking_delta + 1 个 signature_delta
+    assert metrics.skipped_deltas == 4
+    assert metrics.ttft is not None and metrics.ttft >= 0
+    assert metrics.as_dict()["text_deltas"] == 6
+
+    _, openai_metrics = _extract([_read("openai_reasoning.sse")])
+    assert openai_metrics.skipped_deltas == 2
+
+
+def test_error_event_raises():
+    decoder = SSEDecoder()
+    extractor = StreamTextExtractor()
+    events = decoder.feed('event: error\ndata: {"type":"error","error":{"type":"overloaded_error","message":"Overloaded"}}\n\n')
+    with pytest.raises(StreamError, match="Overloaded"):
+        list(extractor.feed(events))
+
+
+class FakeClient:
+    model_name = "MiniMax-M2"
+    max_tokens = 1024
+
+    def __init__(self, base_url):
+        self.openai_api_base = base_url
+        self.openai_api_key = "test-key"
+
+
+def _stream_with(monkeypatch, base_url, fixture):
+    requests = []
+
+    async def stream_body():
+        for chunk in _chunks(_read(fixture), 3):
+            await asyncio.sleep(0)
+            yield chunk.encode("utf-8")
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=stream_body())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+            monkeypatch.setattr(factory, "get_http_client", lambda url: http_client)
+            messages = [SystemMessage(content="你是旅行助手"), HumanMessage(content="推荐路线")]
+            return [chunk async for chunk in LLMFactory.astream_generate(FakeClient(base_url), messages)]
+
+    return asyncio.run(run()), requests
+
+
+def test_minimax_and_glm_streams_yield_text_deltas(monkeypatch):
+    monkeypatch.setattr(factory.settings, "API_TIMEOUT_MS", 90000)
+
+    chunks, requests = _stream_with(monkeypatch, "https://api.minimaxi.com/anthropic", "anthropic_thinking.sse")
+    assert "".join(chunks) == EXPECTED["anthropic_thinking.sse"]
+    assert len(chunks) == 6
+    assert str(requests[0].url) == "https://api.minimaxi.com/anthropic/v1/messages"
+    # 超时来自配置而不是固定的 60 秒
+    assert requests[0].extensions["timeout"]["read"] == 90
+
+    chunks, _ = _stream_with(monkeypatch, "https://open.bigmodel.cn/api/anthropic", "glm_redacted_crlf.sse")
+    assert "".join(chunks) == EXPECTED["glm_redacted_crlf.sse"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,141 @@
+"""
+地图服务商请求管线测试
+验证令牌桶限流、限流错误退避重试以及批量地理编码去重
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.services import map_provider
+from app.services.geocode_cache import GeocodeCache
+from app.services.baidu_geocoding_service import BaiduGeocodingService
+from app.services.geocoding_service import AMapGeocodingService
+
+
+class FakeClient:
+    """按顺序返回预设响应的 HTTP 客户端"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def get(self, url, params=None, timeout=None):
+        self.calls.append((url, dict(params or {})))
+        status, payload = self.responses.pop(0)
+        return httpx.Response(status, json=payload, request=httpx.Request("GET", url))
+
+
+def make_service(cls, tmp_path, monkeypatch, responses, **kwargs):
+    client = FakeClient(responses)
+    monkeypatch.setattr(map_provider, "get_http_client", lambda url: client)
+    monkeypatch.setattr(map_provider.BaseMapProvider, "_backoff_delay", lambda self, attempt: 0)
+    cache = GeocodeCache(db_path=tmp_path / "geocode.sqlite3", max_size=10, ttl=60, negative_ttl=60)
+    return cls(api_key="test-key", cache=cache, qps=1000, **kwargs), client
+
+
+def test_token_bucket_limits_rate():
+    """令牌耗尽后按 rate 补充"""
+    async def run():
+        bucket = map_provider.TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 首个令牌立即可用，其余 4 个各需 50ms
+    assert asyncio.run(run()) >= 0.18
+
+
+def test_baidu_retries_on_throttle_status(tmp_path, monkeypatch):
+    """百度并发超限状态码触发重试，成功结果写入缓存"""
+    service, client = make_service(BaiduGeocodingService, tmp_path, monkeypatch, [
+        (200, {"status": 401, "message": "concurrency limit"}),
+        (503, {}),
+        (200, {"status": 0, "result": {"location": {"lng": 116.4, "lat": 39.9}, "level": "景点"}}),
+    ])
+
+    async def run():
+        first = await service.geocode("故宫", "北京")
+        second = await service.geocode("故宫", "北京")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["lng"] == 116.4 and second == first
+    assert len(client.calls) == 3
+    assert client.calls[0][1]["ak"] == "test-key"
+
+
+def test_throttle_exhausted_is_not_cached(tmp_path, monkeypatch):
+    """重试耗尽返回 None 且不写负缓存"""
+    monkeypatch.setattr(map_provider.settings, "MAP_MAX_RETRIES", 1)
+    service, client = make_service(AMapGeocodingService, tmp_path, monkeypatch, [
+        (200, {"status": "0", "infocode": "10004"}),
+        (200, {"status": "0", "infocode": "10004"}),
+    ], secret_key="")
+
+    async def run():
+        result = await service.geocode("外滩", "上海")
+        hit, _ = await service.cache.get("外滩", "上海", "amap")
+        return result, hit
+
+    result, hit = asyncio.run(run())
+    assert result is None and hit is False
+    assert len(client.calls) == 2
+
+
+def test_amap_no_result_is_negative_cached(tmp_path, monkeypatch):
+    """高德明确无结果时写入负缓存"""
+    service, client = make_service(AMapGeocodingService, tmp_path, monkeypatch, [
+        (200, {"status": "1", "geocodes": []}),
+    ], secret_key="")
+
+    async def run():
+        await service.geocode("无名小巷", "上海")
+        return await service.cache.get("无名小巷", "上海", "amap")
+
+    assert asyncio.run(run()) == (True, None)
+    assert client.calls[0][1]["key"] == "test-key"
+
+
+def test_geocode_many_dedupes_and_bounds_concurrency(tmp_path, monkeypatch):
+    """批量解析按标准化地址去重，且并发不超过上限"""
+    service, _ = make_service(BaiduGeocodingService, tmp_path, monkeypatch, [])
+    calls = []
+    active = {"now": 0, "peak": 0}
+
+    async def fake_uncached(self, address, city=None):
+        calls.append(address)
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return {"lng": float(len(address)), "lat": 0.0}, True
+
+    monkeypatch.setattr(BaiduGeocodingService, "geocode_uncached", fake_uncached)
+    addresses = ["故宫", "故宫 ", "天坛", "颐和园", "圆明园", "ＡＢＣ", "abc"]
+
+    resolved = asyncio.run(service.geocode_many(addresses, "北京", concurrency=2))
+
+    assert len(calls) == 5
+    assert active["peak"] <= 2
+    assert resolved["故宫 "] == resolved["故宫"]
+    assert resolved["abc"] == resolved["ＡＢＣ"]
+
+
+def test_get_map_provider_selects_service():
+    assert isinstance(map_provider.get_map_provider("amap"), AMapGeocodingService)
+    assert isinstance(map_provider.get_map_provider("Baidu"), BaiduGeocodingService)
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
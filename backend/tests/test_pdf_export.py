@@ -0,0 +1,236 @@
+"""
+PDF 导出测试
+验证字体样式每个进程只注册一次、渲染在线程池中执行、按行程内容缓存渲染结果，
+以及从磁盘流式下载和后台准备导出
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.planner.services import pdf_service
+from app.modules.planner.services.pdf_export import PDFCache, PDFRenderer, parse_export_id
+from app.modules.planner.services.pdf_service import PDFExportService
+
+
+def make_itinerary(updated_at=datetime(2026, 5, 1, 12, 0, 0), day_updated_at=None):
+    days = [
+        SimpleNamespace(
+            day_number=day, title=f"第{day}天", date=None, updated_at=day_updated_at or updated_at,
+            activities=[{"type": "attraction", "time": "09:00", "title": "故宫", "description": "紫禁城"}],
+        )
+        for day in (1, 2)
+    ]
+    return SimpleNamespace(
+        id=42, title="北京2日游", destination="北京", departure="上海", days=2, budget=2000,
+        travel_style="leisure", metadata_json={"summary": "皇城文化"}, updated_at=updated_at,
+        days_detail=days,
+    )
+
+
+class CountingRenderer(PDFRenderer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def _render(self, payload, path):
+        self.calls.append(threading.current_thread().name)
+        time.sleep(0.02)
+        path.write_bytes(f"%PDF-{payload['title']}-{len(self.calls)}".encode("utf-8"))
+
+
+def render(renderer, itinerary):
+    path = asyncio.run(renderer.render_itinerary_file(itinerary))
+    return path.read_bytes()
+
+
+def test_fonts_and_styles_are_registered_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pdf_service, "_registry", None)
+    monkeypatch.setattr(pdf_service, "register_pdf_font", lambda: calls.append(1) or "Helvetica")
+
+    first = PDFExportService()
+    second = PDFExportService()
+
+    assert calls == [1]
+    assert first.styles is second.styles
+    assert first.styles["BodyCN"].fontName == "Helvetica"
+
+
+def test_renders_off_loop_and_serves_repeats_from_cache(tmp_path):
+    renderer = CountingRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=1)
+    itinerary = make_itinerary()
+
+    loop_thread = threading.current_thread().name
+    first = render(renderer, itinerary)
+    second = render(renderer, itinerary)
+
+    assert first == second == b"%PDF-\xe5\x8c\x97\xe4\xba\xac2\xe6\x97\xa5\xe6\xb8\xb8-1"
+    assert len(renderer.calls) == 1
+    assert renderer.calls[0].startswith("pdf-render") and renderer.calls[0] != loop_thread
+    assert renderer.cache.stats()["hits"] == 1
+
+    # 新的渲染器（如进程重启）直接读取磁盘缓存
+    restarted = CountingRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=1)
+    assert render(restarted, itinerary) == first
+    assert restarted.calls == []
+
+
+def test_any_content_change_invalidates_and_replaces_old_version(tmp_path):
+    renderer = CountingRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=2)
+    base = datetime(2026, 5, 1, 12, 0, 0)
+
+    render(renderer, make_itinerary(base))
+    # 同一秒内修改某一天（如优化后立即导出），updated_at 不变
+    edited = make_itinerary(base)
+    edited.days_detail[1].title = "第2天：长城"
+    assert render(renderer, edited).endswith(b"-2")
+    # 删除一天，不修改行程本身
+    edited.days_detail.pop()
+    assert render(renderer, edited).endswith(b"-3")
+    # 恢复原内容：旧版本文件已被替换，重新渲染
+    assert render(renderer, make_itinerary(base)).endswith(b"-4")
+    # 只有时间戳变化、内容相同时命中缓存
+    assert render(renderer, make_itinerary(base + timedelta(minutes=5))).endswith(b"-4")
+
+    assert len(renderer.calls) == 4
+    assert len(list(tmp_path.glob("42-*.pdf"))) == 1
+
+
+def test_concurrent_requests_share_one_render(tmp_path):
+    renderer = CountingRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=2)
+
+    async def run():
+        return await asyncio.gather(*(renderer.render_itinerary_file(make_itinerary()) for _ in range(5)))
+
+    paths = asyncio.run(run())
+    assert len(set(paths)) == 1
+    assert len(renderer.calls) == 1
+
+
+def test_real_render_with_chinese_text(tmp_path):
+    renderer = PDFRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=1)
+    assert render(renderer, make_itinerary()).startswith(b"%PDF")
+    # 渲染直接写入缓存文件，不留下临时文件
+    assert [path.suffix for path in tmp_path.iterdir()] == [".pdf"]
+
+
+def test_prepare_runs_in_background_and_reports_status(tmp_path):
+    renderer = CountingRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=1)
+    itinerary = make_itinerary()
+
+    async def run():
+        export_id, status = renderer.prepare(itinerary)
+        pending = renderer.export_status(export_id)
+        # 再次准备复用同一个任务
+        assert renderer.prepare(itinerary) == (export_id, status)
+        while renderer.export_status(export_id) == "pending":
+            await asyncio.sleep(0.01)
+        return export_id, status, pending
+
+    export_id, status, pending = asyncio.run(run())
+
+    assert status == pending == "pending"
+    assert renderer.export_status(export_id) == "ready"
+    assert parse_export_id(export_id) == 42
+    assert len(renderer.calls) == 1
+    assert renderer.export_status("42-" + "0" * 32) is None
+
+
+def test_failed_background_export_is_reported(tmp_path):
+    class FailingRenderer(PDFRenderer):
+        def _render(self, payload, path):
+            raise RuntimeError("bad font")
+
+    renderer = FailingRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=1)
+
+    async def run():
+        export_id, _ = renderer.prepare(make_itinerary())
+        while renderer.export_status(export_id) == "pending":
+            await asyncio.sleep(0.01)
+        return export_id
+
+    assert renderer.export_status(asyncio.run(run())) == "failed"
+    assert list(tmp_path.iterdir()) == []
+
+
+def _make_client(monkeypatch, renderer):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.core.db.base import Base
+    from app.core.db.session import get_db
+    from app.core.security.deps import get_current_user
+    from app.modules.planner.api import v1
+    from app.modules.planner.models.itinerary import DayDetail, Itinerary
+    from app.modules.users.models.user import User
+    from tests.helpers import SyncSessionAdapter
+
+    # TestClient 在另一个线程中运行应用，共享同一个内存数据库连接
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__, Itinerary.__table__, DayDetail.__table__])
+    session = Session(engine, expire_on_commit=False)
+    session.add(Itinerary(id=42, user_id=1, title="北京2日游", destination="北京", days=2))
+    session.add(DayDetail(itinerary_id=42, day_number=1, title="第1天", activities=[]))
+    session.commit()
+
+    monkeypatch.setattr(v1, "get_pdf_renderer", lambda: renderer)
+    app = FastAPI()
+    app.include_router(v1.router, prefix="/api/v1/planner")
+    app.dependency_overrides[get_db] = lambda: SyncSessionAdapter(session)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    return TestClient(app)
+
+
+def test_export_endpoint_streams_file_with_content_length(monkeypatch, tmp_path):
+    renderer = CountingRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=1)
+    client = _make_client(monkeypatch, renderer)
+
+    response = client.get("/api/v1/planner/itineraries/42/export/pdf")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert response.content.startswith(b"%PDF-")
+    assert "filename*=UTF-8''%E5%8C%97" in response.headers["content-disposition"]
+    assert client.get("/api/v1/planner/itineraries/7/export/pdf").status_code == 404
+
+
+def test_prepare_and_download_endpoints(monkeypatch, tmp_path):
+    renderer = CountingRenderer(cache=PDFCache(tmp_path, max_entries=10), max_workers=1)
+    # 保持同一个事件循环，与服务进程一致
+    with _make_client(monkeypatch, renderer) as client:
+        prepared = client.post("/api/v1/planner/itineraries/42/export/pdf/prepare")
+        assert prepared.status_code == 202
+        body = prepared.json()
+        assert body["download_url"] == f"/api/v1/planner/itineraries/42/export/pdf/{body['export_id']}"
+
+        for _ in range(100):
+            response = client.get(body["download_url"])
+            if response.status_code != 202:
+                break
+            time.sleep(0.01)
+        assert response.status_code == 200
+        assert response.content.startswith(b"%PDF-")
+        assert client.post("/api/v1/planner/itineraries/42/export/pdf/prepare").json()["status"] == "ready"
+
+        # 导出任务 ID 必须属于路径中的行程
+        other = "43-" + body["export_id"].split("-", 1)[1]
+        assert client.get(f"/api/v1/planner/itineraries/42/export/pdf/{other}").status_code == 404
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
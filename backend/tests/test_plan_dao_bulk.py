@@ -0,0 +1,87 @@
+"""
+每日详情批量写入测试
+验证整体替换和优化更新都只发出固定数量的语句，并在一次提交内完成
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+from app.core.db.base import Base
+from app.modules.planner.daos.plan_dao import PlanDAO
+from app.modules.planner.models.itinerary import DayDetail, Itinerary
+from app.modules.users.models.user import User
+from tests.helpers import SyncSessionAdapter
+
+
+def _make_dao():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Itinerary.__table__, DayDetail.__table__])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    session = Session(engine, expire_on_commit=False)
+    session.add(Itinerary(id=1, user_id=1, title="北京5日游", destination="北京", days=5))
+    session.commit()
+    statements.clear()
+    return PlanDAO(SyncSessionAdapter(session)), session, statements
+
+
+def _days(count, prefix):
+    return [
+        {"day_number": day, "title": f"{prefix}{day}", "activities": [{"title": f"活动{day}"}], "notes": None}
+        for day in range(1, count + 1)
+    ]
+
+
+def _stored(session):
+    session.expire_all()
+    rows = session.execute(select(DayDetail).order_by(DayDetail.day_number)).scalars().all()
+    return [(row.day_number, row.title, row.activities) for row in rows]
+
+
+def test_replace_day_details_uses_one_delete_and_one_insert():
+    dao, session, statements = _make_dao()
+
+    asyncio.run(dao.replace_day_details(1, _days(3, "旧")))
+    statements.clear()
+    asyncio.run(dao.replace_day_details(1, _days(5, "新")))
+
+    assert [statement.split()[0] for statement in statements] == ["DELETE", "INSERT"]
+    assert dao.db.commits == 2
+    assert [(day, title) for day, title, _ in _stored(session)] == [(day, f"新{day}") for day in range(1, 6)]
+
+
+def test_upsert_day_details_batches_updates_and_inserts():
+    dao, session, statements = _make_dao()
+    asyncio.run(dao.replace_day_details(1, _days(3, "旧")))
+    statements.clear()
+
+    optimized = [
+        {"day_number": 2, "title": "优化2", "activities": [{"title": "颐和园"}], "notes": "早出发"},
+        {"day_number": 3, "title": "优化3", "activities": []},
+        {"day_number": 4, "title": "新增4", "activities": [{"title": "798"}]},
+    ]
+    asyncio.run(dao.upsert_day_details(1, optimized))
+
+    assert [statement.split()[0] for statement in statements] == ["SELECT", "UPDATE", "INSERT"]
+    assert dao.db.commits == 2
+    assert _stored(session) == [
+        (1, "旧1", [{"title": "活动1"}]),
+        (2, "优化2", [{"title": "颐和园"}]),
+        (3, "优化3", []),
+        (4, "新增4", [{"title": "798"}]),
+    ]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,133 @@
+"""
+行程读取路径查询次数测试
+验证列表和详情直接复用预加载的每日详情，查询次数不随行程数量增长
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.core.db.base import Base
+from app.modules.planner.models.itinerary import DayDetail, Itinerary
+from app.modules.planner.services.plan_service import PlanService
+from app.modules.users.models.user import User
+from tests.helpers import SyncSessionAdapter
+
+
+def _activity(title):
+    return {"type": "attraction", "time": "09:00", "duration": "2小时", "title": title, "description": ""}
+
+
+def _make_service(plan_count=5, day_count=3, same_created_at=False):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Itinerary.__table__, DayDetail.__table__])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    session = Session(engine, expire_on_commit=False)
+    now = datetime(2026, 5, 1)
+    for plan_id in range(1, plan_count + 1):
+        session.add(Itinerary(
+            id=plan_id, user_id=1, title=f"行程{plan_id}", destination="北京", days=day_count,
+            metadata_json={"summary": f"概述{plan_id}"},
+            created_at=now if same_created_at else now + timedelta(hours=plan_id), updated_at=now,
+        ))
+        # 倒序插入，验证按 day_number 排序
+        for day in range(day_count, 0, -1):
+            session.add(DayDetail(
+                itinerary_id=plan_id, day_number=day, title=f"第{day}天",
+                activities=[_activity(f"景点{day}")],
+            ))
+    session.commit()
+    session.expunge_all()
+    statements.clear()
+    return PlanService(SyncSessionAdapter(session)), session, statements
+
+
+def test_list_uses_two_queries_and_skips_activities():
+    service, _, statements = _make_service(plan_count=5)
+
+    plans = asyncio.run(service.get_user_itineraries(user_id=1, page=1, size=10))
+
+    # 一次查询行程 + 一次 selectin 查询每日详情，与行程数量无关
+    assert len(statements) == 2
+    assert "activities" not in statements[1]
+    assert [plan.id for plan in plans] == [5, 4, 3, 2, 1]
+    assert [day.day_number for day in plans[0].days_detail] == [1, 2, 3]
+    assert all(day.activities == [] for plan in plans for day in plan.days_detail)
+    assert plans[0].summary == "概述5"
+
+
+def test_detail_reuses_loaded_days():
+    service, _, statements = _make_service(plan_count=1)
+
+    plan = asyncio.run(service.get_itinerary(itinerary_id=1, user_id=1))
+
+    assert len(statements) == 2
+    assert [day.day_number for day in plan.days_detail] == [1, 2, 3]
+    assert plan.days_detail[0].activities[0].title == "景点1"
+
+
+def test_detail_sees_bulk_replaced_days():
+    """批量替换绕过了 ORM 会话，之后的读取不能返回旧的每日详情"""
+    service, _, _ = _make_service(plan_count=1)
+
+    # 与生成流程一样，先持有已加载的行程对象
+    loaded = asyncio.run(service.plan_dao.get_plan_by_id(1, 1))
+    asyncio.run(service.plan_dao.replace_day_details(1, [
+        {"day_number": 1, "title": "新的一天", "activities": [_activity("颐和园")]},
+    ]))
+    plan = asyncio.run(service.get_itinerary(itinerary_id=1, user_id=1))
+
+    assert [(day.day_number, day.title) for day in plan.days_detail] == [(1, "新的一天")]
+    assert [day.title for day in loaded.days_detail] == ["新的一天"]
+    assert plan.days_detail[0].activities[0].title == "颐和园"
+
+
+def test_summary_pages_walk_all_plans_with_one_query_each():
+    """游标分页覆盖全部行程，同一秒创建的行程按 id 区分，不重复不遗漏"""
+    service, _, statements = _make_service(plan_count=7, day_count=1, same_created_at=True)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        statements.clear()
+        page = asyncio.run(service.get_user_itinerary_summaries(user_id=1, size=3, cursor=cursor))
+        pages += 1
+        # 每页一条查询，只选摘要列，不查每日详情
+        assert len(statements) == 1
+        assert "itinerary_days" not in statements[0] and "metadata" not in statements[0]
+        seen.extend(item.id for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_summary_rejects_invalid_cursor():
+    service, _, _ = _make_service(plan_count=1)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(service.get_user_itinerary_summaries(user_id=1, size=3, cursor="not-a-cursor"))
+    assert exc_info.value.status_code == 400
+
+
+def test_itinerary_has_user_created_at_index():
+    indexes = {tuple(column.name for column in index.columns) for index in Itinerary.__table__.indexes}
+    assert ("user_id", "created_at") in indexes
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,211 @@
+"""
+行程流式生成测试
+验证增量 JSON 解析按天输出，以及每天在后续内容生成期间即完成坐标补全和落库
+"""
+
+import asyncio
+import json
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.core.ai.factory import LLMFactory
+from app.modules.planner.agents.stream_parser import IncrementalDaysParser
+from app.modules.planner.services.plan_service import PlanService
+
+
+ITINERARY = {
+    "title": "北京3日游",
+    "summary": "故宫、长城 {经典} 路线",
+    "days": [
+        {
+            "day_number": day,
+            "title": f"第{day}天：\"皇城\" [漫步]",
+            "activities": [{"title": "故宫", "location": "北京市东城区景山前街4号", "tips": ["a,b", "}"]}],
+        }
+        for day in range(1, 4)
+    ],
+    "tips": {"days": [1, 2]},
+}
+
+
+def _chunks(text, seed, max_size=40):
+    rng = random.Random(seed)
+    index = 0
+    while index < len(text):
+        size = rng.randint(1, max_size)
+        yield text[index:index + size]
+        index += size
+
+
+def test_parser_emits_days_across_arbitrary_chunk_boundaries():
+    """任意切分位置（含字符串、转义和代码块标记）都能按顺序输出每一天"""
+    text = "```json\n" + json.dumps(ITINERARY, ensure_ascii=False, indent=2) + "\n```"
+    for seed in range(30):
+        parser = IncrementalDaysParser()
+        days = [day for chunk in _chunks(text, seed) for day in parser.feed(chunk)]
+        assert days == list(enumerate(ITINERARY["days"], start=1))
+        assert parser.text == text
+
+
+def test_parser_emits_each_day_as_soon_as_it_closes():
+    """第一天闭合时立即输出，不等待后续内容"""
+    text = json.dumps(ITINERARY, ensure_ascii=False)
+    first_day_end = text.index(json.dumps(ITINERARY["days"][0], ensure_ascii=False)) + len(
+        json.dumps(ITINERARY["days"][0], ensure_ascii=False)
+    )
+    parser = IncrementalDaysParser()
+    assert parser.feed(text[:first_day_end - 1]) == []
+    assert parser.feed(text[first_day_end - 1:first_day_end]) == [(1, ITINERARY["days"][0])]
+
+
+def test_parser_skips_invalid_day_without_losing_later_days():
+    """非严格 JSON 的一天跳过，由最终完整解析兜底；后续天的位置不受影响"""
+    text = '{"days": [{"day_number": 1, "title": "a",}, {"day_number": 2, "title": "b"}]}'
+    parser = IncrementalDaysParser()
+    days = [day for chunk in _chunks(text, 0, 5) for day in parser.feed(chunk)]
+    assert days == [(2, {"day_number": 2, "title": "b"})]
+    assert parser.days_skipped == 1
+
+
+class FakePlanDAO:
+    def __init__(self, log):
+        self.log = log
+        self.days = []
+
+    async def delete_day_details(self, itinerary_id):
+        self.days.clear()
+
+    async def create_day_detail(self, day_detail):
+        self.log.append(("persist", day_detail.day_number))
+        self.days.append(day_detail)
+        return day_detail
+
+    async def update_plan(self, plan_id, user_id, data):
+        self.updated = data
+        return SimpleNamespace(id=plan_id)
+
+
+def test_stream_persists_each_day_while_generation_continues(monkeypatch):
+    """每天在后续内容仍在生成时即落库并推送，最终补上流式阶段跳过的天"""
+    log = []
+    # 第 3 天带尾逗号，只能由最终的宽松解析恢复
+    day_texts = [json.dumps(day, ensure_ascii=False) for day in ITINERARY["days"]]
+    day_texts[2] = day_texts[2][:-1] + ",}"
+    text = (
+        f'{{"title": "{ITINERARY["title"]}", "summary": "{ITINERARY["summary"]}", '
+        f'"days": [{", ".join(day_texts)}], "tips": {{"days": [1, 2]}}}}'
+    )
+
+    async def fake_astream(client, messages, **kwargs):
+        for chunk in _chunks(text, 1, 20):
+            log.append(("chunk", None))
+            await asyncio.sleep(0)
+            yield chunk
+        log.append(("stream_end", None))
+
+    async def fake_enrich(self, itinerary, destination):
+        for day in itinerary["days"]:
+            for activity in day.get("activities", []):
+                activity["coordinates"] = {"lng": 116.4, "lat": 39.9}
+        return itinerary
+
+    async def fake_build_response(self, itinerary):
+        return SimpleNamespace(model_dump=lambda mode=None: {"id": itinerary.id})
+
+    monkeypatch.setattr(LLMFactory, "create_client", staticmethod(lambda **kwargs: object()))
+    monkeypatch.setattr(LLMFactory, "astream_generate", staticmethod(fake_astream))
+    monkeypatch.setattr(PlanService, "_enrich_itinerary_with_coordinates", fake_enrich)
+    monkeypatch.setattr(PlanService, "_build_plan_response", fake_build_response)
+
+    service = PlanService(db_session=None)
+    service.plan_dao = FakePlanDAO(log)
+    itinerary = SimpleNamespace(
+        id=7, destination="北京", days=3, budget=3000, travel_style="leisure", departure="上海"
+    )
+
+    async def run():
+        return [event async for event in service.stream_detailed_itinerary(1, itinerary)]
+
+    events = asyncio.run(run())
+
+    assert [event["type"] for event in events] == ["start", "day", "day", "day", "done"]
+    assert [event["day_number"] for event in events if event["type"] == "day"] == [1, 2, 3]
+    assert events[1]["day"]["activities"][0]["coordinates"] == {"lng": 116.4, "lat": 39.9}
+    assert events[1]["completed"] == 1 and events[1]["total_days"] == 3
+    assert events[-1]["itinerary"] == {"id": 7}
+    # 前两天在流结束前落库，第三天由最终解析补上
+    stream_end = log.index(("stream_end", None))
+    assert log.index(("persist", 1)) < stream_end
+    assert log.index(("persist", 2)) < stream_end
+    assert log.index(("persist", 3)) > stream_end
+    assert service.plan_dao.updated["metadata_json"]["summary"] == ITINERARY["summary"]
+
+
+def test_days_without_day_number_are_numbered_by_position(monkeypatch):
+    """缺少 day_number 且第 1 天流式解析失败时，第 2 天不会被编成第 1 天"""
+    text = '{"days": [{"title": "故宫",}, {"title": "长城"}, {"title": "颐和园"}]}'
+
+    async def fake_astream(client, messages, **kwargs):
+        for chunk in _chunks(text, 2, 10):
+            yield chunk
+
+    async def fake_enrich(self, itinerary, destination):
+        return itinerary
+
+    async def fake_build_response(self, itinerary):
+        return SimpleNamespace(model_dump=lambda mode=None: {"id": itinerary.id})
+
+    monkeypatch.setattr(LLMFactory, "create_client", staticmethod(lambda **kwargs: object()))
+    monkeypatch.setattr(LLMFactory, "astream_generate", staticmethod(fake_astream))
+    monkeypatch.setattr(PlanService, "_enrich_itinerary_with_coordinates", fake_enrich)
+    monkeypatch.setattr(PlanService, "_build_plan_response", fake_build_response)
+
+    service = PlanService(db_session=None)
+    service.plan_dao = FakePlanDAO([])
+    itinerary = SimpleNamespace(id=7, destination="北京", days=3, budget=None, travel_style="leisure", departure=None)
+
+    async def run():
+        return [event async for event in service.stream_detailed_itinerary(1, itinerary)]
+
+    events = asyncio.run(run())
+    assert [event["type"] for event in events] == ["start", "day", "day", "day", "done"]
+    stored = sorted((day.day_number, day.title) for day in service.plan_dao.days)
+    assert stored == [(1, "故宫"), (2, "长城"), (3, "颐和园")]
+
+
+def test_stream_reports_generation_errors(monkeypatch):
+    """模型调用失败时推送 error 事件，保留已落库的天"""
+    async def failing_astream(client, messages, **kwargs):
+        yield '{"days": [' + json.dumps(ITINERARY["days"][0], ensure_ascii=False) + ","
+        raise RuntimeError("upstream closed")
+
+    async def fake_enrich(self, itinerary, destination):
+        return itinerary
+
+    monkeypatch.setattr(LLMFactory, "create_client", staticmethod(lambda **kwargs: object()))
+    monkeypatch.setattr(LLMFactory, "astream_generate", staticmethod(failing_astream))
+    monkeypatch.setattr(PlanService, "_enrich_itinerary_with_coordinates", fake_enrich)
+
+    service = PlanService(db_session=None)
+    service.plan_dao = FakePlanDAO([])
+    itinerary = SimpleNamespace(id=7, destination="北京", days=3, budget=None, travel_style="leisure", departure=None)
+
+    async def run():
+        return [event async for event in service.stream_detailed_itinerary(1, itinerary)]
+
+    events = asyncio.run(run())
+    assert [event["type"] for event in events] == ["start", "day", "error"]
+    assert events[-1]["message"] == "upstream closed" and events[-1]["completed"] == 1
+    assert [day.day_number for day in service.plan_dao.days] == [1]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
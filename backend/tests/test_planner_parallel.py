@@ -0,0 +1,121 @@
+"""
+分天并行生成测试
+验证先生成骨架、再受限并发展开每天，并合并为 V2 行程结构
+"""
+
+import asyncio
+import json
+import re
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage
+
+from app.core.ai import factory
+from app.core.ai.factory import LLMFactory
+from app.modules.planner.agents.planner_agent import TravelPlannerAgent
+
+
+SKELETON = {
+    "title": "北京4日游",
+    "summary": "皇城文化与胡同生活",
+    "days": [
+        {"day_number": 1, "title": "皇城中轴线", "area": "东城区", "focus": ["故宫", "景山"], "budget": 500},
+        {"day_number": 2, "title": "长城一日", "area": "延庆区", "focus": ["八达岭长城"], "budget": 600},
+        # 第 3 天缺失，第 4 天的详情请求会失败
+        {"day_number": 4, "title": "胡同漫步", "area": "西城区", "focus": ["什刹海"], "budget": 300},
+    ],
+    "cost_breakdown": {"transportation": 400, "accommodation": 800, "food": 400, "tickets": 200, "shopping": 0, "other": 0},
+}
+
+
+class FanOutClient:
+    """按提示内容返回骨架或单天详情，并记录并发数"""
+
+    openai_api_base = None
+    model_name = "fake-model"
+    temperature = 0.7
+    max_tokens = 1024
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.day_prompts = {}
+
+    async def ainvoke(self, messages, **kwargs):
+        prompt = messages[-1].content
+        match = re.search(r"中的第(\d+)天", prompt)
+        if match is None:
+            return AIMessage(content=json.dumps(SKELETON, ensure_ascii=False))
+
+        day_number = int(match.group(1))
+        self.day_prompts[day_number] = prompt
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+            if day_number == 4:
+                raise RuntimeError("upstream timeout")
+            day = {
+                "day_number": day_number,
+                "title": f"第{day_number}天详情",
+                "activities": [{"title": f"活动{day_number}", "average_cost": 100 * day_number}],
+            }
+            # 第 2 天模拟模型仍按完整行程格式返回
+            payload = {"days": [day]} if day_number == 2 else day
+            return AIMessage(content=json.dumps(payload, ensure_ascii=False))
+        finally:
+            self.in_flight -= 1
+
+
+def test_parallel_planner_merges_days_into_v2_schema(monkeypatch):
+    client = FanOutClient()
+    monkeypatch.setattr(LLMFactory, "create_client", staticmethod(lambda **kwargs: client))
+    monkeypatch.setattr(factory.settings, "LLM_CACHE_ENABLED", False)
+    agent = TravelPlannerAgent(use_strict_json=True)
+
+    result = asyncio.run(agent.generate_itinerary_parallel(
+        destination="北京", days=4, budget=3000, travel_style="cultural", max_concurrency=2
+    ))
+
+    assert result["title"] == "北京4日游"
+    assert result["actual_cost"] == 1800
+    assert [day["day_number"] for day in result["days"]] == [1, 2, 3, 4]
+    assert result["days"][0]["activities"][0]["title"] == "活动1"
+    assert result["days"][0]["total_cost"] == 100
+    assert result["days"][1]["title"] == "第2天详情"
+    assert result["days"][2]["activities"][0]["title"] == "活动3"
+    # 失败的天保留骨架，不影响其他天
+    assert result["days"][3]["title"] == "胡同漫步" and result["days"][3]["activities"] == []
+    assert "preparation" in result and "tips" in result
+
+    assert client.max_in_flight == 2
+    # 单天提示包含当天骨架和其他天的安排，避免景点重复
+    assert "八达岭长城" in client.day_prompts[2]
+    assert "故宫、景山" in client.day_prompts[2]
+
+
+def test_parallel_planner_falls_back_when_skeleton_fails(monkeypatch):
+    class BrokenClient(FanOutClient):
+        async def ainvoke(self, messages, **kwargs):
+            raise RuntimeError("service unavailable")
+
+    monkeypatch.setattr(LLMFactory, "create_client", staticmethod(lambda **kwargs: BrokenClient()))
+    agent = TravelPlannerAgent(use_strict_json=True)
+
+    result = asyncio.run(agent.generate_itinerary_parallel(
+        destination="北京", days=2, budget=1000, travel_style="leisure"
+    ))
+
+    assert result["days"] == []
+    assert result["error"] == "service unavailable"
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,135 @@
+"""
+QA 流式回复测试
+验证流式接口只调用一次上游 LLM，并在结束或客户端断开时保存助手消息
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.core.ai.factory import LLMFactory
+from app.modules.qa.agents.qa_agent import QAAgent
+from app.modules.qa.services.chat_service import ChatService
+
+
+class FakeLLM:
+    """模拟上游 LLM，记录流式调用次数"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    async def astream_generate(self, client, messages):
+        self.calls += 1
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+class FakeSession:
+    """模拟 AsyncSession，只记录写入的对象"""
+
+    def __init__(self):
+        self.added = []
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        for index, obj in enumerate(self.added, start=1):
+            obj.id = index
+
+    async def refresh(self, obj):
+        return None
+
+
+def _make_service(monkeypatch, chunks):
+    fake_llm = FakeLLM(chunks)
+    monkeypatch.setattr(LLMFactory, "astream_generate", staticmethod(fake_llm.astream_generate))
+    agent = QAAgent(enable_rag=False)
+    agent.llm_client = object()
+    db = FakeSession()
+    return ChatService(db), agent, db, fake_llm
+
+
+def test_stream_calls_llm_once_and_persists_full_reply(monkeypatch):
+    """完整流式回复只调用一次 LLM，并保存完整内容"""
+    service, agent, db, fake_llm = _make_service(monkeypatch, ["北京", "有", "故宫"])
+
+    async def run():
+        return [event async for event in service.stream_reply(agent, 7, "北京有什么好玩的", [], use_rag=False)]
+
+    events = asyncio.run(run())
+
+    assert fake_llm.calls == 1
+    assert [e["chunk"] for e in events if "chunk" in e] == ["北京", "有", "故宫"]
+    assert events[-2] == {"done": True}
+    assert events[-1] == {"message_id": 1}
+    assert len(db.added) == 1
+    assert db.added[0].content == "北京有故宫"
+    assert db.added[0].role == "assistant"
+    assert db.added[0].conversation_id == 7
+
+
+def test_client_disconnect_persists_partial_reply(monkeypatch):
+    """客户端中途断开时保存已生成的部分回复"""
+    service, agent, db, fake_llm = _make_service(monkeypatch, ["上海", "外滩", "夜景"])
+
+    async def run():
+        stream = service.stream_reply(agent, 3, "上海", [], use_rag=False)
+        first = await stream.__anext__()
+        second = await stream.__anext__()
+        await stream.aclose()
+        return [first, second]
+
+    events = asyncio.run(run())
+
+    assert fake_llm.calls == 1
+    assert events == [{"chunk": "上海"}, {"chunk": "外滩"}]
+    assert len(db.added) == 1
+    assert db.added[0].content == "上海外滩"
+
+
+def test_failed_final_save_is_not_retried(monkeypatch):
+    """完整回复保存失败时抛出原始错误，不会在失败的会话上再保存一次"""
+    service, agent, db, _fake_llm = _make_service(monkeypatch, ["杭州", "西湖"])
+
+    async def failing_commit():
+        raise RuntimeError("deadlock")
+
+    db.commit = failing_commit
+
+    async def run():
+        return [event async for event in service.stream_reply(agent, 5, "杭州", [], use_rag=False)]
+
+    with pytest.raises(RuntimeError, match="deadlock"):
+        asyncio.run(run())
+    assert [obj.content for obj in db.added] == ["杭州西湖"]
+
+
+def test_upstream_error_persists_partial_reply(monkeypatch):
+    """上游中途出错时保存已生成的部分，并抛出上游错误"""
+    service, agent, db, _fake_llm = _make_service(monkeypatch, [])
+
+    async def broken_stream(client, messages):
+        yield "成都"
+        raise RuntimeError("upstream closed")
+
+    monkeypatch.setattr(LLMFactory, "astream_generate", staticmethod(broken_stream))
+
+    async def run():
+        return [event async for event in service.stream_reply(agent, 9, "成都", [], use_rag=False)]
+
+    with pytest.raises(RuntimeError, match="upstream closed"):
+        asyncio.run(run())
+    assert [obj.content for obj in db.added] == ["成都"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,70 @@
+"""
+RAG 后台索引构建测试
+验证同一签名只构建一次、构建期间的降级检索以及构建完成后的切换
+"""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+
+DOCS = {
+    "北京": "北京是中国的首都，拥有故宫、长城等著名景点。",
+    "上海": "上海是中国的经济中心，有外滩、东方明珠等景点。",
+}
+
+
+def test_concurrent_requests_build_once(make_kb):
+    """并发请求同一个新索引只触发一次构建"""
+    kb = make_kb(DOCS, max_docs=2, build_wait_seconds=5.0)
+    reads = make_kb.reads
+
+    async def run():
+        return await asyncio.gather(*(kb.retrieve_async("北京故宫", top_k=2) for _ in range(8)))
+
+    results = asyncio.run(run())
+    assert reads.count("北京") == 1
+    assert all(result.ready and result.chunks for result in results)
+    assert all(result.chunks[0].source == "北京" for result in results)
+
+
+def test_slow_build_serves_fallback_then_swaps(make_kb):
+    """构建未完成时先降级，完成后原子切换到新索引"""
+    gate = {"上海": threading.Event()}
+    kb = make_kb(DOCS, gate=gate, max_docs=2, build_wait_seconds=0.05)
+    reads = make_kb.reads
+
+    async def run():
+        first = await kb.retrieve_async("北京故宫", top_k=2)
+        # 上海索引构建被阻塞：没有包含上海的已加载索引，返回空结果走通用回答
+        pending = await kb.retrieve_async("上海外滩", top_k=2)
+        # 北京+上海的组合索引构建中，仍可从当前北京索引检索北京的内容
+        mixed = await kb.retrieve_async("北京 上海 景点", top_k=2)
+        gate["上海"].set()
+        await asyncio.sleep(0.2)
+        ready = await kb.retrieve_async("上海外滩", top_k=2)
+        return first, pending, mixed, ready
+
+    first, pending, mixed, ready = asyncio.run(run())
+    assert first.ready and first.chunks[0].source == "北京"
+    assert not pending.ready and pending.chunks == []
+    assert not mixed.ready and {chunk.source for chunk in mixed.chunks} == {"北京"}
+    assert ready.ready and ready.chunks[0].source == "上海"
+    assert reads.count("上海") == 1
+
+
+def test_sync_retrieve_waits_for_build(make_kb):
+    kb = make_kb(DOCS, max_docs=2, build_wait_seconds=5.0)
+    result = kb.retrieve("上海外滩", top_k=1)
+    assert result.ready and result.chunks[0].source == "上海"
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
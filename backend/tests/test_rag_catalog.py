@@ -0,0 +1,126 @@
+"""
+RAG 数据集目录缓存测试
+验证文件名倒排索引的匹配结果与逐个扫描一致，以及按轮询间隔刷新目录和 stat 缓存
+"""
+
+import os
+import random
+import re
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag import catalog as catalog_module
+from app.modules.qa.rag.catalog import DatasetCatalog
+from app.modules.qa.rag.knowledge_base import KnowledgeBase
+from app.modules.qa.rag.vector_store import tokenize
+
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def reference_match(pdfs, query, max_docs):
+    """原 _match_documents 的逐文件实现"""
+    query_lower = query.lower()
+    exact = [pdf for pdf in pdfs if pdf.stem.lower() and (pdf.stem.lower() in query_lower or query_lower in pdf.stem.lower())]
+    if exact:
+        return exact[:max_docs]
+    query_tokens = set(tokenize(query))
+    ranked = [(pdf, len(set(tokenize(pdf.stem)) & query_tokens)) for pdf in pdfs]
+    ranked = sorted([item for item in ranked if item[1]], key=lambda item: item[1], reverse=True)
+    if ranked:
+        return [pdf for pdf, _ in ranked[:max_docs]]
+    cjk_chars = set(_CJK_PATTERN.findall(query))
+    if cjk_chars:
+        scored = [(pdf, sum(1 for char in cjk_chars if char in pdf.stem)) for pdf in pdfs]
+        scored = sorted([item for item in scored if item[1]], key=lambda item: item[1], reverse=True)
+        if scored:
+            return [pdf for pdf, _ in scored[:max_docs]]
+    return pdfs[:max_docs]
+
+
+def test_match_agrees_with_linear_scan(tmp_path):
+    words = ["北京", "上海", "泰国", "签证", "攻略", "Tokyo", "guide", "2024", "美食", "自由行"]
+    rng = random.Random(5)
+    for i in range(60):
+        name = "".join(rng.sample(words, rng.randint(1, 3))) + ("" if i % 3 else f" v{i}")
+        (tmp_path / f"{name}.pdf").write_bytes(b"%PDF")
+    (tmp_path / "notes.txt").write_text("x", encoding="utf-8")
+    pdfs = sorted(tmp_path.glob("*.pdf"))
+    catalog = DatasetCatalog(tmp_path)
+
+    queries = ["北京三日游怎么安排", "泰国签证", "tokyo GUIDE", "京", "海南", "", "上海美食攻略2024"]
+    queries += ["".join(rng.sample(words, 2)) + "？" for _ in range(40)]
+    for query in queries:
+        for max_docs in (1, 3):
+            assert catalog.match(query, max_docs) == reference_match(pdfs, query, max_docs), query
+
+
+def test_scans_at_most_once_per_poll_interval(tmp_path, monkeypatch):
+    clock = FakeClock()
+    (tmp_path / "北京.pdf").write_bytes(b"a")
+    catalog = DatasetCatalog(tmp_path, poll_seconds=5, clock=clock)
+    tokenized = []
+    original_tokenize = catalog_module.tokenize
+    monkeypatch.setattr(catalog_module, "tokenize", lambda text: tokenized.append(text) or original_tokenize(text))
+
+    for _ in range(10):
+        assert catalog.match("北京美食", 1) == [tmp_path / "北京.pdf"]
+    assert catalog.scans == 1
+    size_before = catalog.stat(tmp_path / "北京.pdf")[0]
+
+    (tmp_path / "上海.pdf").write_bytes(b"bb")
+    (tmp_path / "北京.pdf").write_bytes(b"longer")
+    clock.now = 4
+    assert catalog.paths() == [tmp_path / "北京.pdf"]
+    assert catalog.stat(tmp_path / "北京.pdf")[0] == size_before
+
+    clock.now = 5
+    assert catalog.paths() == [tmp_path / "上海.pdf", tmp_path / "北京.pdf"]
+    assert catalog.stat(tmp_path / "北京.pdf")[0] == 6
+    assert catalog.stat(tmp_path / "missing.pdf") is None
+    assert catalog.scans == 2
+
+    # 文件集合不变时只刷新 stat，不重新分词
+    tokenized.clear()
+    stat = (tmp_path / "上海.pdf").stat()
+    os.utime(tmp_path / "上海.pdf", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    catalog.invalidate()
+    assert catalog.stat(tmp_path / "上海.pdf")[1] == stat.st_mtime_ns + 10 ** 9
+    assert tokenized == []
+
+
+def test_missing_directory_is_empty(tmp_path):
+    catalog = DatasetCatalog(tmp_path / "missing")
+    assert catalog.paths() == []
+    assert catalog.match("北京", 1) == []
+
+
+def test_knowledge_base_reuses_catalog_between_queries(tmp_path, monkeypatch):
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    (dataset / "北京.pdf").write_text("北京故宫门票六十元。", encoding="utf-8")
+    (dataset / "上海.pdf").write_text("上海外滩夜景很美。", encoding="utf-8")
+    kb = KnowledgeBase(dataset_dir=dataset, chunk_size=50, chunk_overlap=0, query_cache_ttl_seconds=0)
+    kb.cache_dir = tmp_path / "cache"
+    (kb.cache_dir / "segments").mkdir(parents=True)
+    monkeypatch.setattr(KnowledgeBase, "_iter_pdf_pages", lambda self, pdf: [(0, pdf.read_text(encoding="utf-8"))])
+
+    for query in ["北京故宫", "上海外滩", "北京门票", "上海夜景"]:
+        assert kb.retrieve(query, top_k=1).chunks[0].source == query[:2]
+    assert kb._catalog.scans == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,128 @@
+"""
+RAG 语义分块测试
+验证句子边界、实际页码、页眉页脚去除、完全重复/近似重复分块过滤以及统计指标
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.chunking import NearDuplicateIndex, SemanticChunker, estimate_jaccard, minhash
+
+
+GUIDE = (
+    "北京是中国的首都，拥有故宫、长城、天坛、颐和园等著名景点，适合四到五天的深度游。"
+    "第一天建议参观天安门广场和故宫博物院，故宫周一闭馆，门票需要提前七天在官网实名预约。"
+    "第二天可以乘坐德胜门发车的公交前往八达岭长城，旺季人多，建议早上七点前出发。"
+    "第三天游览颐和园和圆明园，下午去清华北大附近的五道口吃饭，晚上可以去三里屯逛街。"
+    "北京的烤鸭、炸酱面和卤煮都值得一试，南锣鼓巷和簋街是热门的美食街区。"
+)
+
+
+def test_splits_on_sentence_boundaries_within_size():
+    text = "故宫是明清两代的皇家宫殿。门票六十元！长城位于北京北部。颐和园是皇家园林？"
+    chunks, stats = SemanticChunker(chunk_size=20, chunk_overlap=0).chunk([(0, text)], "北京")
+
+    assert all(len(chunk.content) <= 20 for chunk in chunks)
+    assert all(chunk.content[-1] in "。！？" for chunk in chunks)
+    assert "".join(chunk.content for chunk in chunks) == text
+    assert stats.raw_chunks == stats.kept_chunks == len(chunks)
+
+
+def test_keeps_spaces_between_english_sentences():
+    chunks, _ = SemanticChunker(chunk_size=200).chunk([(0, "Take the metro. Buy tickets online!")], "guide")
+    assert chunks[0].content == "Take the metro. Buy tickets online!"
+
+
+def test_overlong_sentence_is_hard_split():
+    chunks, _ = SemanticChunker(chunk_size=10, chunk_overlap=0, dedup=False).chunk([(0, "北" * 25)], "guide")
+    assert [len(chunk.content) for chunk in chunks] == [10, 10, 5]
+
+
+def test_uses_real_page_numbers():
+    pages = [(0, "第一页介绍故宫。" * 3), (1, "第二页介绍长城。" * 3), (2, "第三页介绍天坛。" * 3)]
+    chunks, stats = SemanticChunker(chunk_size=30, chunk_overlap=0).chunk(pages, "北京")
+
+    assert [chunk.page for chunk in chunks] == [1, 2, 3]
+    assert all(f"第{n}页" in chunk.content for n, chunk in zip("一二三", chunks))
+    assert stats.pages == 3
+
+
+def test_overlap_carries_sentences_with_their_page():
+    pages = [(0, "甲甲甲甲。乙乙乙乙。"), (4, "丙丙丙丙丙丙丙丙丙。")]
+    chunks, _ = SemanticChunker(chunk_size=12, chunk_overlap=5, dedup=False).chunk(pages, "guide")
+
+    assert chunks[0].content == "甲甲甲甲。乙乙乙乙。"
+    assert chunks[0].page == 1
+    assert chunks[-1].page == 5
+
+
+def test_strips_repeated_header_and_footer():
+    pages = [(i, f"旅游指南 2024版\n第{i}站的景点介绍和交通攻略各不相同编号{i * 7919}。\n版权所有") for i in range(6)]
+    chunks, stats = SemanticChunker(chunk_size=200, chunk_overlap=0).chunk(pages, "guide")
+
+    assert stats.boilerplate_lines == 2 * (6 - 3)
+    text = "\n".join(chunk.content for chunk in chunks)
+    assert text.count("旅游指南 2024版") == 3
+    assert all(f"编号{i * 7919}" in text for i in range(6))
+
+    _, raw_stats = SemanticChunker(chunk_size=200, chunk_overlap=0, dedup=False).chunk(pages, "guide")
+    assert raw_stats.boilerplate_lines == 0
+
+
+def test_drops_exact_and_near_duplicates():
+    near = GUIDE.replace("七点", "六点")
+    pages = [(0, GUIDE), (1, "日本旅游推荐春季赏樱，京都和大阪的寺庙值得一去。" * 5), (2, GUIDE), (3, near)]
+    chunks, stats = SemanticChunker(chunk_size=len(GUIDE), chunk_overlap=0).chunk(pages, "guide")
+
+    assert [chunk.page for chunk in chunks] == [1, 2]
+    assert stats.exact_duplicates == 1
+    assert stats.near_duplicates == 1
+    assert stats.raw_chunks == 4
+    assert stats.as_dict()["chunk_reduction"] == 0.5
+    assert [chunk.chunk_id for chunk in chunks] == ["guide-0", "guide-1"]
+
+    _, raw_stats = SemanticChunker(chunk_size=len(GUIDE), chunk_overlap=0, dedup=False).chunk(pages, "guide")
+    assert raw_stats.kept_chunks == 4
+
+
+def test_minhash_estimates_similarity():
+    edited = GUIDE.replace("四到五天", "四至五天")
+    unrelated = "曼谷的大皇宫和卧佛寺是泰国最受欢迎的景点，夜市美食种类丰富，交通以轻轨为主。" * 4
+
+    assert minhash(GUIDE) == minhash(" " + GUIDE + "\n")
+    assert estimate_jaccard(minhash(GUIDE), minhash(edited)) >= 0.8
+    assert estimate_jaccard(minhash(GUIDE), minhash(unrelated)) < 0.2
+
+
+def test_minhash_is_stable_across_processes():
+    """签名不受 PYTHONHASHSEED 影响，不同进程池 worker 切分出的索引段一致"""
+    script = "from app.modules.qa.rag.chunking import minhash; print(minhash('故宫门票六十元，旺季需要提前预约。'))"
+    outputs = set()
+    for seed in ("1", "2"):
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=project_root, capture_output=True, text=True,
+            env={**os.environ, "PYTHONHASHSEED": seed}, check=True
+        )
+        outputs.add(result.stdout.strip())
+    assert outputs == {str(minhash("故宫门票六十元，旺季需要提前预约。"))}
+
+
+def test_near_duplicate_index():
+    index = NearDuplicateIndex()
+    assert index.check_and_add("故宫门票六十元，旺季需要提前预约。") is None
+    assert index.check_and_add("故宫门票六十元，旺季需要提前预约。 ") == "exact"
+    assert index.check_and_add("长城位于北京北部，推荐八达岭段。") is None
+    assert index.check_and_add(GUIDE) is None
+    assert index.check_and_add(GUIDE.replace("七点", "六点")) == "near"
+    assert index.check_and_add(GUIDE[:len(GUIDE) // 2]) is None
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,79 @@
+"""
+列式索引段测试
+验证 mmap 加载的索引段与内存索引检索结果一致
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.columnar import load_columnar, write_columnar
+from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk
+
+
+CHUNKS = [
+    Chunk(chunk_id="北京-0", content="北京是中国的首都，拥有故宫、长城等著名景点", source="北京", page=0),
+    Chunk(chunk_id="北京-1", content="Beijing duck 北京烤鸭 is famous", source="北京", page=1),
+    Chunk(chunk_id="泰国-0", content="泰国签证需要护照、照片和申请表", source="泰国", page=0),
+    Chunk(chunk_id="日本-0", content="日本旅游需要提前办理签证，推荐春季赏樱", source="日本", page=0),
+    Chunk(chunk_id="空-0", content="", source="空", page=0),
+]
+QUERIES = ["北京有什么好玩的", "签证 护照", "beijing DUCK", "春季", "zzz"]
+
+
+def ranked(store, query):
+    return [(chunk, round(score, 9)) for chunk, score in store.search(query, top_k=10)]
+
+
+def test_roundtrip_matches_in_memory_store(tmp_path):
+    """列式段加载后检索结果、分块内容与原索引一致"""
+    store = BM25VectorStore(CHUNKS)
+    path = tmp_path / "segment.col"
+    write_columnar(store, path)
+    loaded = load_columnar(path)
+
+    assert len(loaded.chunks) == len(CHUNKS)
+    assert list(loaded.chunks) == CHUNKS
+    assert loaded.chunks[-1] == CHUNKS[-1]
+    assert loaded._doc_freq == store._doc_freq
+    for query in QUERIES:
+        assert ranked(loaded, query) == ranked(store, query)
+
+
+def test_merge_columnar_segments(tmp_path):
+    """多个 mmap 段合并后与整体构建结果一致"""
+    segments = []
+    for i, group in enumerate([CHUNKS[:2], CHUNKS[2:]]):
+        path = tmp_path / f"segment-{i}.col"
+        write_columnar(BM25VectorStore(group), path)
+        segments.append(load_columnar(path))
+
+    merged = BM25VectorStore.merge(segments)
+    whole = BM25VectorStore(CHUNKS)
+    for query in QUERIES:
+        assert ranked(merged, query) == ranked(whole, query)
+
+
+def test_empty_segment(tmp_path):
+    path = tmp_path / "empty.col"
+    write_columnar(BM25VectorStore([]), path)
+    loaded = load_columnar(path)
+    assert len(loaded.chunks) == 0
+    assert loaded.search("北京") == []
+
+
+def test_rejects_foreign_file(tmp_path):
+    """非列式段文件（如旧版 pickle）加载失败，由调用方重建"""
+    path = tmp_path / "legacy.col"
+    path.write_bytes(b"\x80\x04" + b"\0" * 256)
+    with pytest.raises(ValueError):
+        load_columnar(path)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
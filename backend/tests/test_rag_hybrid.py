@@ -0,0 +1,150 @@
+"""
+RAG 混合检索测试
+验证哈希嵌入、int8/float16 量化的余弦检索、RRF 融合以及嵌入与索引段一起持久化
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.embeddings import Embedder, EmbeddingIndex, HashingEmbedder, embed_in_batches
+from app.modules.qa.rag.knowledge_base import KnowledgeBase
+from app.modules.qa.rag.retriever import HybridRetriever, Retriever
+from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk
+
+
+DOCS = {
+    "北京": "北京是中国的首都，拥有故宫、长城等著名景点。北京烤鸭很有名。",
+    "上海": "上海是中国的经济中心，有外滩、东方明珠等景点。",
+}
+
+
+class TableEmbedder(Embedder):
+    """按文本查表返回固定向量"""
+
+    name = "table"
+    dim = 3
+
+    def __init__(self, table):
+        self.table = table
+
+    def embed(self, texts):
+        return np.asarray([self.table.get(text, [0.0, 0.0, 1.0]) for text in texts], dtype=np.float32)
+
+
+def test_incomplete_embedder_cannot_be_instantiated():
+    class NoEmbed(Embedder):
+        name = "none"
+
+    with pytest.raises(TypeError):
+        NoEmbed()
+
+
+def test_hashing_embedder_is_deterministic():
+    embedder = HashingEmbedder(dim=64)
+    first = embedder.embed(["北京故宫门票", "Beijing metro"])
+    second = HashingEmbedder(dim=64).embed(["北京故宫门票", "Beijing metro"])
+
+    assert first.shape == (2, 64) and first.dtype == np.float32
+    assert np.array_equal(first, second)
+    assert not embedder.embed([""]).any()
+
+
+@pytest.mark.parametrize("quantization", ["int8", "float16"])
+def test_quantized_search_matches_float_cosine(quantization):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 32)).astype(np.float32)
+    query = rng.normal(size=32).astype(np.float32)
+    index = EmbeddingIndex.from_vectors(vectors, quantization)
+
+    exact = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+    assert np.abs(index.scores(query) - exact).max() < 0.02
+    top = index.search(query, top_k=5)
+    assert [row for row, _ in top] == np.argsort(-index.scores(query), kind="stable")[:5].tolist()
+    assert len({row for row, _ in top} & set(np.argsort(-exact)[:5].tolist())) >= 4
+    assert [score for _, score in top] == sorted((score for _, score in top), reverse=True)
+    assert index.memory_bytes() < vectors.nbytes / 1.9
+
+
+def test_index_round_trip_and_merge(tmp_path):
+    first = embed_in_batches(HashingEmbedder(dim=16), ["北京故宫", "上海外滩", "泰国签证"], batch_size=2)
+    second = embed_in_batches(HashingEmbedder(dim=16), ["日本赏樱"], batch_size=2)
+    path = tmp_path / "segment.emb.npz"
+    first.save(path)
+    loaded = EmbeddingIndex.load(path)
+
+    assert np.array_equal(loaded.vectors, first.vectors)
+    assert np.array_equal(loaded.scales, first.scales)
+    merged = EmbeddingIndex.merge([loaded, second])
+    assert len(merged) == 4
+    assert np.array_equal(merged.vectors[3], second.vectors[0])
+    with pytest.raises(ValueError):
+        EmbeddingIndex.merge([first, embed_in_batches(HashingEmbedder(dim=16), ["x"], quantization="float16")])
+
+
+def test_rrf_fuses_bm25_and_dense_rankings():
+    chunks = [
+        Chunk(chunk_id="a", content="故宫门票 故宫开放时间", source="北京", page=1),
+        Chunk(chunk_id="b", content="故宫附近的酒店", source="北京", page=2),
+        Chunk(chunk_id="c", content="紫禁城参观攻略", source="北京", page=3),
+    ]
+    embedder = TableEmbedder({
+        chunks[0].content: [1.0, 0.0, 0.0],
+        chunks[1].content: [0.0, 0.0, 1.0],
+        chunks[2].content: [0.9, 0.1, 0.0],
+        "故宫门票": [1.0, 0.0, 0.0],
+    })
+    store = BM25VectorStore(chunks)
+    embeddings = embed_in_batches(embedder, [chunk.content for chunk in chunks])
+    retriever = HybridRetriever(store, embeddings, embedder)
+
+    assert [chunk.chunk_id for chunk in Retriever(store).retrieve("故宫门票", top_k=3)] == ["a", "b"]
+    # c 没有共同词，只出现在向量排序中；a 在两路中都排第一
+    assert [chunk.chunk_id for chunk in retriever.retrieve("故宫门票", top_k=3)] == ["a", "b", "c"]
+    assert retriever.memory_bytes() == store.memory_bytes() + embeddings.memory_bytes()
+    with pytest.raises(ValueError):
+        HybridRetriever(store, embed_in_batches(embedder, ["x"]), embedder)
+
+
+def test_knowledge_base_persists_embeddings_next_to_segments(tmp_path, monkeypatch):
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    for name, text in DOCS.items():
+        (dataset / f"{name}.pdf").write_text(text, encoding="utf-8")
+    monkeypatch.setattr(KnowledgeBase, "_iter_pdf_pages", lambda self, pdf: [(0, pdf.read_text(encoding="utf-8"))])
+
+    def make_kb():
+        kb = KnowledgeBase(dataset_dir=dataset, chunk_size=20, chunk_overlap=5, max_docs=2, embedder="hashing")
+        kb.cache_dir = tmp_path / "cache"
+        (kb.cache_dir / "segments").mkdir(parents=True, exist_ok=True)
+        return kb
+
+    kb = make_kb()
+    result = kb.retrieve("北京 上海 景点", top_k=2)
+    assert result.chunks
+    assert isinstance(kb._retriever, HybridRetriever)
+    assert len(kb._retriever.embeddings) == len(kb._store.chunks)
+    assert len(list((kb.cache_dir / "segments").glob("*.emb.npz"))) == 2
+
+    batches = []
+    original_embed = HashingEmbedder.embed
+
+    def counting_embed(self, texts):
+        batches.append(len(texts))
+        return original_embed(self, texts)
+
+    monkeypatch.setattr(HashingEmbedder, "embed", counting_embed)
+    reloaded = make_kb()
+    assert reloaded.retrieve("北京 上海 景点", top_k=2).chunks == result.chunks
+    # 只为查询计算嵌入，分块嵌入从磁盘加载
+    assert batches == [1]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
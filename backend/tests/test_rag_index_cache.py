@@ -0,0 +1,150 @@
+"""
+RAG 索引 LRU 测试
+验证按签名缓存的索引淘汰策略、内存统计，以及多文档交替提问时不重复加载
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag import knowledge_base
+from app.modules.qa.rag.index_cache import IndexCache
+from app.modules.qa.rag.knowledge_base import KnowledgeBase
+from app.modules.qa.rag.retriever import Retriever
+from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk
+
+
+def make_retriever(text):
+    return Retriever(BM25VectorStore([Chunk(chunk_id=text, content=text, source=text, page=0)]))
+
+
+def test_lru_evicts_by_entry_count():
+    cache = IndexCache(max_bytes=10 ** 9, max_entries=2)
+    cache.put("a", make_retriever("北京"))
+    cache.put("b", make_retriever("上海"))
+    assert cache.get("a") is not None  # a 变为最近使用
+    cache.put("c", make_retriever("泰国"))
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2
+    assert stats["hits"] == 1
+
+
+def test_lru_evicts_by_bytes():
+    """超过内存预算时淘汰，但至少保留最新的一个索引"""
+    big = make_retriever("长" * 5000)
+    cache = IndexCache(max_bytes=big.store.memory_bytes() + 10, max_entries=10)
+    cache.put("small", make_retriever("北京"))
+    cache.put("big", big)
+    assert "small" not in cache and "big" in cache
+    assert cache.stats()["bytes"] == big.store.memory_bytes()
+
+    cache.max_bytes = 1
+    cache.put("other", make_retriever("上海"))
+    assert len(cache) == 1 and "other" in cache
+
+
+def test_alternating_documents_stay_in_memory(tmp_path, monkeypatch):
+    """交替询问两个文档时都从内存命中，不再重新加载索引段"""
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    (dataset / "北京.pdf").write_text("北京是中国的首都，拥有故宫、长城等著名景点。", encoding="utf-8")
+    (dataset / "上海.pdf").write_text("上海是中国的经济中心，有外滩、东方明珠等景点。", encoding="utf-8")
+
+    # 关闭检索结果缓存，重复查询都落到索引 LRU
+    kb = KnowledgeBase(dataset_dir=dataset, chunk_size=20, chunk_overlap=5, query_cache_ttl_seconds=0)
+    kb.cache_dir = tmp_path / "cache"
+    (kb.cache_dir / "segments").mkdir(parents=True)
+    monkeypatch.setattr(KnowledgeBase, "_iter_pdf_pages", lambda self, pdf: [(0, pdf.read_text(encoding="utf-8"))])
+
+    merges = []
+    original_merge = KnowledgeBase._merge_segments
+
+    def counting_merge(self, pdfs, segment_keys):
+        merges.append([pdf.stem for pdf in pdfs])
+        return original_merge(self, pdfs, segment_keys)
+
+    monkeypatch.setattr(KnowledgeBase, "_merge_segments", counting_merge)
+
+    async def run():
+        results = []
+        for _ in range(3):
+            results.append(await kb.retrieve_async("北京故宫", top_k=1))
+            results.append(await kb.retrieve_async("上海外滩", top_k=1))
+        # 不同目的地的并发请求同时从内存检索
+        results.extend(await asyncio.gather(
+            kb.retrieve_async("北京长城", top_k=1),
+            kb.retrieve_async("上海东方明珠", top_k=1),
+        ))
+        return results
+
+    results = asyncio.run(run())
+    assert merges == [["北京"], ["上海"]]
+    assert [r.chunks[0].source for r in results] == ["北京", "上海"] * 4
+    stats = kb.index_stats()
+    assert stats["entries"] == 2 and stats["hits"] >= 6 and stats["bytes"] > 0
+
+
+def test_segments_are_bounded_and_reloaded_from_disk(tmp_path, monkeypatch):
+    """索引段也按 LRU 淘汰，淘汰后从磁盘重新映射而不是重新分块"""
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    for name, text in [("北京", "北京有故宫和长城。"), ("上海", "上海有外滩。"), ("杭州", "杭州有西湖。")]:
+        (dataset / f"{name}.pdf").write_text(text, encoding="utf-8")
+
+    kb = KnowledgeBase(dataset_dir=dataset, chunk_size=20, chunk_overlap=5, segment_cache_max_entries=2)
+    kb.cache_dir = tmp_path / "cache"
+    (kb.cache_dir / "segments").mkdir(parents=True)
+    reads = []
+
+    def fake_read(self, pdf):
+        reads.append(pdf.stem)
+        return [(0, pdf.read_text(encoding="utf-8"))]
+
+    monkeypatch.setattr(KnowledgeBase, "_iter_pdf_pages", fake_read)
+
+    pdfs = sorted(dataset.glob("*.pdf"))
+    for pdf in pdfs:
+        kb._load_segment(pdf)
+    segments = kb.index_stats()["segments"]
+    assert segments["entries"] == 2 and segments["evictions"] == 1
+    assert 0 < segments["bytes"] <= sum(kb._load_segment(pdf).memory_bytes() for pdf in pdfs)
+
+    assert kb._load_segment(pdfs[0]).store.chunks[0].source == pdfs[0].stem
+    assert sorted(reads) == sorted(pdf.stem for pdf in pdfs)
+
+
+def test_digest_and_signature_memos_stay_bounded(make_kb, monkeypatch):
+    """文件修改、删除和大量文档组合都不会让摘要/签名缓存无限增长"""
+    monkeypatch.setattr(knowledge_base, "_MAX_DOC_SIGNATURES", 2)
+    kb = make_kb({"北京": "北京有故宫。", "上海": "上海有外滩。", "杭州": "杭州有西湖。"}, catalog_poll_seconds=0)
+    beijing = make_kb.dataset / "北京.pdf"
+
+    for edit in range(3):
+        beijing.write_text(f"北京有故宫，第{edit}版。", encoding="utf-8")
+        stat = beijing.stat()
+        os.utime(beijing, ns=(stat.st_atime_ns, stat.st_mtime_ns + (edit + 1) * 10 ** 9))
+        kb._segment_key(beijing)
+    assert len(kb._file_digests) == 1
+
+    for pdf in sorted(make_kb.dataset.glob("*.pdf")):
+        kb._index_signature([pdf])
+    assert len(kb._doc_signatures) == 2
+
+    (make_kb.dataset / "上海.pdf").unlink()
+    kb._catalog.invalidate()
+    (make_kb.dataset / "成都.pdf").write_text("成都有火锅。", encoding="utf-8")
+    kb._segment_key(make_kb.dataset / "成都.pdf")
+    assert sorted(Path(path).stem for path in kb._file_digests) == ["北京", "成都", "杭州"]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
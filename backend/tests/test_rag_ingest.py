@@ -0,0 +1,87 @@
+"""
+RAG PDF 抽取流水线测试
+验证进程池并行抽取的页序、页数/长度限制、流式分块以及文本缓存
+"""
+
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag import ingest
+from app.modules.qa.rag.knowledge_base import KnowledgeBase
+
+
+def make_pdf(path, pages):
+    pdf = canvas.Canvas(str(path), pagesize=A4)
+    for text in pages:
+        pdf.drawString(72, 760, text)
+        pdf.showPage()
+    pdf.save()
+    return path
+
+
+def test_process_pool_keeps_page_order(tmp_path):
+    pdf = make_pdf(tmp_path / "guide.pdf", [f"page {i} content" for i in range(7)])
+    inline = list(ingest.iter_pdf_pages(pdf, max_pages=10, max_text_length=10 ** 6))
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pooled = list(ingest.iter_pdf_pages(pdf, max_pages=10, max_text_length=10 ** 6, executor=executor))
+
+    assert pooled == inline
+    assert [page_no for page_no, _ in pooled] == list(range(7))
+    assert all(f"page {i}" in text for i, (_, text) in enumerate(pooled))
+
+
+def test_respects_page_and_length_limits(tmp_path):
+    pdf = make_pdf(tmp_path / "guide.pdf", ["abcdefghij"] * 6)
+    assert len(list(ingest.iter_pdf_pages(pdf, max_pages=3, max_text_length=10 ** 6))) == 3
+
+    page_length = len(next(ingest.iter_pdf_pages(pdf, max_pages=1, max_text_length=10 ** 6))[1])
+    limit = page_length * 2 + 3
+    pages = list(ingest.iter_pdf_pages(pdf, max_pages=6, max_text_length=limit))
+    assert [len(text) for _, text in pages] == [page_length, page_length, 3]
+
+
+def test_chunk_pages_streams_with_real_page_numbers():
+    """按页流式分块：分块不超过 chunk_size，页码为 PDF 实际页码"""
+    kb = KnowledgeBase(chunk_size=30, chunk_overlap=7)
+    rng = random.Random(3)
+    for _ in range(50):
+        pages = ["".join(rng.choice("北京上海 ab。\n") for _ in range(rng.randint(0, 80)))
+                 for _ in range(rng.randint(1, 5))]
+        chunks = kb._chunk_pages(enumerate(pages), "guide")
+        assert all(0 < len(chunk.content) <= 30 for chunk in chunks)
+        assert [chunk.chunk_id for chunk in chunks] == [f"guide-{i}" for i in range(len(chunks))]
+        assert all(1 <= chunk.page <= len(pages) for chunk in chunks)
+        assert [chunk.page for chunk in chunks] == sorted(chunk.page for chunk in chunks)
+
+
+def test_page_text_cache(tmp_path, monkeypatch):
+    """第二次读取走文本缓存，保留分页"""
+    pdf = make_pdf(tmp_path / "guide.pdf", ["first page\r\nline", "second page"])
+    kb = KnowledgeBase(dataset_dir=tmp_path)
+    kb.cache_dir = tmp_path / "cache"
+    (kb.cache_dir / "texts").mkdir(parents=True)
+    monkeypatch.setattr(ingest, "_ingest_workers", lambda: 1)
+
+    first = list(kb._iter_pdf_pages(pdf))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("should be served from the text cache")
+
+    monkeypatch.setattr("app.modules.qa.rag.knowledge_base.iter_pdf_pages", fail)
+    assert list(kb._iter_pdf_pages(pdf)) == first
+    assert len(first) == 2
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
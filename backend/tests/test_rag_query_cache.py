@@ -0,0 +1,114 @@
+"""
+RAG 检索结果缓存测试
+验证 LRU + TTL 淘汰、按索引签名失效以及 KnowledgeBase 的缓存命中统计
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.query_cache import QueryCache
+from app.modules.qa.rag.retriever import Retriever
+from app.modules.qa.rag.vector_store import Chunk
+
+
+def chunk(text):
+    return Chunk(chunk_id=text, content=text, source=text, page=1)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_and_ttl_eviction():
+    clock = FakeClock()
+    cache = QueryCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put("a", "sig", [chunk("a")])
+    cache.put("b", "sig", [chunk("b")])
+    assert cache.get("a")[0].content == "a"
+    cache.put("c", "sig", [chunk("c")])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    clock.now = 10
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 2
+    assert stats["hit_rate"] == 0.6
+
+
+def test_invalidate_by_signature_and_disabled_cache():
+    cache = QueryCache(max_entries=10, ttl_seconds=60)
+    cache.put("a", "old", [chunk("a")])
+    cache.put("b", "old", [chunk("b")])
+    cache.put("c", "new", [chunk("c")])
+    assert cache.invalidate_signature("old") == 2
+    assert cache.get("a") is None and cache.get("c") is not None
+
+    disabled = QueryCache(max_entries=10, ttl_seconds=0)
+    disabled.put("a", "sig", [chunk("a")])
+    assert disabled.get("a") is None
+
+
+DOCS = {"北京": "北京故宫门票六十元。", "上海": "上海外滩夜景很美。"}
+
+
+def test_repeated_query_skips_scoring(make_kb, monkeypatch):
+    kb = make_kb(DOCS, chunk_size=50, chunk_overlap=0, catalog_poll_seconds=0)
+    searches = []
+    original_retrieve = Retriever.retrieve
+
+    def counting_retrieve(self, query, top_k=4):
+        searches.append(query)
+        return original_retrieve(self, query, top_k=top_k)
+
+    monkeypatch.setattr(Retriever, "retrieve", counting_retrieve)
+
+    async def run():
+        first = await kb.retrieve_async("北京故宫门票？", top_k=2)
+        second = await kb.retrieve_async(" 北京故宫门票 ", top_k=2)
+        third = kb.retrieve("北京故宫门票", top_k=2)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first.chunks and first.chunks == second.chunks == third.chunks
+    assert searches == ["北京故宫门票？"]
+    stats = kb.index_stats()["query_cache"]
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+    kb.retrieve("北京故宫门票", top_k=1)
+    assert len(searches) == 2
+
+
+def test_changed_pdf_is_never_served_from_cache(make_kb):
+    kb = make_kb(DOCS, chunk_size=50, chunk_overlap=0, catalog_poll_seconds=0)
+    assert "六十元" in kb.retrieve("北京故宫门票", top_k=1).chunks[0].content
+    assert "六十元" in asyncio.run(kb.retrieve_async("北京故宫门票", top_k=1)).chunks[0].content
+
+    pdf = make_kb.dataset / "北京.pdf"
+    pdf.write_text("北京故宫门票四十元，淡季优惠。", encoding="utf-8")
+    stat = pdf.stat()
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    # 同一个热门查询在 TTL 内重复，签名已变化，不会命中旧索引上的结果
+    assert "四十元" in asyncio.run(kb.retrieve_async("北京故宫门票", top_k=1)).chunks[0].content
+    assert "四十元" in kb.retrieve("北京故宫门票", top_k=1).chunks[0].content
+    # 旧签名下的缓存结果随之清理
+    assert kb.index_stats()["query_cache"]["invalidations"] == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
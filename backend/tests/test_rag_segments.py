@@ -0,0 +1,79 @@
+"""
+RAG 索引段测试
+验证按 PDF 持久化的索引段在查询时合并，且只重建发生变化的 PDF
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk
+
+
+DOCS = {
+    "北京": "北京是中国的首都，拥有故宫、长城等著名景点。北京烤鸭很有名。",
+    "上海": "上海是中国的经济中心，有外滩、东方明珠等景点。",
+    "泰国": "泰国签证需要护照、照片和申请表，曼谷是热门目的地。",
+}
+
+
+def test_merged_segments_match_single_index():
+    """合并后的索引与整体构建的索引检索结果一致"""
+    groups = [
+        [Chunk(chunk_id=f"{name}-{i}", content=text[i * 10:(i + 1) * 10], source=name, page=i) for i in range(3)]
+        for name, text in DOCS.items()
+    ]
+    merged = BM25VectorStore.merge(BM25VectorStore(group) for group in groups)
+    whole = BM25VectorStore([chunk for group in groups for chunk in group])
+
+    for query in ["北京故宫", "签证护照", "中国景点", "不存在"]:
+        expected = [(c.chunk_id, round(s, 9)) for c, s in whole.search(query, top_k=5)]
+        actual = [(c.chunk_id, round(s, 9)) for c, s in merged.search(query, top_k=5)]
+        assert actual == expected
+
+
+def test_only_changed_pdf_is_reindexed(make_kb):
+    """修改一个 PDF 只会重建该 PDF 的索引段"""
+    kb = make_kb(DOCS, max_docs=3, catalog_poll_seconds=0)
+    reads = make_kb.reads
+    pdfs = sorted(make_kb.dataset.glob("*.pdf"))
+    kb._build_index(pdfs)
+    assert sorted(reads) == sorted(DOCS)
+    assert len(list((kb.cache_dir / "segments").glob("*.col"))) == 3
+
+    # 新实例（模拟进程重启）直接从磁盘加载索引段
+    reads.clear()
+    fresh = make_kb(max_docs=3, catalog_poll_seconds=0)
+    fresh._build_index(pdfs)
+    assert reads == []
+    assert len(fresh._chunks) == len(kb._chunks)
+
+    # 修改一个文件、新增一个文件
+    (make_kb.dataset / "上海.pdf").write_text("上海迪士尼乐园适合亲子游。", encoding="utf-8")
+    (make_kb.dataset / "日本.pdf").write_text("日本旅游需要提前办理签证，推荐春季赏樱。", encoding="utf-8")
+    pdfs = sorted(make_kb.dataset.glob("*.pdf"))
+    fresh._build_index(pdfs)
+    assert sorted(reads) == ["上海", "日本"]
+    assert fresh._retriever.retrieve("迪士尼", top_k=1)[0].source == "上海"
+
+
+def test_document_subsets_reuse_segments(make_kb):
+    """不同的文档子集组合复用已有索引段"""
+    kb = make_kb(DOCS, max_docs=3, catalog_poll_seconds=0)
+    pdfs = sorted(make_kb.dataset.glob("*.pdf"))
+
+    kb._build_index(pdfs[:2])
+    kb._build_index(pdfs[1:])
+    kb._build_index(pdfs)
+
+    assert sorted(make_kb.reads) == sorted(DOCS)
+    assert {chunk.source for chunk in kb._chunks} == set(DOCS)
+
+
+if __name__ == "__main__":
+    import pytest
+
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,62 @@
+"""
+分词器测试
+验证快速分词与原正则实现一致，以及汉字二元组索引
+"""
+
+import random
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))
+
+from app.modules.qa.rag.columnar import load_columnar, write_columnar
+from app.modules.qa.rag.vector_store import BM25VectorStore, Chunk, iter_tokens, tokenize
+
+_LEGACY_PATTERN = re.compile(r"[一-鿿]|[a-zA-Z0-9]+")
+
+
+def legacy_tokenize(text):
+    return [token.lower() for token in _LEGACY_PATTERN.findall(text)]
+
+
+def test_matches_legacy_tokenizer():
+    rng = random.Random(11)
+    alphabet = list("北京故宫长城 AbC xyZ 019，。！-_\n\t") + ["㐀", "鿿", "é"]
+    for _ in range(300):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert tokenize(text) == legacy_tokenize(text)
+        assert list(iter_tokens(text)) == tokenize(text)
+
+
+def test_cjk_bigrams():
+    assert tokenize("北京故宫 Tour", bigrams=True) == ["北", "京", "故", "宫", "tour", "北京", "京故", "故宫"]
+    assert sorted(iter_tokens("长城，北京", bigrams=True)) == sorted(["长", "城", "长城", "北", "京", "北京"])
+    # 标点隔开的汉字不组成二元组
+    assert "城北" not in tokenize("长城，北京", bigrams=True)
+
+
+def test_bigram_store_persists_tokenization(tmp_path):
+    chunks = [
+        Chunk(chunk_id="0", content="北京烤鸭很有名", source="北京", page=0),
+        Chunk(chunk_id="1", content="京都的鸭川很美，北方", source="日本", page=0),
+    ]
+    store = BM25VectorStore(chunks, cjk_bigrams=True)
+    assert store.search("北京", top_k=1)[0][0].chunk_id == "0"
+
+    path = tmp_path / "segment.col"
+    write_columnar(store, path)
+    loaded = load_columnar(path)
+    assert loaded.cjk_bigrams
+    assert [c.chunk_id for c, _ in loaded.search("北京")] == [c.chunk_id for c, _ in store.search("北京")]
+
+    with pytest.raises(ValueError):
+        BM25VectorStore.merge([loaded, BM25VectorStore(chunks)])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))